@@ -0,0 +1,80 @@
+"""pytest-benchmark suite for the chunker on multi-megabyte synthetic markdown with many code fences.
+
+Usage:
+    pytest benchmarks/bench_chunker.py --benchmark-columns=mean,stddev,rounds
+
+The legacy (pre single-pass) chunker is benchmarked on the long code-heavy paragraphs for comparison. It is
+quadratic on them (about 1s for 1 MB against 12 ms for the single-pass chunker), so it only runs a few rounds.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tests"))
+
+import legacy_chunker  # noqa: E402
+
+from chunker import chunk_text, iter_chunks  # noqa: E402
+
+WORDS = "entity resolution record search pipeline bundle operation property schema index query".split()
+CHUNK_SIZE = 1000
+
+
+def synthetic_markdown(size: int, code_every: int = 3, long_paragraphs: bool = False, seed: int = 0) -> str:
+    """Build about `size` characters of markdown with a code fence every `code_every` paragraphs.
+
+    With `long_paragraphs`, blank lines are rare, so most of the text goes through the long paragraph splitter.
+    """
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    paragraph = 0
+    while length < size:
+        if paragraph % code_every == code_every - 1:
+            lines = "\n".join(f"    {rng.choice(WORDS)}({rng.randint(0, 99)})" for _ in range(rng.randint(3, 30)))
+            part = f"```python\n{lines}\n```"
+        else:
+            part = " ".join(
+                " ".join(rng.choices(WORDS, k=rng.randint(4, 16))).capitalize() + "." for _ in range(rng.randint(2, 10))
+            )
+        separator = "\n" if long_paragraphs and paragraph % 5000 else "\n\n"
+        parts.append(part + separator)
+        length += len(part) + len(separator)
+        paragraph += 1
+    return "# Synthetic page\n\n" + "".join(parts)
+
+
+@pytest.fixture(scope="module", params=[1, 4], ids=lambda mb: f"{mb}MB")
+def markdown(request):
+    return synthetic_markdown(request.param * 1024 * 1024)
+
+
+@pytest.fixture(scope="module", params=[256, 1024], ids=lambda kb: f"{kb}KB")
+def code_heavy_paragraphs(request):
+    return synthetic_markdown(request.param * 1024, code_every=2, long_paragraphs=True)
+
+
+def test_chunk_text(benchmark, markdown):
+    chunks = benchmark(chunk_text, markdown, CHUNK_SIZE)
+    assert chunks
+
+
+def test_iter_chunks_streamed(benchmark, markdown):
+    pieces = [markdown[i : i + 64 * 1024] for i in range(0, len(markdown), 64 * 1024)]
+    chunks = benchmark(lambda: list(iter_chunks(pieces, CHUNK_SIZE)))
+    assert chunks == chunk_text(markdown, CHUNK_SIZE)
+
+
+def test_chunk_text_long_paragraphs(benchmark, code_heavy_paragraphs):
+    chunks = benchmark(chunk_text, code_heavy_paragraphs, CHUNK_SIZE)
+    assert chunks
+
+
+def test_legacy_chunk_text_long_paragraphs(benchmark, code_heavy_paragraphs):
+    chunks = benchmark.pedantic(legacy_chunker.chunk_text, (code_heavy_paragraphs, CHUNK_SIZE), rounds=3)
+    assert chunks == chunk_text(code_heavy_paragraphs, CHUNK_SIZE)
@@ -0,0 +1,114 @@
+"""Compare per-chunk embedding calls with the EmbeddingBatcher on a synthetic sitemap re-index.
+
+Both paths process the same pages with the crawler's page concurrency (10) against a local fake embeddings
+server, so the difference comes only from how embedding requests are issued.
+
+Usage:
+    python benchmarks/bench_embedding_batcher.py --pages 300
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+from openai import AsyncOpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai_server import FakeOpenAIConfig, FakeOpenAIServer  # noqa: E402
+
+from chunker import chunk_text  # noqa: E402
+from embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+MODEL = "text-embedding-3-small"
+
+
+def synthetic_pages(count: int, seed: int = 0) -> list[list[str]]:
+    """Build `count` markdown pages and return their 1000-character chunks."""
+    rng = random.Random(seed)
+    words = "entity resolution record search pipeline bundle operation property schema index query".split()
+    pages = []
+    for page in range(count):
+        paragraphs = []
+        for _ in range(rng.randint(5, 40)):
+            sentence_count = rng.randint(2, 8)
+            paragraphs.append(
+                " ".join(
+                    " ".join(rng.choices(words, k=rng.randint(5, 20))).capitalize() + "." for _ in range(sentence_count)
+                )
+            )
+        pages.append(chunk_text(f"# Page {page}\n\n" + "\n\n".join(paragraphs), 1000))
+    return pages
+
+
+async def run_per_chunk(client: AsyncOpenAI, pages: list[list[str]], max_concurrent: int) -> float:
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def embed(text: str):
+        response = await client.embeddings.create(model=MODEL, input=text)
+        return response.data[0].embedding
+
+    async def process_page(chunks: list[str]):
+        async with semaphore:
+            await asyncio.gather(*[embed(chunk) for chunk in chunks])
+
+    start = time.perf_counter()
+    await asyncio.gather(*[process_page(chunks) for chunks in pages])
+    return time.perf_counter() - start
+
+
+async def run_batched(
+    client: AsyncOpenAI, pages: list[list[str]], max_concurrent: int, batcher: EmbeddingBatcher
+) -> float:
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def process_page(chunks: list[str]):
+        async with semaphore:
+            await batcher.embed_many(chunks)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[process_page(chunks) for chunks in pages])
+    await batcher.close()
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--page-concurrency", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--embedding-concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request (seconds)")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    total_chunks = sum(len(chunks) for chunks in pages)
+    print(f"{args.pages} pages, {total_chunks} chunks")
+
+    for name in ("per-chunk", "batched"):
+        server = FakeOpenAIServer(config=FakeOpenAIConfig(request_latency=args.latency)).start()
+        client = AsyncOpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+        try:
+            if name == "per-chunk":
+                elapsed = await run_per_chunk(client, pages, args.page_concurrency)
+            else:
+                batcher = EmbeddingBatcher(
+                    client, MODEL, batch_size=args.batch_size, max_concurrent=args.embedding_concurrency
+                )
+                elapsed = await run_batched(client, pages, args.page_concurrency, batcher)
+        finally:
+            await client.close()
+            server.stop()
+
+        print(
+            f"{name:>10}: {server.stats.embedding_requests:>6} requests  {elapsed:8.2f}s  "
+            f"{total_chunks / elapsed:8.1f} chunks/s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Compare the old requests + run_in_executor fetch path with the pooled AsyncFetcher.
+
+Both paths download every page of a local synthetic docs site served from a separate process. Only
+fetching is measured (no HTML conversion) so the numbers reflect connection handling and concurrency.
+The server latency emulates a remote host; with it, the old path is capped by the default executor's
+thread count whatever `max_concurrent` is.
+
+Usage:
+    python benchmarks/bench_fetcher.py --pages 3000 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fetcher import AsyncFetcher  # noqa: E402
+
+
+def fetch_with_requests(url: str) -> str:
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response.text
+
+
+async def run_requests_executor(urls: list[str], max_concurrent: int) -> float:
+    semaphore = asyncio.Semaphore(max_concurrent)
+    loop = asyncio.get_running_loop()
+
+    async def fetch(url: str):
+        async with semaphore:
+            await loop.run_in_executor(None, fetch_with_requests, url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(url) for url in urls])
+    return time.perf_counter() - start
+
+
+async def run_async_fetcher(urls: list[str], max_concurrent: int) -> float:
+    async with AsyncFetcher(max_connections=max_concurrent, per_host_limit=max_concurrent) as fetcher:
+        start = time.perf_counter()
+        await asyncio.gather(*[fetcher.fetch(url) for url in urls])
+        return time.perf_counter() - start
+
+
+def start_docs_server(pages: int, latency: float) -> tuple[subprocess.Popen, str]:
+    """Start the fake docs server in its own process so it does not compete with the client for the GIL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve().parent / "fake_docs_server.py"),
+            "--port",
+            str(port),
+            "--pages",
+            str(pages),
+            "--latency",
+            str(latency),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                break
+        except OSError:
+            time.sleep(0.1)
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.1, help="Server latency per request (seconds)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    args = parser.parse_args()
+
+    process, base_url = start_docs_server(args.pages, args.latency)
+    urls = [f"{base_url}/docs/page-{i}" for i in range(args.pages)]
+    try:
+        for concurrency in args.concurrency:
+            for name, runner in (("requests+executor", run_requests_executor), ("AsyncFetcher", run_async_fetcher)):
+                elapsed = await runner(urls, concurrency)
+                print(f"{name:>18} concurrency={concurrency:<4} {elapsed:7.2f}s  {len(urls) / elapsed:8.1f} pages/s")
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
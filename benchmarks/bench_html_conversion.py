@@ -0,0 +1,85 @@
+"""Measure HTML to markdown conversion throughput, per core, with and without main content extraction.
+
+Converts synthetic documentation pages (benchmarks/fake_docs_server.py: navigation, sidebar and footer around
+the article) in a thread of this process and in process pools of increasing size, the way the crawler's
+convert stage does. For each setup, reports pages per second of wall time, pages per second per core (pages
+over the CPU time spent converting), the share of HTML kept and the markdown and chunks produced.
+
+Usage:
+    python benchmarks/bench_html_conversion.py --pages 500 --processes 1 2 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_docs_server import render_page  # noqa: E402
+
+from chunker import chunk_text  # noqa: E402
+from html_conversion import ConversionStats, convert_page  # noqa: E402
+
+
+async def convert_all(executor: Executor, pages: List[str], main_content: bool, workers: int) -> Dict[str, float]:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(workers * 2)
+    stats = ConversionStats()
+    chunks = 0
+
+    async def convert(html: str):
+        nonlocal chunks
+        async with semaphore:
+            result = await loop.run_in_executor(executor, convert_page, html, main_content)
+        stats.add(result)
+        chunks += len(chunk_text(result.markdown, 1000))
+
+    # Start the workers before timing, as the crawler's pool is warm after its first pages.
+    await asyncio.gather(*[loop.run_in_executor(executor, convert_page, pages[0], main_content)] * workers)
+    start = time.perf_counter()
+    await asyncio.gather(*[convert(html) for html in pages])
+    elapsed = time.perf_counter() - start
+    return {
+        "pages_per_second": stats.pages / elapsed,
+        "per_core": stats.pages_per_core_second,
+        "kept": stats.kept_ratio,
+        "markdown_mb": stats.markdown_chars / 1e6,
+        "chunks": chunks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--processes", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    pages = [render_page(page).decode("utf-8") for page in range(args.pages)]
+    print(f"{args.pages} pages, {sum(map(len, pages)) / 1e6:.1f} MB of HTML, {os.cpu_count()} CPUs")
+    print(f"{'setup':<18} {'content':<8} {'pages/s':>8} {'per core':>9} {'kept':>6} {'markdown':>9} {'chunks':>7}")
+
+    setups = [("thread", 1)] + [(f"{n} processes", n) for n in args.processes]
+    for main_content in (False, True):
+        for name, workers in setups:
+            if name == "thread":
+                executor = ThreadPoolExecutor(1)
+            else:
+                executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"))
+            with executor:
+                result = asyncio.run(convert_all(executor, pages, main_content, workers))
+            print(
+                f"{name:<18} {'main' if main_content else 'page':<8} {result['pages_per_second']:>8.1f} "
+                f"{result['per_core']:>9.1f} {result['kept']:>6.0%} {result['markdown_mb']:>7.2f}MB "
+                f"{result['chunks']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
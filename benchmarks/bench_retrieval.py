@@ -0,0 +1,103 @@
+"""Compare vector and hybrid retrieval on the sample eval set (evals/data/sample_data.json).
+
+For each retrieval mode and question, measures the retrieval latency and whether every expected answer term
+appears in the retrieved chunks (same term matching as the eval notebook). With --agent, also runs the agent
+and reports its answer accuracy, runtime and number of tool calls.
+
+Runs against the configured Supabase project and OpenAI-compatible API (see example.env); the hybrid mode
+needs supabase_script/search_functions.sql.
+
+Usage:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --agent --modes vector hybrid
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+import agent_tools  # noqa: E402
+from utils import get_clients  # noqa: E402
+
+SAMPLE_DATA = PROJECT_ROOT / "evals" / "data" / "sample_data.json"
+
+
+def missing_terms(expected_answer: str, text: str) -> list[str]:
+    text = text.lower()
+    terms = [term.strip().lower() for term in expected_answer.split(",")]
+    return [term for term in terms if term and term not in text]
+
+
+async def bench_retrieval(samples: list[dict], mode: str, supabase, embedding_client):
+    latencies, found = [], 0
+    for sample in samples:
+        start = time.perf_counter()
+        docs = await agent_tools.search_documentation(supabase, embedding_client, sample["question"], mode=mode)
+        latencies.append(time.perf_counter() - start)
+        text = "\n".join(f"{doc['title']}\n{doc['content']}" for doc in docs)
+        found += not missing_terms(sample["answer"], text)
+
+    print(
+        f"{mode:>8} retrieval: {found}/{len(samples)} with every answer term  "
+        f"latency p50 {statistics.median(latencies) * 1000:6.0f} ms  max {max(latencies) * 1000:6.0f} ms"
+    )
+
+
+async def bench_agent(samples: list[dict], mode: str, supabase, embedding_client):
+    from clinia_doc_agent import CliniaDocAgentsDeps, get_agent
+
+    deps = CliniaDocAgentsDeps(supabase=supabase, embedding_client=embedding_client)
+    runtimes, tool_calls, correct = [], [], 0
+    for sample in samples:
+        start = time.perf_counter()
+        result = await get_agent().run(sample["question"], deps=deps)
+        runtimes.append(time.perf_counter() - start)
+        tool_calls.append(
+            sum(
+                1
+                for message in result.all_messages()
+                for part in getattr(message, "parts", [])
+                if part.part_kind == "tool-call"
+            )
+        )
+        correct += not missing_terms(sample["answer"], result.data)
+
+    print(
+        f"{mode:>8} agent: {correct}/{len(samples)} correct  runtime p50 {statistics.median(runtimes):5.1f}s  "
+        f"mean tool calls {statistics.mean(tool_calls):.1f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["vector", "hybrid"])
+    parser.add_argument("--agent", action="store_true", help="Also run the agent on every question")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N questions")
+    args = parser.parse_args()
+
+    samples = json.loads(SAMPLE_DATA.read_text(encoding="utf-8"))
+    if args.limit:
+        samples = samples[: args.limit]
+    embedding_client, supabase = get_clients()
+
+    for mode in args.modes:
+        # A fresh query cache per mode, so every mode pays for the same embedding calls.
+        agent_tools.query_embedding_cache = agent_tools.QueryEmbeddingCache()
+        await bench_retrieval(samples, mode, supabase, embedding_client)
+
+    if args.agent:
+        for mode in args.modes:
+            agent_tools.retrieval_mode = mode
+            agent_tools.query_embedding_cache = agent_tools.QueryEmbeddingCache()
+            await bench_agent(samples, mode, supabase, embedding_client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Measure retrieval throughput against the number of simultaneous searches.
+
+Runs `agent_tools.search_documentation` (vector mode, embedding precomputed, semantic cache off) against the
+local fake Supabase server, whose search functions answer after `--latency` seconds, with 1 to 256 searches in
+flight at once. Each level is run through the async PostgREST client and through the synchronous client in a
+thread (SUPABASE_ASYNC_RPC=false), and reports searches per second, p50/p95 latency and the worst event loop lag
+(how late a 10 ms timer fired while the searches ran).
+
+Usage:
+    python benchmarks/bench_rpc_concurrency.py --latency 0.05 --levels 1 4 16 64 256
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT / "benchmarks"))
+
+from fake_supabase_server import FAKE_SUPABASE_KEY, FakeSupabaseServer  # noqa: E402
+
+import agent_tools  # noqa: E402
+import async_rpc  # noqa: E402
+
+EMBEDDING = [1.0] + [0.0] * 1535
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: List[float], interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_level(supabase, concurrency: int, searches: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def search():
+        async with semaphore:
+            start = time.perf_counter()
+            await agent_tools.search_documentation(
+                supabase, None, "fake question", mode="vector", query_embedding=EMBEDDING
+            )
+            latencies.append(time.perf_counter() - start)
+
+    stop, lags = asyncio.Event(), []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[search() for _ in range(searches)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    await async_rpc.close_async_rpc_clients()
+
+    latencies.sort()
+    return {
+        "throughput": searches / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "max_lag": max(lags, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per search function call")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--rounds", type=int, default=4, help="Searches per level, as a multiple of the level")
+    args = parser.parse_args()
+
+    from supabase import Client
+
+    server = FakeSupabaseServer(latency=args.latency).start()
+    supabase = Client(server.url, FAKE_SUPABASE_KEY)
+    agent_tools.retrieval_cache = None
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{'client':<8} {'in flight':>9} {'searches/s':>11} {'p50':>8} {'p95':>8} {'loop lag':>9}")
+    try:
+        for client in ("thread", "async"):
+            async_rpc.SUPABASE_ASYNC_RPC = client == "async"
+            for level in args.levels:
+                result = asyncio.run(run_level(supabase, level, max(level * args.rounds, 32)))
+                print(
+                    f"{client:<8} {level:>9} {result['throughput']:>11.1f} {result['p50'] * 1000:>6.0f}ms "
+                    f"{result['p95'] * 1000:>6.0f}ms {result['max_lag'] * 1000:>7.0f}ms"
+                )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare the crawler's summary modes on a synthetic docs site.
+
+Each mode crawls the same pages through `crawl_pipeline` (fetch → convert → chunk → summarize/embed → store)
+against local fake docs and OpenAI servers, with rows written to memory. The fake model answers after
+`--latency` seconds plus `--summary-latency` seconds per title/summary it generates, so batching saves round
+trips but not generation time. For each mode, the script reports the LLM calls per page, when every chunk was
+stored and when every chunk had its summary (after the background pass in deferred mode).
+
+Usage:
+    python benchmarks/bench_summarizer.py --pages 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_docs_server import FakeDocsServer  # noqa: E402
+from fake_openai_server import FakeOpenAIConfig, FakeOpenAIServer  # noqa: E402
+
+MODES = {
+    "chunk": {"SUMMARY_MODE": "chunk", "SUMMARY_HEADING_TITLES": "false"},
+    "batch": {"SUMMARY_MODE": "batch", "SUMMARY_HEADING_TITLES": "false"},
+    "batch+headings": {"SUMMARY_MODE": "batch", "SUMMARY_HEADING_TITLES": "true"},
+    "deferred": {"SUMMARY_MODE": "deferred", "SUMMARY_HEADING_TITLES": "true"},
+}
+
+
+class MemorySink:
+    def __init__(self):
+        self.rows: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.rows[(row["url"], row["chunk_number"])] = row
+
+
+async def crawl(urls: List[str]) -> Dict[str, float]:
+    import clinia_doc_crawler
+    from chunk_writer import BatchWriter
+
+    clinia_doc_crawler.get_summarizer.cache_clear()
+    clinia_doc_crawler.get_embedding_batcher.cache_clear()
+    summarizer = clinia_doc_crawler.get_summarizer()
+    sink = MemorySink()
+
+    start = time.perf_counter()
+    async with clinia_doc_crawler.create_fetcher() as fetcher:
+        await clinia_doc_crawler.crawl_pipeline(urls, fetcher, BatchWriter(sink, flush_interval=0.2))
+    await summarizer.close()
+    await clinia_doc_crawler.get_embedding_batcher().close()
+    stored = time.perf_counter() - start
+
+    # The deferred pass of fill_pending_summaries, on the rows in memory instead of Supabase.
+    pending: Dict[str, List[Dict[str, Any]]] = {}
+    for row in sink.rows.values():
+        if not row["summary"]:
+            pending.setdefault(row["url"], []).append(row)
+
+    async def fill(url: str, rows: List[Dict[str, Any]]):
+        results = await summarizer.summarize_page(
+            url, [row["content"] for row in rows], [row["metadata"].get("heading_path") for row in rows]
+        )
+        for row, extracted in zip(rows, results, strict=True):
+            row.update(extracted)
+
+    await asyncio.gather(*[fill(url, rows) for url, rows in pending.items()])
+    await summarizer.close()
+    summarized = time.perf_counter() - start
+
+    stats = summarizer.stats
+    return {
+        "chunks": len(sink.rows),
+        "llm_calls": stats.requests,
+        "calls_per_page": stats.requests / len(urls),
+        "heading_titles": stats.heading_titles,
+        "stored_seconds": stored,
+        "summarized_seconds": summarized,
+        "missing_summaries": sum(1 for row in sink.rows.values() if not row["summary"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per LLM request")
+    parser.add_argument("--summary-latency", type=float, default=0.2, help="Seconds per generated summary")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(
+        config=FakeOpenAIConfig(request_latency=args.latency, summary_latency=args.summary_latency)
+    ).start()
+    docs_server = FakeDocsServer(pages=args.pages).start()
+    os.environ.update({"BASE_URL": openai_server.base_url, "OPENAI_API_KEY": "fake", "CONTENT_CACHE_DISABLED": "1"})
+    logging.getLogger("clinia-doc-crawler").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{'mode':<16} {'chunks':>7} {'LLM calls':>10} {'per page':>9} {'stored':>8} {'summarized':>11}")
+    try:
+        for mode in args.modes:
+            os.environ.update(MODES[mode])
+            result = asyncio.run(crawl(docs_server.page_urls()))
+            print(
+                f"{mode:<16} {result['chunks']:>7} {result['llm_calls']:>10} {result['calls_per_page']:>9.2f} "
+                f"{result['stored_seconds']:>7.1f}s {result['summarized_seconds']:>10.1f}s"
+            )
+            if result["missing_summaries"]:
+                print(f"  {result['missing_summaries']} chunks without a summary")
+    finally:
+        docs_server.stop()
+        openai_server.stop()
+
+
+if __name__ == "__main__":
+    main()
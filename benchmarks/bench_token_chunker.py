@@ -0,0 +1,130 @@
+"""Compare character and token-aware chunking on a snapshot of the documentation.
+
+Reports, for each chunking configuration, the number of chunks, their token distribution and the
+chunking/tokenization throughput. The snapshot is the crawler's markdown of every sitemap page, saved once
+under .cache/docs_snapshot so later runs are offline and comparable.
+
+Usage:
+    python benchmarks/bench_token_chunker.py --refresh          # download the live docs snapshot
+    python benchmarks/bench_token_chunker.py --max-tokens 256 512 --overlap 64
+    python benchmarks/bench_token_chunker.py --fake-pages 300   # synthetic pages, no network
+"""
+
+import argparse
+import asyncio
+import hashlib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from chunker import chunk_markdown_by_tokens, chunk_text, get_tokenizer  # noqa: E402
+
+DEFAULT_SNAPSHOT = PROJECT_ROOT / ".cache" / "docs_snapshot"
+
+
+async def download_snapshot(snapshot: Path):
+    """Fetch every page of the live sitemap and store its markdown, one file per page."""
+    from clinia_doc_crawler import convert_html_to_markdown, create_fetcher, get_clinia_docs_sitemap
+
+    urls = list(get_clinia_docs_sitemap())
+    snapshot.mkdir(parents=True, exist_ok=True)
+
+    async with create_fetcher() as fetcher:
+
+        async def save(url: str):
+            try:
+                response = await fetcher.fetch(url)
+            except Exception as e:
+                print(f"skipped {url}: {e}")
+                return
+            markdown = convert_html_to_markdown(response.text)
+            name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + ".md"
+            (snapshot / name).write_text(markdown, encoding="utf-8")
+
+        await asyncio.gather(*[save(url) for url in urls])
+    print(f"Saved {len(urls)} pages to {snapshot}")
+
+
+def fake_pages(count: int) -> list[str]:
+    from fake_docs_server import render_page
+
+    from clinia_doc_crawler import convert_html_to_markdown
+
+    return [convert_html_to_markdown(render_page(page).decode("utf-8")) for page in range(count)]
+
+
+def percentile(values: list[int], q: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(name: str, chunks: list[str], token_counts: list[int], elapsed: float, characters: int):
+    print(
+        f"{name:>28}: {len(chunks):>6} chunks  tokens p5/p50/p95/max "
+        f"{percentile(token_counts, 0.05):>4}/{percentile(token_counts, 0.5):>4}/"
+        f"{percentile(token_counts, 0.95):>4}/{max(token_counts):>5}  "
+        f"stdev {statistics.pstdev(token_counts):6.1f}  {characters / elapsed / 1e6:6.2f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot", type=Path, default=DEFAULT_SNAPSHOT)
+    parser.add_argument("--refresh", action="store_true", help="Download the live docs into the snapshot first")
+    parser.add_argument("--fake-pages", type=int, default=0, help="Use synthetic pages instead of the snapshot")
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Character chunk size")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--overlap", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.refresh:
+        asyncio.run(download_snapshot(args.snapshot))
+
+    if args.fake_pages:
+        pages = fake_pages(args.fake_pages)
+    else:
+        pages = [path.read_text(encoding="utf-8") for path in sorted(args.snapshot.glob("*.md"))]
+        if not pages:
+            sys.exit(f"No snapshot in {args.snapshot}: run with --refresh or --fake-pages")
+
+    characters = sum(len(page) for page in pages)
+    tokenizer = get_tokenizer(args.model)
+
+    start = time.perf_counter()
+    page_tokens = sum(len(tokenizer.encode(page)) for page in pages)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(pages)} pages, {characters / 1e6:.1f} MB, {page_tokens} tokens; "
+        f"tokenizer: {page_tokens / elapsed:,.0f} tokens/s ({characters / elapsed / 1e6:.2f} MB/s)"
+    )
+
+    start = time.perf_counter()
+    chunks = [chunk for page in pages for chunk in chunk_text(page, args.chunk_size)]
+    elapsed = time.perf_counter() - start
+    report(f"characters({args.chunk_size})", chunks, [len(tokenizer.encode(c)) for c in chunks], elapsed, characters)
+
+    for max_tokens in args.max_tokens:
+        start = time.perf_counter()
+        token_chunks = [
+            chunk
+            for page in pages
+            for chunk in chunk_markdown_by_tokens(page, max_tokens, tokenizer, overlap_tokens=args.overlap)
+        ]
+        elapsed = time.perf_counter() - start
+        report(
+            f"tokens({max_tokens}, overlap {args.overlap})",
+            [chunk.content for chunk in token_chunks],
+            [chunk.tokens for chunk in token_chunks],
+            elapsed,
+            characters,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Local stand-in for the documentation site: a sitemap plus synthetic HTML pages.
+
+Pages are generated deterministically from their number, support ETag/If-None-Match, and can be served
+with an artificial latency to emulate a remote host.
+
+Usage:
+    python benchmarks/fake_docs_server.py --port 8200 --pages 2000
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "entity resolution record search pipeline bundle operation property schema index query "
+    "relationship unified source matcher resolver ingestion embedding endpoint permission role"
+).split()
+
+
+@lru_cache(maxsize=4096)
+def render_page(page: int, paragraphs: int = 30, version: int = 0) -> bytes:
+    """Render a documentation-like HTML page with navigation, content, a code block and a footer."""
+    rng = random.Random(page * 1000 + version)
+    nav = "".join(f'<li><a href="/docs/page-{i}">Page {i}</a></li>' for i in range(40))
+    body = []
+    for i in range(paragraphs):
+        if i % 6 == 5:
+            body.append(f"<pre><code>curl -X POST https://api.example/v1/{rng.choice(WORDS)}\n</code></pre>")
+        body.append(f"<h2>{' '.join(rng.choices(WORDS, k=3)).title()}</h2>")
+        body.append("<p>" + " ".join(" ".join(rng.choices(WORDS, k=12)).capitalize() + "." for _ in range(5)) + "</p>")
+    html = (
+        f"<html><head><title>Page {page}</title></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        f"<aside><ul>{nav}</ul></aside>"
+        f"<main><article><h1>Page {page}</h1>{''.join(body)}</article></main>"
+        f"<footer><p>Copyright Clinia</p><ul>{nav}</ul></footer>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+class FakeDocsHandler(BaseHTTPRequestHandler):
+    server: "FakeDocsServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence the default stderr access log
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+
+        if self.path == "/sitemap.xml":
+            self._send(200, server.sitemap(), "application/xml")
+            return
+
+        if not self.path.startswith("/docs/page-"):
+            self._send(404, b"not found", "text/plain")
+            return
+
+        page = int(self.path.rsplit("-", 1)[1])
+        if page >= server.pages:
+            self._send(404, b"not found", "text/plain")
+            return
+
+        content = render_page(page, version=server.versions.get(page, 0))
+        etag = '"' + hashlib.md5(content).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", "text/html", etag=etag)
+            return
+        self._send(200, content, "text/html; charset=utf-8", etag=etag)
+
+    def _send(self, status: int, body: bytes, content_type: str, etag: str | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeDocsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, pages: int = 2000, latency: float = 0.0):
+        super().__init__(("127.0.0.1", port), FakeDocsHandler)
+        self.pages = pages
+        self.latency = latency
+        self.versions: dict[int, int] = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def page_urls(self) -> list[str]:
+        return [f"{self.base_url}/docs/page-{i}" for i in range(self.pages)]
+
+    def sitemap(self) -> bytes:
+        entries = "".join(
+            f"<url><loc>{url}</loc><lastmod>2025-01-{1 + self.versions.get(i, 0):02d}</lastmod></url>"
+            for i, url in enumerate(self.page_urls())
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+        ).encode("utf-8")
+
+    def start(self) -> "FakeDocsServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic documentation pages.")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeDocsServer(args.port, args.pages, args.latency)
+    print(f"Fake docs server listening on {server.base_url} (sitemap: {server.base_url}/sitemap.xml)")
+    server.serve_forever()
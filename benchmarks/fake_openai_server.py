@@ -0,0 +1,280 @@
+"""Local stand-in for the OpenAI embeddings, chat completions and models endpoints.
+
+Only what the crawler and the agent need is implemented. Every request sleeps for a fixed latency plus a
+per-input cost so batching effects show up in benchmarks, and the server can emulate a rate limit by
+answering 429 when too many requests are in flight.
+
+JSON-mode chat requests get a fake title and summary, or a list of them (one per `<chunk id=N>` of the
+request) for batched summaries. Chat requests offering tools emulate an agent looking up `sub_queries` aspects of
+the last user message: with a tool taking a `queries` list, one call to it with every aspect; otherwise one call to
+the first tool per model turn, each with one aspect as its `query`. Once every aspect was searched, the answer is a
+short text, streamed token by token if requested.
+
+Usage:
+    python benchmarks/fake_openai_server.py --port 8100
+    BASE_URL=http://127.0.0.1:8100/v1 python src/clinia_doc_crawler.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+@dataclass
+class FakeOpenAIConfig:
+    dimensions: int = 1536
+    request_latency: float = 0.05
+    per_input_latency: float = 0.0005
+    max_in_flight: int = 0  # 0 disables the emulated rate limit
+    error_rate: float = 0.0
+    token_latency: float = 0.0  # delay between streamed chat tokens
+    summary_latency: float = 0.0  # generation time of each title/summary in a JSON-mode answer
+    sub_queries: int = 1  # aspects of a question the fake agent searches before answering
+
+
+@dataclass
+class FakeOpenAIStats:
+    embedding_requests: int = 0
+    embedding_inputs: int = 0
+    chat_requests: int = 0
+    rate_limited: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@lru_cache(maxsize=8)
+def _base_vector(dimensions: int) -> List[float]:
+    rng = random.Random(dimensions)
+    vector = [rng.uniform(-1.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit-norm pseudo-embedding: identical texts always map to the same vector.
+
+    The vector is a rotation of a fixed random unit vector, which keeps the server cheap enough that it never
+    becomes the bottleneck of a benchmark.
+    """
+    base = _base_vector(dimensions)
+    offset = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little") % dimensions
+    return base[offset:] + base[:offset]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server: "FakeOpenAIServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence the default stderr access log
+        pass
+
+    def do_GET(self):
+        if "/models/" in self.path:
+            model = self.path.rsplit("/", 1)[-1]
+            self._send_json(200, {"id": model, "object": "model", "created": 0, "owned_by": "fake"})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+
+        with server.stats.lock:
+            server.in_flight += 1
+            over_limit = server.config.max_in_flight and server.in_flight > server.config.max_in_flight
+        try:
+            if over_limit or random.random() < server.config.error_rate:
+                with server.stats.lock:
+                    server.stats.rate_limited += 1
+                self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}})
+                return
+
+            if self.path.endswith("/embeddings"):
+                self._handle_embeddings(body)
+            elif self.path.endswith("/chat/completions"):
+                self._handle_chat(body)
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        finally:
+            with server.stats.lock:
+                server.in_flight -= 1
+
+    def _handle_embeddings(self, body: dict):
+        config = self.server.config
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        time.sleep(config.request_latency + config.per_input_latency * len(inputs))
+
+        dimensions = body.get("dimensions") or config.dimensions
+        data = []
+        for index, text in enumerate(inputs):
+            vector = fake_embedding(str(text), dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        with self.server.stats.lock:
+            self.server.stats.embedding_requests += 1
+            self.server.stats.embedding_inputs += len(inputs)
+
+        tokens = sum(len(str(text)) // 4 + 1 for text in inputs)
+        self._send_json(
+            200,
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "text-embedding-3-small"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            },
+        )
+
+    def _handle_chat(self, body: dict):
+        messages = body.get("messages", [])
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        chunk_ids = re.findall(r"<chunk id=(\d+)>", str(messages[-1].get("content") or "")) if messages else []
+        summaries = max(len(chunk_ids), 1) if json_mode else 0
+        time.sleep(self.server.config.request_latency + self.server.config.summary_latency * summaries)
+        with self.server.stats.lock:
+            self.server.stats.chat_requests += 1
+
+        message, finish_reason = {"role": "assistant", "content": "This is a fake answer."}, "stop"
+        if body.get("tools") and (tool_call := self._next_tool_call(body["tools"], messages)) is not None:
+            message, finish_reason = {"role": "assistant", "content": None, "tool_calls": [tool_call]}, "tool_calls"
+        elif json_mode and chunk_ids:
+            summaries = [{"id": int(i), "title": f"Fake title {i}", "summary": "Fake summary"} for i in chunk_ids]
+            message["content"] = json.dumps({"chunks": summaries})
+        elif json_mode:
+            message["content"] = json.dumps({"title": "Fake title", "summary": "Fake summary"})
+
+        if body.get("stream"):
+            self._stream_chat(body, message, finish_reason)
+            return
+
+        self._send_json(
+            200,
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o-mini"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+            },
+        )
+
+    def _next_tool_call(self, tools: List[dict], messages: List[dict]) -> dict | None:
+        question = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "")
+        aspects = [question] + [f"{question} (aspect {i})" for i in range(1, self.server.config.sub_queries)]
+        searched = sum(1 for m in messages if m.get("role") == "tool")
+        multi = next((t for t in tools if "queries" in t["function"].get("parameters", {}).get("properties", {})), None)
+        if multi is not None:
+            name, arguments = multi["function"]["name"], {"queries": aspects}
+            if searched:
+                return None
+        else:
+            name, arguments = tools[0]["function"]["name"], {"query": aspects[searched % len(aspects)]}
+            if searched >= len(aspects):
+                return None
+        return {
+            "id": f"call_fake_{searched}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+
+    def _stream_chat(self, body: dict, message: dict, finish_reason: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def send_chunk(delta: dict, finish: str | None = None):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o-mini"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        if message.get("tool_calls"):
+            send_chunk({"role": "assistant", "tool_calls": [{"index": 0, **message["tool_calls"][0]}]})
+        else:
+            for index, token in enumerate(message["content"].split(" ")):
+                if index:
+                    time.sleep(self.server.config.token_latency)
+                send_chunk({"role": "assistant", "content": token if index == 0 else " " + token})
+        send_chunk({}, finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens = sum(len(str(m.get("content") or "")) // 4 + 1 for m in body.get("messages", []))
+            completion_tokens = len((message.get("content") or "").split(" ")) if not message.get("tool_calls") else 10
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "gpt-4o-mini"),
+                "choices": [],
+                "usage": usage,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict):
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, config: FakeOpenAIConfig | None = None):
+        super().__init__(("127.0.0.1", port), FakeOpenAIHandler)
+        self.config = config or FakeOpenAIConfig()
+        self.stats = FakeOpenAIStats()
+        self.in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI server.")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-in-flight", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        args.port, FakeOpenAIConfig(request_latency=args.latency, max_in_flight=args.max_in_flight)
+    )
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    server.serve_forever()
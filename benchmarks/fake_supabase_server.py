@@ -0,0 +1,121 @@
+"""Local stand-in for the Supabase REST (PostgREST) endpoints used by the agent.
+
+`POST /rest/v1/rpc/<function>` answers any search function with `match_count` fake documentation rows (with
+their embeddings truncated to `embedding_dimensions` if requested) and
+`GET /rest/v1/<table>` returns a single row (enough for health checks). Every request sleeps for a fixed latency.
+
+Usage:
+    python benchmarks/fake_supabase_server.py --port 8200
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Supabase clients only accept JWT-shaped keys.
+FAKE_SUPABASE_KEY = "fake.fake.fake"
+
+
+@dataclass
+class FakeSupabaseStats:
+    rpc_requests: int = 0
+    table_requests: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def fake_embedding(page: int, index: int, dimensions: int) -> str:
+    """A unit vector close to the other chunks of the same page, formatted like PostgREST formats vectors."""
+    page_rng, chunk_rng = random.Random(page), random.Random(1000 + index)
+    vector = [page_rng.gauss(0, 1) + 0.5 * chunk_rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector))
+    return "[" + ",".join(f"{v / norm:.4f}" for v in vector) + "]"
+
+
+def fake_rows(count: int, embedding_dimensions: int = 0):
+    """Search results of about 1000 characters each; every three consecutive rows are chunks of one page."""
+    rows = []
+    for index in range(count):
+        page = index // 3
+        row = {
+            "id": index,
+            "url": f"https://docs.example/page-{page}",
+            "chunk_number": index % 3,
+            "title": f"Fake page {page}",
+            "summary": f"Fake summary of chunk {index % 3} of page {page}.",
+            "content": f"Fake documentation content {index} about entities, records and search. " * 14,
+            "metadata": {"source": "clinia_docs"},
+            "similarity": 1.0 - index / 100,
+        }
+        if embedding_dimensions:
+            row["embedding"] = fake_embedding(page, index, embedding_dimensions)
+        rows.append(row)
+    return rows
+
+
+class FakeSupabaseHandler(BaseHTTPRequestHandler):
+    server: "FakeSupabaseServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence the default stderr access log
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        with self.server.stats.lock:
+            self.server.stats.table_requests += 1
+        self._send_json(200, [{"id": 0}])
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.server.latency)
+        if "/rpc/" not in self.path:
+            self._send_json(404, {"message": f"Unknown path {self.path}"})
+            return
+        with self.server.stats.lock:
+            self.server.stats.rpc_requests += 1
+        self._send_json(200, fake_rows(int(body.get("match_count") or 10), int(body.get("embedding_dimensions") or 0)))
+
+    def _send_json(self, status: int, payload):
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class FakeSupabaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, port: int = 0, latency: float = 0.02):
+        super().__init__(("127.0.0.1", port), FakeSupabaseHandler)
+        self.latency = latency
+        self.stats = FakeSupabaseStats()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeSupabaseServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake Supabase REST server.")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeSupabaseServer(args.port, args.latency)
+    print(f"Fake Supabase server listening on {server.url} (key: {FAKE_SUPABASE_KEY})")
+    server.serve_forever()
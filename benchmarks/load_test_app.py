@@ -0,0 +1,125 @@
+"""Load test of the Streamlit app's resource layer: N simultaneous sessions asking questions.
+
+Each session is a thread, like a Streamlit session, asking `--questions` questions in a row through
+`AppResources.stream_answer` (the app's code path) against local fake backends: the fake OpenAI server (one
+retrieval tool call then a streamed answer, embeddings) and the fake Supabase server. Reports, per number of
+sessions, the throughput and the p50/p95/max time to first token and total latency.
+
+Usage:
+    python benchmarks/load_test_app.py --sessions 1 10 50 --questions 5
+    python benchmarks/load_test_app.py --sessions 100 --llm-latency 0.5 --token-latency 0.02
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_openai_server import FakeOpenAIConfig, FakeOpenAIServer  # noqa: E402
+from fake_supabase_server import FAKE_SUPABASE_KEY, FakeSupabaseServer  # noqa: E402
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_sessions(resources, sessions: int, questions: int, round_id: int):
+    ttfts, latencies, errors = [], [], []
+    lock = threading.Lock()
+
+    def session(session_id: int):
+        for question in range(questions):
+            start = time.perf_counter()
+            try:
+                # Distinct questions, so every one pays for its query embedding.
+                answer = resources.stream_answer(
+                    f"How do I use feature {round_id}-{session_id}-{question}?", on_text=lambda delta: None
+                )
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                ttfts.append(answer.time_to_first_token or 0.0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    if latencies:
+        print(
+            f"{sessions:>5} sessions: {len(latencies) / elapsed:7.1f} answers/s  "
+            f"ttft p50/p95/max {statistics.median(ttfts) * 1000:6.0f}/{percentile(ttfts, 0.95) * 1000:6.0f}/"
+            f"{max(ttfts) * 1000:6.0f} ms  latency p50/p95/max {statistics.median(latencies) * 1000:6.0f}/"
+            f"{percentile(latencies, 0.95) * 1000:6.0f}/{max(latencies) * 1000:6.0f} ms  errors {len(errors)}"
+        )
+    else:
+        print(f"{sessions:>5} sessions: every question failed, e.g. {errors[:1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--questions", type=int, default=5, help="Questions asked in a row by each session")
+    parser.add_argument("--max-concurrent-runs", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake OpenAI latency per request (s)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Fake delay between streamed tokens (s)")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="Fake Supabase latency per request (s)")
+    args = parser.parse_args()
+
+    openai_server = FakeOpenAIServer(
+        config=FakeOpenAIConfig(request_latency=args.llm_latency, token_latency=args.token_latency)
+    ).start()
+    supabase_server = FakeSupabaseServer(latency=args.db_latency).start()
+
+    # The agent's model reads these when it is first created.
+    os.environ.update(
+        {
+            "BASE_URL": openai_server.base_url,
+            "OPENAI_API_KEY": "fake",
+            "RETRIEVAL_BACKEND": "supabase",
+            "RETRIEVAL_MODE": "vector",
+            "CONTENT_CACHE_DISABLED": "1",
+            "LOGFIRE_SEND_TO_LOGFIRE": "false",
+            "LOGFIRE_CONSOLE": "false",
+        }
+    )
+    from openai import AsyncOpenAI
+    from supabase import Client
+
+    from app_resources import AppResources
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    resources = AppResources(
+        embedding_client=AsyncOpenAI(base_url=openai_server.base_url, api_key="fake"),
+        supabase=Client(supabase_server.url, FAKE_SUPABASE_KEY),
+        max_concurrent_runs=args.max_concurrent_runs,
+    )
+    print(f"Health: {resources.health()}")
+    try:
+        for round_id, sessions in enumerate(args.sessions):
+            run_sessions(resources, sessions, args.questions, round_id)
+    finally:
+        resources.close()
+        openai_server.stop()
+        supabase_server.stop()
+
+    print(
+        f"Backend requests: {openai_server.stats.chat_requests} chat, {openai_server.stats.embedding_requests} "
+        f"embeddings, {supabase_server.stats.rpc_requests} searches"
+    )
+
+
+if __name__ == "__main__":
+    main()
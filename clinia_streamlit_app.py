@@ -1,13 +1,33 @@
-import asyncio
-
 import streamlit as st
 
-from src.clinia_doc_agent import CliniaDocAgentsDeps, clinia_docs_agent
-from src.utils import get_clients
+# Imported like the agent imports them, so these are the same modules, clients and caches the agent's tool uses.
+from agent_tools import prewarm_query_cache
+from app_resources import get_app_resources
 
 st.set_page_config(page_title="Clinia Doc Chat", layout="centered")
 st.title("💬 Clinia Documentation Chat")
 
+
+# One set of clients and one event loop for every session and rerun of this server process.
+resources = get_app_resources()
+
+
+@st.cache_resource
+def prewarm_once() -> int:
+    """Embed the evaluation questions once per server process so they are served from the query cache."""
+    try:
+        return resources.run(prewarm_query_cache(resources.embedding_client))
+    except Exception:
+        return 0
+
+
+prewarm_once()
+
+with st.sidebar:
+    if st.button("Check backends"):
+        st.json(resources.health())
+    st.caption(f"Agent runs in progress: {resources.stats.in_flight}")
+
 if "history" not in st.session_state:
     st.session_state["history"] = []
 
@@ -15,25 +35,30 @@ query = st.text_input("Ask your question about Clinia documentation:", "")
 
 submit = st.button("Send")
 
-async def ask_agent(query):
-    embedding_client, supabase = get_clients()
-    deps = CliniaDocAgentsDeps(supabase=supabase, embedding_client=embedding_client)
-    response = await clinia_docs_agent.run(query, deps=deps)
-    return response.data
-
-if submit and query:
-    st.session_state["history"].append(("user", query))
-    with st.spinner("The agent is thinking..."):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            answer = loop.run_until_complete(ask_agent(query))
-        finally:
-            loop.close()
-    st.session_state["history"].append(("agent", answer))
-
 for role, msg in st.session_state["history"]:
     if role == "user":
         st.markdown(f"**You:** {msg}")
     else:
         st.markdown(f"**Clinia Agent:** {msg}")
+
+
+if submit and query:
+    st.markdown(f"**You:** {query}")
+    status = st.status("The agent is thinking...")
+    answer_placeholder = st.empty()
+    pieces = []
+
+    def show_text(delta):
+        pieces.append(delta)
+        answer_placeholder.markdown(f"**Clinia Agent:** {''.join(pieces)}▌")
+
+    answer = resources.stream_answer(
+        query, on_text=show_text, on_progress=lambda message: status.write(f"🔎 {message}")
+    )
+    status.update(
+        label=f"First token after {answer.time_to_first_token or 0:.1f}s, answered in {answer.runtime:.1f}s",
+        state="complete",
+    )
+    answer_placeholder.markdown(f"**Clinia Agent:** {answer.text}")
+    st.session_state["history"].append(("user", query))
+    st.session_state["history"].append(("agent", answer.text))
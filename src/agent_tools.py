@@ -1,11 +1,111 @@
-from typing import List
+from __future__ import annotations
 
-from openai import AsyncOpenAI
-from supabase import Client
+import asyncio
+import json
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
 
+import logfire
+
+from async_rpc import get_async_rpc_client
+from content_cache import cache_key, get_content_cache
+from context_packing import pack_context, parse_embeddings
+from corpus_versions import CorpusSwapError, CorpusVersions
+from local_index import get_local_index
+from query_embedding_cache import QueryEmbeddingCache, normalize_query
+from semantic_cache import HIT, MISS, SemanticCache
 from utils import get_env_var
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import Client
+
 embedding_model = get_env_var("EMBEDDING_MODEL") or "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+
+# The agent often re-issues the same query within a run, and different users ask the same questions.
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=int(get_env_var("QUERY_CACHE_MAX_ENTRIES") or 1024),
+    ttl=float(get_env_var("QUERY_CACHE_TTL") or 3600),
+)
+
+# Paraphrased questions ("what are the two types of search", "types of search in clinia") share the chunks retrieved
+# for the first one. Both semantic caches are dropped when the corpus version changes.
+retrieval_cache: Optional[SemanticCache] = (
+    None
+    if get_env_var("SEMANTIC_CACHE_DISABLED")
+    else SemanticCache(
+        threshold=float(get_env_var("SEMANTIC_CACHE_THRESHOLD") or 0.92),
+        max_entries=int(get_env_var("SEMANTIC_CACHE_MAX_ENTRIES") or 512),
+        ttl=float(get_env_var("SEMANTIC_CACHE_TTL") or 3600),
+    )
+)
+
+# Whole answers of near-identical questions, skipping the agent run. Off unless ANSWER_CACHE_ENABLED is set: unlike
+# retrieved chunks, an answer cannot be adapted by the model to the nuances of the new question.
+answer_cache: Optional[SemanticCache] = (
+    SemanticCache(
+        threshold=float(get_env_var("ANSWER_CACHE_THRESHOLD") or 0.97),
+        max_entries=int(get_env_var("ANSWER_CACHE_MAX_ENTRIES") or 256),
+        ttl=float(get_env_var("ANSWER_CACHE_TTL") or 3600),
+    )
+    if get_env_var("ANSWER_CACHE_ENABLED")
+    else None
+)
+
+# Seconds between two checks of the corpus version by the semantic caches.
+CORPUS_VERSION_CHECK_INTERVAL = float(get_env_var("CORPUS_VERSION_CHECK_INTERVAL") or 60)
+_corpus_version_checked_at = float("-inf")
+
+# "supabase" or "local" (an exported snapshot of site_pages searched in process, see local_index.py).
+retrieval_backend = get_env_var("RETRIEVAL_BACKEND") or "supabase"
+
+# "vector" (match_site_pages only) or "hybrid" (full-text + vector with reciprocal rank fusion).
+retrieval_mode = get_env_var("RETRIEVAL_MODE") or "vector"
+
+# Per-query knobs of the vector index: recall (hnsw.ef_search / ivfflat.probes) and, for a quantized or truncated
+# index, its quantization, dimensions and rescoring shortlist size. They must match the index, see vector_index.sql.
+# Unset values keep the defaults of the search functions.
+vector_search_params: Dict[str, Any] = {
+    name: cast(value)
+    for name, cast, value in (
+        ("ef_search", int, get_env_var("VECTOR_EF_SEARCH")),
+        ("probes", int, get_env_var("VECTOR_PROBES")),
+        ("quantization", str, get_env_var("VECTOR_QUANTIZATION")),
+        ("dimensions", int, get_env_var("VECTOR_DIMENSIONS")),
+        ("rescore_factor", int, get_env_var("VECTOR_RESCORE_FACTOR")),
+    )
+    if value
+}
+
+# Packing of the retrieval tool output (see context_packing.py): the number of chunks searched, the token budget of
+# the packed text, the weight of diversity in the selection and whether only the chunk summaries are used.
+CONTEXT_CANDIDATES = int(get_env_var("CONTEXT_CANDIDATES") or 10)
+CONTEXT_TOKEN_BUDGET = int(get_env_var("CONTEXT_TOKEN_BUDGET") or 2000)
+CONTEXT_DIVERSITY = float(get_env_var("CONTEXT_DIVERSITY") or 0.3)
+CONTEXT_SUMMARIES_ONLY = (get_env_var("CONTEXT_SUMMARIES_ONLY") or "false").lower() == "true"
+# Leading embedding dimensions returned with each search result for the diversity selection. Needs the search
+# functions of the current search_functions.sql; 0 returns no embeddings and keeps the search order.
+CONTEXT_EMBEDDING_DIMENSIONS = int(get_env_var("CONTEXT_EMBEDDING_DIMENSIONS") or 256)
+
+# Whether the agent gets the multi-query retrieval tool, and the most sub-queries it may search in one call.
+MULTI_QUERY_TOOL = (get_env_var("MULTI_QUERY_TOOL") or "true").lower() == "true"
+MAX_SUB_QUERIES = int(get_env_var("MAX_SUB_QUERIES") or 5)
+# Rank constant of the reciprocal rank fusion of sub-query results, as in hybrid_search_site_pages.
+FUSION_RRF_K = 60
+
+QUESTION_WORDS = {"what", "how", "why", "when", "where", "which", "who", "can", "does", "do", "is", "are", "should"}
+MAX_IDENTIFIER_WORDS = 3
+IDENTIFIER_WORD_RE = re.compile(r"[A-Za-z_][\w./:\-]*")
+QUOTED_QUERY_RE = re.compile(r"([\"'`]).+\1")
+# Quoted terms, snake_case, camelCase, dotted or slashed names and ALLCAPS words.
+CODE_TERM_RE = re.compile(r"[\"`]|\b\w+_\w+\b|\b[a-z]+[A-Z]\w*\b|\b\w+[./]\w+\b|\b[A-Z]{2,}\b")
+
+SAMPLE_DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "evals", "data", "sample_data.json"
+)
 
 
 async def get_embedding(text: str, embedding_client: AsyncOpenAI) -> List[float]:
@@ -19,50 +119,505 @@ async def get_embedding(text: str, embedding_client: AsyncOpenAI) -> List[float]
     Returns:
         List[float]: The embedding vector for the text, or a zero vector on error.
     """
+    cache = get_content_cache()
+    key = cache_key(embedding_model, "embedding", text)
+    if cache is not None and (cached := cache.get_embedding(key)) is not None:
+        return cached
+
     try:
         response = await embedding_client.embeddings.create(model=embedding_model, input=text)
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if cache is not None:
+            cache.put_embedding(key, embedding)
+        return embedding
     except Exception as e:
         print(f"Error getting embedding: {e}")
-        return [0] * 1536  # Return zero vector on error
+        return [0.0] * EMBEDDING_DIMENSIONS  # Return zero vector on error
+
+
+async def get_query_embedding(query: str, embedding_client: AsyncOpenAI) -> List[float]:
+    """
+    Get the embedding of a search query through the in-memory query cache.
+
+    Identical (normalized) queries are served from the cache, and concurrent ones share a single API call.
+    The outcome, the hit rate and the latency saved so far are recorded on a logfire span.
+
+    Args:
+        query (str): The search query.
+        embedding_client (AsyncOpenAI): The OpenAI client to use for embedding.
+
+    Returns:
+        List[float]: The embedding vector for the query, or a zero vector on error.
+    """
+    with logfire.span("query embedding {search_query=}", search_query=query) as span:
+        try:
+            embedding, outcome = await query_embedding_cache.get(
+                query, lambda text: _embed_query(text, embedding_client)
+            )
+        except ValueError:
+            embedding, outcome = [0.0] * EMBEDDING_DIMENSIONS, "error"
 
+        stats = query_embedding_cache.stats
+        span.set_attributes(
+            {
+                "cache_outcome": outcome,
+                "cache_hit_rate": stats.hit_rate,
+                "cache_saved_seconds": stats.saved_seconds,
+                "cache_entries": len(query_embedding_cache),
+            }
+        )
+        return embedding
 
-async def retrieve_relevant_documentation_tool(supabase: Client, embedding_client: AsyncOpenAI, user_query: str) -> str:
+
+async def _embed_query(query: str, embedding_client: AsyncOpenAI) -> List[float]:
+    embedding = await get_embedding(query, embedding_client)
+    if not any(embedding):
+        # get_embedding returns a zero vector on error: do not cache it.
+        raise ValueError(f"Could not embed query: {query}")
+    return embedding
+
+
+async def get_query_embeddings(queries: List[str], embedding_client: AsyncOpenAI) -> List[List[float]]:
     """
-    Retrieve and format the most relevant documentation chunks for a user query using vector search.
+    Get the embeddings of several search queries, with one API request for all those not in the query cache.
+
+    Args:
+        queries (List[str]): The search queries.
+        embedding_client (AsyncOpenAI): The OpenAI client to use for embedding.
+
+    Returns:
+        List[List[float]]: The embedding of each query. If the batched request fails, each query is embedded on
+            its own (a zero vector on error).
+    """
+    with logfire.span("query embeddings", queries=len(queries)) as span:
+        try:
+            served = await query_embedding_cache.get_many(
+                queries, lambda texts: _embed_queries(texts, embedding_client)
+            )
+        except Exception as e:
+            logfire.warn("Batched query embedding failed: {error}", error=str(e))
+            return list(await asyncio.gather(*[get_query_embedding(query, embedding_client) for query in queries]))
+
+        stats = query_embedding_cache.stats
+        span.set_attributes(
+            {
+                "cache_misses": sum(1 for _, outcome in served if outcome != HIT),
+                "cache_hit_rate": stats.hit_rate,
+                "cache_entries": len(query_embedding_cache),
+            }
+        )
+        return [embedding for embedding, _ in served]
+
+
+async def _embed_queries(queries: List[str], embedding_client: AsyncOpenAI) -> List[List[float]]:
+    response = await embedding_client.embeddings.create(model=embedding_model, input=queries)
+    return [data.embedding for data in sorted(response.data, key=lambda data: data.index)]
+
+
+async def prewarm_query_cache(embedding_client: AsyncOpenAI, path: str = SAMPLE_DATA_PATH) -> int:
+    """
+    Embed the questions of the evaluation set ahead of time so the first users asking them hit the cache.
+
+    Args:
+        embedding_client (AsyncOpenAI): The OpenAI client to use for embedding.
+        path (str, optional): A JSON list of {"question": ...} objects. Defaults to evals/data/sample_data.json.
+
+    Returns:
+        int: The number of questions embedded.
+    """
+    with open(path, encoding="utf-8") as f:
+        questions = [item["question"] for item in json.load(f)]
+
+    with logfire.span("prewarm query embedding cache", questions=len(questions)) as span:
+        warmed = await query_embedding_cache.prewarm(questions, lambda text: _embed_query(text, embedding_client))
+        span.set_attribute("embedded", warmed)
+        return warmed
+
+
+def clear_query_caches():
+    """Drop the cached query embeddings, search results and answers, e.g. before a repeatable measurement."""
+    query_embedding_cache.clear()
+    for cache in (retrieval_cache, answer_cache):
+        if cache is not None:
+            cache.clear()
+
+
+async def sync_corpus_version(supabase: Optional[Client], backend: Optional[str] = None):
+    """
+    Drop the semantic caches if the corpus changed since they were filled.
+
+    The version is checked at most every CORPUS_VERSION_CHECK_INTERVAL seconds: `current_corpus_version()` for
+    Supabase (it changes on every swap and every incremental crawl), the export time of the local snapshot.
+    If it cannot be read, the caches are kept and their entries only expire.
+
+    Args:
+        supabase (Optional[Client]): The Supabase client for database access.
+        backend (Optional[str], optional): "supabase" or "local". Defaults to RETRIEVAL_BACKEND.
+    """
+    global _corpus_version_checked_at
+    caches = [cache for cache in (retrieval_cache, answer_cache) if cache is not None]
+    now = time.monotonic()
+    if not caches or now - _corpus_version_checked_at < CORPUS_VERSION_CHECK_INTERVAL:
+        return
+    _corpus_version_checked_at = now
+
+    if (backend or retrieval_backend) == "local":
+        version = get_local_index().manifest.get("exported_at")
+    elif supabase is None:
+        return
+    else:
+        try:
+            version = await _current_corpus_version(supabase)
+        except CorpusSwapError as e:
+            logfire.warn("Could not read the corpus version: {error}", error=str(e))
+            return
+
+    for cache in caches:
+        if cache.set_version(version):
+            logfire.info("Corpus changed to {version}, semantic cache dropped", version=version)
+
+
+async def _current_corpus_version(supabase: Client) -> str:
+    client = get_async_rpc_client(supabase)
+    if client is None:
+        return await asyncio.to_thread(CorpusVersions(supabase).current)
+    try:
+        return await client.rpc("current_corpus_version", {})
+    except Exception as e:
+        raise CorpusSwapError(f"current_corpus_version failed: {e}") from e
+
+
+def looks_like_identifier(query: str) -> bool:
+    """
+    Tell whether a query names something (an API name, an entity, a quoted term) rather than asks a question.
+
+    Such queries are answered by full-text search alone, without an embedding call.
+
+    Args:
+        query (str): The search query.
+
+    Returns:
+        bool: True for short queries without question words, or fully quoted/backticked queries.
+    """
+    query = query.strip()
+    if QUOTED_QUERY_RE.fullmatch(query):
+        return True
+    words = query.split()
+    return (
+        0 < len(words) <= MAX_IDENTIFIER_WORDS
+        and not query.endswith("?")
+        and words[0].casefold() not in QUESTION_WORDS
+        and all(IDENTIFIER_WORD_RE.fullmatch(word) for word in words)
+    )
+
+
+def full_text_weight_for(query: str) -> float:
+    """
+    Return the weight of full-text results in the fusion: exact names in the query favour keyword matches.
+
+    Args:
+        query (str): The search query.
+
+    Returns:
+        float: 2.0 if the query quotes a term or contains code-like identifiers, 1.0 otherwise.
+    """
+    return 2.0 if CODE_TERM_RE.search(query) else 1.0
+
+
+async def search_documentation(
+    supabase: Client,
+    embedding_client: AsyncOpenAI,
+    query: str,
+    mode: Optional[str] = None,
+    match_count: int = 10,
+    keyword_weight: Optional[float] = None,
+    backend: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Search the documentation chunks of a query.
+
+    In "vector" mode, only `match_site_pages` runs. In "hybrid" mode, `hybrid_search_site_pages` merges
+    full-text and vector results with reciprocal rank fusion; identifier-like queries first try full-text
+    search alone and only fall back to the fused search (and its embedding call) if it finds nothing.
+    The "local" backend has no full-text index and always runs a vector search on the local snapshot.
+    Searches that need an embedding first look for the rows of a similar earlier query in `retrieval_cache`.
+
+    Args:
+        supabase (Client): The Supabase client for database access.
+        embedding_client (AsyncOpenAI): The OpenAI client for embedding generation.
+        query (str): The search query.
+        mode (Optional[str], optional): "vector" or "hybrid". Defaults to RETRIEVAL_MODE.
+        match_count (int, optional): The number of chunks to return. Defaults to 10.
+        keyword_weight (Optional[float], optional): The weight of full-text results relative to vector results
+            in hybrid mode. Defaults to `full_text_weight_for(query)`.
+        backend (Optional[str], optional): "supabase" or "local". Defaults to RETRIEVAL_BACKEND.
+        query_embedding (Optional[List[float]], optional): The embedding of the query, if already computed.
+
+    Returns:
+        List[Dict[str, Any]]: The matching 'site_pages' rows, best first.
+    """
+    mode = mode or retrieval_mode
+    backend = backend or retrieval_backend
+    metadata_filter = {"source": "clinia_docs"}
+    search_params = dict(vector_search_params)
+    if CONTEXT_EMBEDDING_DIMENSIONS:
+        search_params["embedding_dimensions"] = CONTEXT_EMBEDDING_DIMENSIONS
+
+    with logfire.span("search documentation {mode=}", mode=mode, backend=backend) as span:
+        if retrieval_cache is not None:
+            await sync_corpus_version(supabase, backend)
+
+        if backend == "local":
+            query_embedding = query_embedding or await get_query_embedding(query, embedding_client)
+
+            async def search():
+                return get_local_index().search(
+                    query_embedding, match_count, metadata_filter, CONTEXT_EMBEDDING_DIMENSIONS
+                )
+
+            return await _semantically_cached(span, query_embedding, f"local:{match_count}", search)
+
+        if mode != "hybrid":
+            query_embedding = query_embedding or await get_query_embedding(query, embedding_client)
+            params = {
+                "query_embedding": query_embedding,
+                "match_count": match_count,
+                "filter": metadata_filter,
+                **search_params,
+            }
+            return await _semantically_cached(
+                span, query_embedding, _scope("vector", params), lambda: _rpc(supabase, "match_site_pages", params)
+            )
+
+        params = {
+            "query_text": query,
+            "match_count": match_count,
+            "filter": metadata_filter,
+            "full_text_weight": keyword_weight if keyword_weight is not None else full_text_weight_for(query),
+            **search_params,
+        }
+        if looks_like_identifier(query):
+            rows = await _rpc(supabase, "hybrid_search_site_pages", {**params, "query_embedding": None})
+            span.set_attribute("keyword_fast_path", bool(rows))
+            if rows:
+                return rows
+
+        scope = _scope("hybrid", params)
+        params["query_embedding"] = query_embedding or await get_query_embedding(query, embedding_client)
+        return await _semantically_cached(
+            span, params["query_embedding"], scope, lambda: _rpc(supabase, "hybrid_search_site_pages", params)
+        )
+
+
+def _scope(mode: str, params: Dict[str, Any]) -> str:
+    # Everything the rows depend on besides the query (the text of the query only weighs in hybrid mode).
+    return mode + json.dumps(
+        {name: value for name, value in params.items() if name not in ("query_text", "query_embedding")},
+        sort_keys=True,
+    )
+
+
+async def _semantically_cached(
+    span, query_embedding: List[float], scope: str, search: Callable[[], Awaitable[List[Dict[str, Any]]]]
+) -> List[Dict[str, Any]]:
+    # Serve the rows of a similar earlier query, or run the search and cache its rows.
+    if retrieval_cache is None or not any(query_embedding):
+        return await search()
+
+    if (cached := retrieval_cache.lookup(query_embedding, scope)) is not None:
+        rows, similarity = cached
+        span.set_attributes(
+            {"semantic_cache": HIT, "semantic_similarity": similarity, **retrieval_cache.stats_attributes()}
+        )
+        return rows
+
+    start = time.perf_counter()
+    rows = await search()
+    if rows:
+        retrieval_cache.put(query_embedding, rows, scope, cost=time.perf_counter() - start)
+    span.set_attributes({"semantic_cache": MISS, **retrieval_cache.stats_attributes()})
+    return rows
+
+
+async def _rpc(supabase: Client, name: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Through the async PostgREST client: waiting on the database holds neither the event loop nor a thread, and
+    # the call is cut after SUPABASE_RPC_TIMEOUT. Without it, the synchronous client runs in a thread instead.
+    client = get_async_rpc_client(supabase)
+    if client is not None:
+        return parse_embeddings(await client.rpc(name, params))
+    return parse_embeddings((await asyncio.to_thread(supabase.rpc(name, params).execute)).data)
+
+
+async def search_documentation_queries(
+    supabase: Client,
+    embedding_client: AsyncOpenAI,
+    queries: List[str],
+    mode: Optional[str] = None,
+    match_count: int = 10,
+    keyword_weight: Optional[float] = None,
+    backend: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Search the documentation chunks of several sub-queries of a question at once.
+
+    The queries are embedded with one request (`get_query_embeddings`), their searches run concurrently and the
+    results are merged with `fuse_results`. In hybrid mode, identifier-like queries are not embedded up front:
+    the keyword fast path of `search_documentation` usually answers them without an embedding.
+
+    Args:
+        supabase (Client): The Supabase client for database access.
+        embedding_client (AsyncOpenAI): The OpenAI client for embedding generation.
+        queries (List[str]): The sub-queries. Repeated ones are searched once, and only the first MAX_SUB_QUERIES
+            are used.
+        mode (Optional[str], optional): "vector" or "hybrid". Defaults to RETRIEVAL_MODE.
+        match_count (int, optional): The number of chunks searched per query. Defaults to 10.
+        keyword_weight (Optional[float], optional): The weight of full-text results in hybrid mode.
+        backend (Optional[str], optional): "supabase" or "local". Defaults to RETRIEVAL_BACKEND.
+
+    Returns:
+        List[Dict[str, Any]]: The distinct matching 'site_pages' rows, best first.
+    """
+    distinct: Dict[str, str] = {}
+    for query in queries:
+        if query.strip():
+            distinct.setdefault(normalize_query(query), query)
+    queries = list(distinct.values())[:MAX_SUB_QUERIES]
+    if not queries:
+        return []
+
+    keyword_first = (mode or retrieval_mode) == "hybrid" and (backend or retrieval_backend) != "local"
+    embedded = [query for query in queries if not (keyword_first and looks_like_identifier(query))]
+    embeddings = dict(zip(embedded, await get_query_embeddings(embedded, embedding_client), strict=True))
+    results = await asyncio.gather(
+        *[
+            search_documentation(
+                supabase, embedding_client, query, mode, match_count, keyword_weight, backend, embeddings.get(query)
+            )
+            for query in queries
+        ]
+    )
+    return fuse_results(list(results))
+
+
+def fuse_results(results: List[List[Dict[str, Any]]], k: int = FUSION_RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge the results of several searches with reciprocal rank fusion, keeping each chunk once.
+
+    A chunk scores the sum of 1 / (k + rank) over the result lists it appears in, so chunks found by several
+    sub-queries come first. The fused rows are copies with a `fused_score` in place of their `similarity`.
+
+    Args:
+        results (List[List[Dict[str, Any]]]): The rows of each search, best first.
+        k (int, optional): The rank constant. Defaults to FUSION_RRF_K.
+
+    Returns:
+        List[Dict[str, Any]]: The distinct rows, best fused score first.
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for rows in results:
+        for rank, row in enumerate(rows, start=1):
+            key = (row["url"], row.get("chunk_number"))
+            if key not in fused:
+                fused[key] = {name: value for name, value in row.items() if name != "similarity"}
+                fused[key]["fused_score"] = 0.0
+            fused[key]["fused_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda row: row["fused_score"], reverse=True)
+
+
+async def retrieve_relevant_documentation_tool(
+    supabase: Client,
+    embedding_client: AsyncOpenAI,
+    user_query: str,
+    mode: Optional[str] = None,
+    keyword_weight: Optional[float] = None,
+    summaries_only: Optional[bool] = None,
+) -> str:
+    """
+    Retrieve the most relevant documentation chunks for a user query, packed into a compact context.
+
+    CONTEXT_CANDIDATES chunks are searched, then packed within CONTEXT_TOKEN_BUDGET tokens by `pack_context`:
+    diverse chunks first, consecutive chunks of a page merged, each section with its title and source URL.
 
     Args:
         supabase (Client): The Supabase client for database access.
         embedding_client (AsyncOpenAI): The OpenAI client for embedding generation.
         user_query (str): The user's query string.
+        mode (Optional[str], optional): "vector" or "hybrid". Defaults to RETRIEVAL_MODE.
+        keyword_weight (Optional[float], optional): The weight of exact keyword matches in hybrid mode.
+        summaries_only (Optional[bool], optional): Pack the chunk summaries instead of their content. Defaults to
+            CONTEXT_SUMMARIES_ONLY.
 
     Returns:
         str: Formatted documentation chunks or an error message if retrieval fails.
     """
     try:
-        query_embedding = await get_embedding(user_query, embedding_client)
+        docs = await search_documentation(
+            supabase, embedding_client, user_query, mode, CONTEXT_CANDIDATES, keyword_weight=keyword_weight
+        )
 
-        result = supabase.rpc(
-            "match_site_pages",
-            {"query_embedding": query_embedding, "match_count": 10, "filter": {"source": "clinia_docs"}},
-        ).execute()
-
-        if not result.data:
+        if not docs:
             return "No relevant documentation found."
 
-        # Format the results
-        formatted_chunks = []
-        for doc in result.data:
-            chunk_text = f"""
-                # {doc["title"]}
+        return _packed_context(docs, summaries_only)
 
-                {doc["content"]}
-            """
-            formatted_chunks.append(chunk_text)
+    except Exception as e:
+        print(f"Error retrieving documentation: {e}")
+        return f"Error retrieving documentation: {str(e)}"
+
+
+async def retrieve_documentation_for_queries_tool(
+    supabase: Client,
+    embedding_client: AsyncOpenAI,
+    queries: List[str],
+    mode: Optional[str] = None,
+    keyword_weight: Optional[float] = None,
+    summaries_only: Optional[bool] = None,
+) -> str:
+    """
+    Retrieve the documentation chunks of several sub-queries at once, fused and packed into one compact context.
+
+    Args:
+        supabase (Client): The Supabase client for database access.
+        embedding_client (AsyncOpenAI): The OpenAI client for embedding generation.
+        queries (List[str]): The sub-queries.
+        mode (Optional[str], optional): "vector" or "hybrid". Defaults to RETRIEVAL_MODE.
+        keyword_weight (Optional[float], optional): The weight of exact keyword matches in hybrid mode.
+        summaries_only (Optional[bool], optional): Pack the chunk summaries instead of their content. Defaults to
+            CONTEXT_SUMMARIES_ONLY.
 
-        # Join all chunks with a separator
-        return "\n\n---\n\n".join(formatted_chunks)
+    Returns:
+        str: Formatted documentation chunks or an error message if retrieval fails.
+    """
+    try:
+        docs = await search_documentation_queries(
+            supabase, embedding_client, queries, mode, CONTEXT_CANDIDATES, keyword_weight=keyword_weight
+        )
+
+        if not docs:
+            return "No relevant documentation found."
+
+        return _packed_context(docs, summaries_only)
 
     except Exception as e:
         print(f"Error retrieving documentation: {e}")
         return f"Error retrieving documentation: {str(e)}"
+
+
+def _packed_context(docs: List[Dict[str, Any]], summaries_only: Optional[bool]) -> str:
+    with logfire.span("pack context") as span:
+        packed = pack_context(
+            docs,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            diversity=CONTEXT_DIVERSITY,
+            summaries_only=CONTEXT_SUMMARIES_ONLY if summaries_only is None else summaries_only,
+        )
+        span.set_attributes(
+            {
+                "candidates": packed.candidates,
+                "chunks": packed.chunks,
+                "sections": packed.sections,
+                "tokens": packed.tokens,
+            }
+        )
+    return packed.text
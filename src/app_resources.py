@@ -0,0 +1,227 @@
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from openai import AsyncOpenAI
+from supabase import Client
+
+from agent_tools import embedding_model
+from async_rpc import close_async_rpc_clients
+from clinia_doc_agent import CliniaDocAgentsDeps, StreamedAnswer, stream_agent_answer
+from content_cache import close_content_cache
+from utils import get_clients, get_env_var
+
+log = logging.getLogger("clinia-doc-crawler")
+
+
+@dataclass
+class ResourceStats:
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def in_flight(self) -> int:
+        return self.started - self.completed - self.failed
+
+
+class AppResources:
+    """
+    Process-wide clients and event loop shared by every session of the Streamlit app.
+
+    One background thread runs one asyncio loop for the whole process. The OpenAI and Supabase clients, and the
+    agent's model client, are created once and keep their connection pools across questions. They must always
+    be used from the same loop, since httpx async connections are bound to the loop that opened them. Sessions
+    submit coroutines from their own threads; at most `max_concurrent_runs` agent runs execute at once and the
+    others wait their turn.
+    """
+
+    def __init__(
+        self,
+        embedding_client: Optional[AsyncOpenAI] = None,
+        supabase: Optional[Client] = None,
+        max_concurrent_runs: int = 32,
+    ):
+        if embedding_client is None:
+            embedding_client, default_supabase = get_clients()
+            supabase = supabase or default_supabase
+        self.embedding_client = embedding_client
+        self.supabase = supabase
+        self.stats = ResourceStats()
+        self._runs = asyncio.Semaphore(max_concurrent_runs)
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="app-resources-loop", daemon=True)
+        self._thread.start()
+
+    @property
+    def deps(self) -> CliniaDocAgentsDeps:
+        return CliniaDocAgentsDeps(supabase=self.supabase, embedding_client=self.embedding_client)
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """
+        Schedule a coroutine on the shared loop.
+
+        Args:
+            coro (Coroutine): The coroutine to run.
+
+        Returns:
+            concurrent.futures.Future: Its result, usable from any thread.
+        """
+        if self._closed:
+            coro.close()
+            raise RuntimeError("The app resources are closed")
+        return asyncio.run_coroutine_threadsafe(self._limited(coro), self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and wait for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stream_answer(
+        self,
+        query: str,
+        on_text: Callable[[str], None],
+        on_progress: Optional[Callable[[str], None]] = None,
+        idle_timeout: Optional[float] = 120.0,
+    ) -> StreamedAnswer:
+        """
+        Answer a question on the shared loop, calling the callbacks from the calling thread.
+
+        Streamlit elements can only be updated from their session's thread, so tokens and progress messages are
+        handed over through a queue instead of being rendered from the loop.
+
+        Args:
+            query (str): The user question.
+            on_text (Callable[[str], None]): Called with each new piece of the answer.
+            on_progress (Optional[Callable[[str], None]], optional): Called with a description of each tool call.
+            idle_timeout (Optional[float], optional): Seconds without any event before giving up. Defaults to 120.
+
+        Returns:
+            StreamedAnswer: The complete answer and its timings.
+        """
+        events: queue.Queue = queue.Queue()
+        future = self.submit(
+            stream_agent_answer(
+                query,
+                self.deps,
+                on_text=lambda delta: events.put((on_text, delta)),
+                on_progress=lambda message: events.put((on_progress, message)),
+            )
+        )
+        future.add_done_callback(lambda _: events.put(None))
+
+        try:
+            while (event := events.get(timeout=idle_timeout)) is not None:
+                callback, value = event
+                if callback is not None:
+                    callback(value)
+        except queue.Empty:
+            future.cancel()
+            raise TimeoutError(f"No answer progress for {idle_timeout}s") from None
+        return future.result()
+
+    def health(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """
+        Check the background loop and reach both backends through the shared clients.
+
+        Args:
+            timeout (float, optional): Seconds allowed for each backend check. Defaults to 5.
+
+        Returns:
+            Dict[str, bool]: Whether the event loop, the OpenAI API and Supabase are usable.
+        """
+        if self._closed or not self._thread.is_alive():
+            return {"event_loop": False, "openai": False, "supabase": False}
+        future = asyncio.run_coroutine_threadsafe(self._check_backends(timeout), self._loop)
+        try:
+            return {"event_loop": True, **future.result(timeout + 1)}
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return {"event_loop": False, "openai": False, "supabase": False}
+
+    def close(self, timeout: float = 10.0):
+        """
+        Let in-flight runs finish (up to `timeout` seconds, then cancel them), close the clients and stop the loop.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(timeout), self._loop).result(timeout + 5)
+            except Exception as e:
+                log.error(f"Error shutting down app resources: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+        if not self._loop.is_running():
+            self._loop.close()
+
+    async def _limited(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        async with self._runs:
+            with self.stats.lock:
+                self.stats.started += 1
+            try:
+                result = await coro
+            except BaseException:
+                with self.stats.lock:
+                    self.stats.failed += 1
+                raise
+            with self.stats.lock:
+                self.stats.completed += 1
+            return result
+
+    async def _check_backends(self, timeout: float) -> Dict[str, bool]:
+        async def check(name: str, probe: Coroutine[Any, Any, Any]) -> bool:
+            try:
+                await asyncio.wait_for(probe, timeout)
+                return True
+            except Exception as e:
+                log.warning(f"Health check of {name} failed: {e}")
+                return False
+
+        supabase_ok = False
+        if self.supabase is not None:
+            supabase_ok = await check(
+                "supabase",
+                asyncio.to_thread(lambda: self.supabase.table("site_pages").select("id").limit(1).execute()),
+            )
+        openai_ok = await check("openai", self.embedding_client.models.retrieve(embedding_model))
+        return {"openai": openai_ok, "supabase": supabase_ok}
+
+    async def _shutdown(self, timeout: float):
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await close_async_rpc_clients()
+        await self.embedding_client.close()
+        close_content_cache()
+
+
+@lru_cache(maxsize=1)
+def get_app_resources() -> AppResources:
+    """
+    Return the process-wide app resources, creating them on first use. They are closed when the process exits.
+
+    Returns:
+        AppResources: The shared resources, with APP_MAX_CONCURRENT_RUNS (default 32) concurrent agent runs.
+    """
+    resources = AppResources(max_concurrent_runs=int(get_env_var("APP_MAX_CONCURRENT_RUNS") or 32))
+    atexit.register(resources.close)
+    return resources
@@ -0,0 +1,172 @@
+import asyncio
+import time
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from utils import get_env_var
+
+if TYPE_CHECKING:
+    import httpx
+    from postgrest import AsyncPostgrestClient
+    from supabase import Client
+
+# Seconds allowed for one search function call, and the connections kept open to PostgREST per event loop.
+SUPABASE_RPC_TIMEOUT = float(get_env_var("SUPABASE_RPC_TIMEOUT") or 10)
+SUPABASE_MAX_CONNECTIONS = int(get_env_var("SUPABASE_MAX_CONNECTIONS") or 32)
+# Set SUPABASE_ASYNC_RPC=false to call the search functions through the synchronous client in a thread instead.
+SUPABASE_ASYNC_RPC = (get_env_var("SUPABASE_ASYNC_RPC") or "true").lower() == "true"
+
+
+class RpcTimeoutError(TimeoutError):
+    """Raised when a PostgREST function call takes longer than its timeout."""
+
+
+@dataclass
+class RpcStats:
+    requests: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    request_seconds: float = 0.0
+
+
+class AsyncRpcClient:
+    """
+    Call PostgREST functions (`/rpc/<name>`) with postgrest's async client, a timeout and a bounded connection pool.
+
+    Unlike the synchronous Supabase client run in a thread, waiting for the database holds neither a thread nor
+    the event loop, and a call that times out or is cancelled closes its connection instead of running on in
+    the background. httpx clients belong to the event loop they were created on: use `get_async_rpc_client`.
+    """
+
+    def __init__(
+        self,
+        rest_url: str,
+        headers: Dict[str, str],
+        timeout: float = 10.0,
+        max_connections: int = 32,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        schema: str = "public",
+    ):
+        self.timeout = timeout
+        self.stats = RpcStats()
+        # Calls beyond the pool size wait here: httpx's own pool queue gets slow with hundreds of waiters.
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._postgrest = _pooled_postgrest_client(rest_url, headers, schema, timeout, max_connections, transport)
+
+    async def rpc(self, name: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Call a database function through PostgREST.
+
+        Args:
+            name (str): The function name, e.g. "match_site_pages".
+            params (Dict[str, Any]): Its named arguments.
+            timeout (Optional[float], optional): Seconds allowed for the call. Defaults to the client timeout.
+
+        Returns:
+            Any: The decoded JSON result (the rows, for set-returning functions).
+
+        Raises:
+            RpcTimeoutError: If the call did not complete in time.
+            APIError: If PostgREST answered with an error.
+        """
+        from postgrest.exceptions import APIError
+
+        timeout = timeout or self.timeout
+        start = time.perf_counter()
+        self.stats.requests += 1
+        try:
+            async with asyncio.timeout(timeout), self._semaphore:
+                response = await self._postgrest.rpc(name, params).execute()
+        except TimeoutError as e:
+            self.stats.timeouts += 1
+            raise RpcTimeoutError(f"{name} did not answer within {timeout:.1f}s") from e
+        except APIError:
+            self.stats.errors += 1
+            raise
+        finally:
+            self.stats.request_seconds += time.perf_counter() - start
+        return response.data
+
+    async def close(self):
+        await self._postgrest.aclose()
+
+
+def _pooled_postgrest_client(
+    rest_url: str,
+    headers: Dict[str, str],
+    schema: str,
+    timeout: float,
+    max_connections: int,
+    transport: Optional["httpx.AsyncBaseTransport"],
+) -> "AsyncPostgrestClient":
+    import httpx
+    from postgrest import AsyncPostgrestClient
+
+    class PooledAsyncPostgrestClient(AsyncPostgrestClient):
+        # AsyncPostgrestClient takes neither connection limits nor a transport, but lets subclasses create its session.
+        def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                base_url=base_url,
+                headers=headers,
+                timeout=timeout,
+                verify=verify,
+                proxy=proxy,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                transport=transport,
+            )
+
+    return PooledAsyncPostgrestClient(rest_url, schema=schema, headers=headers, timeout=timeout)
+
+
+# One client per event loop and PostgREST endpoint: httpx clients cannot be shared across loops. The Streamlit app
+# runs every session on the one loop of AppResources, which closes its clients on shutdown; the CLIs and other
+# `asyncio.run` callers must await `close_async_rpc_clients` before their loop ends.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncRpcClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_rpc_client(supabase: "Client") -> Optional[AsyncRpcClient]:
+    """
+    Return the async PostgREST client of the running event loop for the project of a Supabase client.
+
+    The endpoint and credentials are those of `supabase`, and CLIENT_MODE record/replay applies as for the
+    synchronous client.
+
+    Args:
+        supabase (Client): The Supabase client the calls would otherwise go through.
+
+    Returns:
+        Optional[AsyncRpcClient]: The shared client, or None if SUPABASE_ASYNC_RPC=false or `supabase` has no
+            PostgREST endpoint (e.g. a test double).
+    """
+    rest_url, options = getattr(supabase, "rest_url", None), getattr(supabase, "options", None)
+    if not SUPABASE_ASYNC_RPC or rest_url is None or options is None:
+        return None
+
+    from record_replay import client_transport
+
+    # A client's semaphore holds on to its loop, so entries of loops closed without `close_async_rpc_clients`
+    # would never be collected. Their connections cannot be closed from another loop: drop them.
+    for loop in [loop for loop in _clients if loop.is_closed()]:
+        del _clients[loop]
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (rest_url, options.headers.get("Authorization", ""))
+    if key not in clients:
+        clients[key] = AsyncRpcClient(
+            rest_url,
+            dict(options.headers),
+            timeout=SUPABASE_RPC_TIMEOUT,
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            transport=client_transport(asynchronous=True),
+            schema=options.schema,
+        )
+    return clients[key]
+
+
+async def close_async_rpc_clients():
+    """Close the async PostgREST clients of the running event loop, e.g. before it ends."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    await asyncio.gather(*[client.close() for client in clients.values()])
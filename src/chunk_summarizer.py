@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import urlparse
+
+from chunker import FENCE_RE, HEADING_RE
+from content_cache import ContentCache, cache_key
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+log = logging.getLogger("clinia-doc-crawler")
+
+# "chunk": one request per chunk. "batch": the chunks of a page share JSON-mode requests. "deferred": chunks are
+# stored without a summary, which `fill_pending_summaries` adds after the crawl.
+SUMMARY_MODES = ("chunk", "batch", "deferred")
+
+# Characters of each chunk sent to the model.
+SUMMARY_INPUT_CHARS = 1000
+
+SYSTEM_PROMPT = """You are an AI that extracts titles and summaries from documentation chunks.
+    Return a JSON object with 'title' and 'summary' keys.
+    For the title: If this seems like the start of a document, extract its title. If it's a middle chunk, derive a descriptive title.
+    For the summary: Create a concise summary of the main points in this chunk.
+    Keep both title and summary concise but informative."""
+
+BATCH_SYSTEM_PROMPT = """You are an AI that extracts titles and summaries from the chunks of one documentation page.
+    Return a JSON object with a 'chunks' key: a list with one object per chunk, with 'id', 'title' and 'summary' keys.
+    For the title: If the chunk seems like the start of the document, extract its title. Otherwise, derive a descriptive title.
+    For the summary: Create a concise summary of the main points in the chunk.
+    Keep both title and summary concise but informative."""
+
+ERROR_SUMMARY = {"title": "Error processing title", "summary": "Error processing summary"}
+
+
+@dataclass
+class SummarizerStats:
+    requests: int = 0
+    chunks: int = 0
+    cache_hits: int = 0
+    heading_titles: int = 0
+    deferred: int = 0
+    failed: int = 0
+    request_seconds: float = 0.0
+    pages: set = field(default_factory=set)
+
+    @property
+    def calls_per_page(self) -> float:
+        return self.requests / len(self.pages) if self.pages else 0.0
+
+
+@dataclass
+class _PendingChunk:
+    id: int
+    content: str
+    title: Optional[str]
+    future: asyncio.Future
+    cache_key: str
+
+
+def heading_title(content: str, heading_path: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Derive the title of a chunk from the Markdown headings it is under, without calling a model.
+
+    Args:
+        content (str): The chunk text.
+        heading_path (Optional[List[str]], optional): The headings of the chunk, when the chunker recorded them.
+
+    Returns:
+        Optional[str]: The last two headings joined with " - ", or the first heading of the chunk, or None.
+    """
+    if heading_path:
+        return " - ".join(heading_path[-2:])
+    in_fence = False
+    for line in content.split("\n"):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and (heading := HEADING_RE.match(line)):
+            return heading.group(2).strip()
+    return None
+
+
+def title_from_url(url: str) -> str:
+    """Return a readable placeholder title from the last segment of a URL path, e.g. 'Data Partitions'."""
+    segment = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+    return re.sub(r"[-_]+", " ", segment).strip().title() or url
+
+
+class ChunkSummarizer:
+    """
+    Give each chunk of a crawl a title and a summary.
+
+    In "batch" mode, the chunks of a page queued within `flush_interval` of each other are packed, up to
+    `batch_size` at a time, into one JSON-mode request; chunks missing from its answer fall back to a request
+    of their own. In "deferred" mode, no request is made: chunks get a placeholder title and an empty summary,
+    and `summarize_page` fills them in later. With `heading_titles`, a chunk under a Markdown heading takes its
+    title from the heading instead of the model. Results are read from and stored in the content cache.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        mode: str = "chunk",
+        batch_size: int = 8,
+        flush_interval: float = 0.05,
+        max_concurrent: int = 64,
+        heading_titles: bool = False,
+        cache: Optional[ContentCache] = None,
+        prompt_version: str = "1",
+    ):
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode {mode!r}, expected one of {SUMMARY_MODES}")
+        self.client = client
+        self.model = model
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_concurrent = max_concurrent
+        self.heading_titles = heading_titles
+        self.cache = cache
+        self.prompt_version = prompt_version
+        self.stats = SummarizerStats()
+
+        self._pending: Dict[str, List[_PendingChunk]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._next_id = 0
+
+    async def summarize(self, content: str, url: str, heading_path: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Return the title and summary of a chunk.
+
+        Args:
+            content (str): The chunk text.
+            url (str): The source URL of the chunk.
+            heading_path (Optional[List[str]], optional): The Markdown headings the chunk is under, if known.
+
+        Returns:
+            Dict[str, str]: The 'title' and 'summary' of the chunk; the summary is empty in "deferred" mode.
+        """
+        return await self._summarize(content, url, heading_path, self.mode)
+
+    async def summarize_page(
+        self, url: str, contents: List[str], heading_paths: Optional[List[Optional[List[str]]]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Summarize chunks of one page with batched requests, whatever the mode (used to fill deferred summaries).
+
+        Args:
+            url (str): The page URL.
+            contents (List[str]): The chunk texts.
+            heading_paths (Optional[List[Optional[List[str]]]], optional): The heading path of each chunk.
+
+        Returns:
+            List[Dict[str, str]]: The 'title' and 'summary' of each chunk, in order.
+        """
+        heading_paths = heading_paths or [None] * len(contents)
+        return list(
+            await asyncio.gather(
+                *[
+                    self._summarize(content, url, path, "batch")
+                    for content, path in zip(contents, heading_paths, strict=True)
+                ]
+            )
+        )
+
+    async def _summarize(self, content: str, url: str, heading_path: Optional[List[str]], mode: str) -> Dict[str, str]:
+        self.stats.chunks += 1
+        self.stats.pages.add(url)
+        title = self._heading_title(content, heading_path)
+
+        if mode == "deferred":
+            self.stats.deferred += 1
+            return {"title": title or title_from_url(url), "summary": ""}
+
+        text = content[:SUMMARY_INPUT_CHARS]
+        key = cache_key(self.model, self.prompt_version, text)
+        if self.cache is not None and (cached := self.cache.get_summary(key)) is not None:
+            self.stats.cache_hits += 1
+            return {**cached, "title": title or cached["title"]}
+
+        item = _PendingChunk(self._new_id(), text, title, asyncio.get_running_loop().create_future(), key)
+        if mode == "chunk":
+            await self._summarize_one(url, item)
+        else:
+            self._enqueue(url, item)
+        return await item.future
+
+    async def close(self):
+        """Send whatever is still queued and wait for every in-flight request to finish."""
+        for url in list(self._pending):
+            self._flush(url)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def log_stats(self):
+        stats = self.stats
+        log.info(
+            f"Summarized {stats.chunks} chunks of {len(stats.pages)} pages in {self.mode} mode: {stats.requests} "
+            f"LLM calls ({stats.calls_per_page:.2f} per page, {stats.request_seconds:.1f}s), "
+            f"{stats.cache_hits} from cache, {stats.heading_titles} titles from headings, {stats.deferred} deferred, "
+            f"{stats.failed} failed"
+        )
+
+    def _heading_title(self, content: str, heading_path: Optional[List[str]]) -> Optional[str]:
+        if not self.heading_titles:
+            return None
+        title = heading_title(content, heading_path)
+        if title is not None:
+            self.stats.heading_titles += 1
+        return title
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _enqueue(self, url: str, item: _PendingChunk):
+        pending = self._pending.setdefault(url, [])
+        pending.append(item)
+        if len(pending) >= self.batch_size:
+            self._flush(url)
+        elif url not in self._flush_handles:
+            self._flush_handles[url] = asyncio.get_running_loop().call_later(self.flush_interval, self._flush, url)
+
+    def _flush(self, url: str):
+        if (handle := self._flush_handles.pop(url, None)) is not None:
+            handle.cancel()
+        batch = self._pending.pop(url, [])
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._summarize_batch(url, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize_batch(self, url: str, batch: List[_PendingChunk]):
+        if len(batch) == 1:
+            await self._summarize_one(url, batch[0])
+            return
+
+        chunks = "\n\n".join(f"<chunk id={item.id}>\n{item.content}\n</chunk>" for item in batch)
+        try:
+            extracted = await self._complete(BATCH_SYSTEM_PROMPT, f"URL: {url}\n\n{chunks}")
+            results = {int(result["id"]): result for result in extracted["chunks"]}
+        except Exception as e:
+            log.warning(f"Batched summary of {len(batch)} chunks of {url} failed ({e}), summarizing them one by one")
+            results = {}
+
+        for item in batch:
+            result = results.get(item.id)
+            if result is not None and "title" in result and "summary" in result:
+                self._resolve(item, {"title": result["title"], "summary": result["summary"]})
+            else:
+                await self._summarize_one(url, item)
+
+    async def _summarize_one(self, url: str, item: _PendingChunk):
+        try:
+            extracted = await self._complete(SYSTEM_PROMPT, f"URL: {url}\n\nContent:\n{item.content}...")
+            self._resolve(item, {"title": extracted["title"], "summary": extracted["summary"]})
+        except Exception as e:
+            log.error(f"Error getting title and summary: {e}")
+            self.stats.failed += 1
+            item.future.set_result({**ERROR_SUMMARY, "title": item.title or ERROR_SUMMARY["title"]})
+
+    async def _complete(self, system_prompt: str, user_prompt: str) -> Dict:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            start = time.perf_counter()
+            self.stats.requests += 1
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    response_format={"type": "json_object"},
+                )
+            finally:
+                self.stats.request_seconds += time.perf_counter() - start
+        return json.loads(response.choices[0].message.content)
+
+    def _resolve(self, item: _PendingChunk, extracted: Dict[str, str]):
+        if self.cache is not None:
+            self.cache.put_summary(item.cache_key, extracted["title"], extracted["summary"])
+        item.future.set_result({**extracted, "title": item.title or extracted["title"]})
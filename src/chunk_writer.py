@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol
+
+log = logging.getLogger("clinia-doc-crawler")
+
+ROW_COLUMNS = ["url", "chunk_number", "title", "summary", "content", "metadata", "embedding"]
+
+
+class ChunkSink(Protocol):
+    """Destination of the batch writer: upserts rows on the (url, chunk_number) unique key."""
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None: ...
+
+
+class SupabaseSink:
+    """Multi-row upsert through the Supabase/PostgREST client."""
+
+    def __init__(self, client, table: str = "site_pages"):
+        self.client = client
+        self.table = table
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        self.client.table(self.table).upsert(rows, on_conflict="url,chunk_number").execute()
+
+
+class PostgresSink:
+    """
+    Multi-row upsert straight into Postgres + pgvector with psycopg.
+
+    Used to benchmark write throughput against a local database instead of Supabase.
+    """
+
+    def __init__(self, dsn: str, table: str = "site_pages"):
+        try:
+            import psycopg
+        except ImportError as e:
+            raise RuntimeError("PostgresSink requires psycopg (uv sync --group bench)") from e
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self.table = table
+        # Concurrent flushes run on different threads, and a psycopg transaction must not be shared across them.
+        self._local = threading.local()
+        self._connections = []
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._psycopg.connect(self.dsn)
+            self._connections.append(conn)
+        return conn
+
+    def upsert(self, rows: List[Dict[str, Any]]) -> None:
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s::jsonb, %s::vector)"] * len(rows))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in ROW_COLUMNS[2:])
+        params = []
+        for row in rows:
+            params.extend(
+                [
+                    row["url"],
+                    row["chunk_number"],
+                    row["title"],
+                    row["summary"],
+                    row["content"],
+                    json.dumps(row["metadata"]),
+                    _vector_literal(row["embedding"]),
+                ]
+            )
+        with self.conn.transaction():
+            self.conn.execute(
+                f"insert into {self.table} ({', '.join(ROW_COLUMNS)}) values {placeholders} "
+                f"on conflict (url, chunk_number) do update set {updates}",
+                params,
+            )
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+
+def _vector_literal(embedding) -> str:
+    if isinstance(embedding, str):
+        return embedding
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+
+@dataclass
+class WriterStats:
+    rows: int = 0
+    batches: int = 0
+    retries: int = 0
+    failed_rows: int = 0
+    flush_seconds: float = 0.0
+    started_at: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+class BatchWriter:
+    """
+    Buffer rows and write them as multi-row upserts.
+
+    A batch is flushed when it reaches ``batch_size`` rows or when the oldest buffered row has waited
+    ``flush_interval`` seconds. Flushes run on a worker thread so the synchronous database client never
+    blocks the event loop; at most ``max_concurrent_flushes`` run at once and ``write`` waits when they
+    are all busy and the buffer is full, which applies backpressure to the producers. Failed batches are
+    retried with exponential backoff.
+
+    ``write`` returns a future that resolves once the row is committed (or fails with the last error).
+    """
+
+    def __init__(
+        self,
+        sink: ChunkSink,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_concurrent_flushes: int = 2,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.stats = WriterStats()
+
+        self._buffer: List[tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._max_concurrent_flushes = max_concurrent_flushes
+        self._tasks: set[asyncio.Task] = set()
+
+    async def write(self, row: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue a row for the next batch.
+
+        Args:
+            row (Dict[str, Any]): The 'site_pages' row to upsert.
+
+        Returns:
+            asyncio.Future: Resolves to None once the row is committed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrent_flushes)
+            self.stats.started_at = time.perf_counter()
+
+        future = loop.create_future()
+        self._buffer.append((row, future))
+
+        if len(self._buffer) >= self.batch_size:
+            await self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._spawn_flush)
+        return future
+
+    async def close(self):
+        """Flush the remaining rows, wait for every batch to be written and log the throughput."""
+        if self._buffer:
+            await self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        log.info(
+            f"Wrote {self.stats.rows} rows in {self.stats.batches} batches "
+            f"({self.stats.rows_per_second:.1f} rows/s, {self.stats.retries} retries, {self.stats.failed_rows} failed)"
+        )
+
+    def _spawn_flush(self):
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        # Waiting for a slot here is what pushes back on the producers when the database falls behind.
+        await self._slots.acquire()
+        task = asyncio.get_running_loop().create_task(self._write_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write_batch(self, batch: List[tuple[Dict[str, Any], asyncio.Future]]):
+        # The same (url, chunk_number) twice in one statement is rejected by Postgres: the last version wins.
+        rows = list({(row["url"], row["chunk_number"]): row for row, _ in batch}.values())
+        error = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self.sink.upsert, rows)
+                    error = None
+                except Exception as e:
+                    error = e
+                self.stats.flush_seconds += time.perf_counter() - start
+
+                if error is None or attempt == self.max_retries:
+                    break
+                self.stats.retries += 1
+                delay = self.backoff_base * (2**attempt)
+                log.warning(f"Writing a batch of {len(rows)} rows failed ({error}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        finally:
+            self._slots.release()
+
+        if error is None:
+            self.stats.rows += len(rows)
+            self.stats.batches += 1
+        else:
+            self.stats.failed_rows += len(rows)
+            log.error(f"Error writing a batch of {len(rows)} rows: {error}")
+
+        for _, future in batch:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(RuntimeError(f"Could not write row: {error}"))
@@ -1,8 +1,13 @@
 import re
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Protocol, Tuple, Union
 
 CODE_BLOCK_RE = re.compile(r"```[a-zA-Z]*\n[\s\S]*?\n```")
 SENTENCE_END_RE = re.compile(r"\.[ \n]")
+PARAGRAPH_SEPARATOR = "\n\n"
+HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+FENCE_RE = re.compile(r"^\s*```")
 
 
 def _find_code_blocks(text: str) -> List[tuple[int, int]]:
@@ -17,16 +22,47 @@ def _find_code_blocks(text: str) -> List[tuple[int, int]]:
     return [(m.start(), m.end()) for m in CODE_BLOCK_RE.finditer(text)]
 
 
-def _split_paragraphs(text: str) -> List[str]:
-    """Return non-empty paragraphs separated by two successive newlines.
+def _iter_paragraphs(pieces: Iterable[str]) -> Iterator[str]:
+    """Yield the non-empty paragraphs of a text received as successive pieces.
+
+    Paragraphs are split exactly like `str.split("\\n\\n")` on the concatenated pieces, including separators
+    that straddle two pieces, but each paragraph is joined only once.
 
     Args:
-        text (str): The input text to split into paragraphs.
+        pieces (Iterable[str]): The consecutive pieces of the text.
 
-    Returns:
-        List[str]: A list of non-empty paragraphs.
+    Yields:
+        str: The non-empty paragraphs, in order.
     """
-    return [p for p in text.split("\n\n") if p]
+    # Non-empty pieces of the paragraph being received.
+    pending: List[str] = []
+
+    for piece in pieces:
+        if not piece:
+            continue
+
+        if pending and pending[-1].endswith("\n") and piece.startswith("\n"):
+            # A separator split across two pieces.
+            pending[-1] = pending[-1][:-1]
+            paragraph = "".join(pending)
+            if paragraph:
+                yield paragraph
+            pending = []
+            piece = piece[1:]
+
+        parts = piece.split(PARAGRAPH_SEPARATOR)
+        if parts[0]:
+            pending.append(parts[0])
+        if len(parts) > 1:
+            paragraph = "".join(pending)
+            if paragraph:
+                yield paragraph
+            yield from (part for part in parts[1:-1] if part)
+            pending = [parts[-1]] if parts[-1] else []
+
+    paragraph = "".join(pending)
+    if paragraph:
+        yield paragraph
 
 
 def _split_long_text(text: str, chunk_size: int) -> Tuple[List[str], str]:
@@ -35,6 +71,9 @@ def _split_long_text(text: str, chunk_size: int) -> Tuple[List[str], str]:
     The function avoids splitting inside code blocks. If a code block is encountered,
     it will be kept intact even if it exceeds the chunk_size.
 
+    The text is walked once with an offset: the cut position only moves forward, so the code blocks
+    before it are never looked at again and no intermediate remainder is copied.
+
     Args:
         text (str): The text to split.
         chunk_size (int): Maximum allowed size (in characters) of each chunk.
@@ -45,31 +84,73 @@ def _split_long_text(text: str, chunk_size: int) -> Tuple[List[str], str]:
             - str: The last piece (always < chunk_size) as remainder.
     """
     chunks: List[str] = []
-    remainder = text
     code_blocks = _find_code_blocks(text)
+    block = 0
+    position = 0
 
-    while len(remainder) > chunk_size:
-        window = remainder[:chunk_size]
+    while len(text) - position > chunk_size:
+        limit = position + chunk_size
 
-        # Check if we're in the middle of a code block
-        for start, end in code_blocks:
-            relative_start = start - (len(text) - len(remainder))
-            relative_end = end - (len(text) - len(remainder))
+        # Code blocks ending before the window limit cannot be cut by this window or any later one.
+        while block < len(code_blocks) and code_blocks[block][1] <= limit:
+            block += 1
 
-            # If the window cuts through a code block, extend it to include the whole block
-            if 0 <= relative_start < chunk_size < relative_end:
-                window = remainder[:relative_end]
-                match = None
-                break
+        if block < len(code_blocks) and position <= code_blocks[block][0] < limit:
+            # The window cuts through a code block: extend it to include the whole block
+            cut = code_blocks[block][1]
         else:
-            # If not in a code block, try to find the last sentence boundary
-            match = SENTENCE_END_RE.search(window)
+            # If not in a code block, cut after the first sentence boundary of the window
+            match = SENTENCE_END_RE.search(text, position, limit)
+            cut = match.end() if match else limit
+
+        chunks.append(text[position:cut].strip())
+        position = cut
+
+    return chunks, text[position:]
+
+
+def iter_chunks(text: Union[str, Iterable[str]], chunk_size: int = 5000) -> Iterator[str]:
+    """Yield chunks of a text whose length is at most chunk_size.
+
+    Same splitting rules as `chunk_text`, but the text can be given as an iterable of consecutive pieces
+    (e.g. a streamed page) and chunks are produced as soon as they are complete.
+
+    Args:
+        text (Union[str, Iterable[str]]): The input text, or its consecutive pieces.
+        chunk_size (int, optional): Maximum allowed size (in characters) of each chunk. Defaults to 5000.
 
-        cut_index = match.end() if match else len(window)
-        chunks.append(remainder[:cut_index].strip())
-        remainder = remainder[cut_index:]
+    Yields:
+        str: The text chunks, in their original order.
+
+    Raises:
+        ValueError: If chunk_size is not positive.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
 
-    return chunks, remainder
+    # Paragraphs waiting in the buffer and the length of the buffer once they are joined by separators.
+    buffer: List[str] = []
+    buffer_length = 0
+
+    for paragraph in _iter_paragraphs([text] if isinstance(text, str) else text):
+        candidate_length = buffer_length + len(PARAGRAPH_SEPARATOR) + len(paragraph) if buffer else len(paragraph)
+
+        if candidate_length <= chunk_size:
+            buffer.append(paragraph)
+            buffer_length = candidate_length
+            continue
+
+        if buffer:
+            yield PARAGRAPH_SEPARATOR.join(buffer).strip()
+
+        big_chunks, remainder = _split_long_text(paragraph, chunk_size)
+        yield from big_chunks
+
+        buffer = [remainder] if remainder else []
+        buffer_length = len(remainder)
+
+    if buffer:
+        yield PARAGRAPH_SEPARATOR.join(buffer).strip()
 
 
 def chunk_text(text: str, chunk_size: int = 5000) -> List[str]:
@@ -90,27 +171,217 @@ def chunk_text(text: str, chunk_size: int = 5000) -> List[str]:
     if not text:
         return []
 
-    paragraphs = _split_paragraphs(text)
+    return list(iter_chunks(text, chunk_size))
 
-    chunks: List[str] = []
-    buffer = ""
 
-    for paragraph in paragraphs:
-        candidate = f"{buffer}\n\n{paragraph}" if buffer else paragraph
+class Tokenizer(Protocol):
+    """The subset of `tiktoken.Encoding` used by the token-aware chunker."""
+
+    def encode(self, text: str) -> List[int]: ...
+
+    def decode(self, tokens: List[int]) -> str: ...
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: str) -> Tokenizer:
+    """
+    Return the tokenizer of an OpenAI model, loaded once per process.
 
-        if len(candidate) <= chunk_size:
-            buffer = candidate
+    Args:
+        model (str): The model name; unknown models use the cl100k_base encoding.
+
+    Returns:
+        Tokenizer: The tiktoken encoding of the model.
+    """
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise RuntimeError("Token-aware chunking requires tiktoken") from e
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@dataclass
+class Chunk:
+    content: str
+    heading_path: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+
+@dataclass
+class _Piece:
+    """A block (or a part of an oversized block) and the separator placed before it inside a chunk."""
+
+    separator: str
+    text: str
+    tokens: int
+
+
+def _iter_sections(text: str, heading_aware: bool) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yield the (heading path, blocks) of each Markdown section; blocks are paragraphs or whole code fences."""
+    headings: List[Tuple[int, str]] = []
+    blocks: List[str] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def end_block():
+        if lines:
+            blocks.append("\n".join(lines))
+            lines.clear()
+
+    for line in text.split("\n"):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and not line.strip():
+            end_block()
+            continue
+        elif not in_fence and heading_aware and (heading := HEADING_RE.match(line)):
+            end_block()
+            if blocks:
+                yield [title for _, title in headings], blocks
+                blocks = []
+            level = len(heading.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, heading.group(2)))
+            blocks.append(line)
             continue
+        lines.append(line)
 
-        if buffer:
-            chunks.append(buffer.strip())
+    end_block()
+    if blocks:
+        yield [title for _, title in headings], blocks
 
-        big_chunks, remainder = _split_long_text(paragraph, chunk_size)
-        chunks.extend(big_chunks)
 
-        buffer = remainder
+def _split_block(block: str, max_tokens: int, tokenizer: Tokenizer) -> List[_Piece]:
+    """Split a block larger than max_tokens into lines (code) or sentences (prose), cutting by tokens as a last resort."""
+    if FENCE_RE.match(block):
+        units = [(line, "\n") for line in block.split("\n")]
+    else:
+        starts = [0, *(m.end() for m in SENTENCE_END_RE.finditer(block))]
+        units = [(block[start:end], "") for start, end in zip(starts, [*starts[1:], len(block)], strict=True)]
 
-    if buffer:
-        chunks.append(buffer.strip())
+    pieces = []
+    for unit, separator in units:
+        if not unit and not separator:
+            # The empty tail of a prose block ending with a sentence; blank lines of code are kept.
+            continue
+        tokens = tokenizer.encode(unit)
+        if len(tokens) <= max_tokens:
+            pieces.append(_Piece(separator, unit, len(tokens)))
+            continue
+        for start in range(0, len(tokens), max_tokens):
+            window = tokens[start : start + max_tokens]
+            pieces.append(_Piece(separator if start == 0 else "", tokenizer.decode(window), len(window)))
+    return pieces
+
+
+def _common_prefix(a: List[str], b: List[str]) -> List[str]:
+    prefix = []
+    for x, y in zip(a, b):  # noqa: B905 - the paths have different depths
+        if x != y:
+            break
+        prefix.append(x)
+    return prefix
+
+
+def chunk_markdown_by_tokens(
+    text: str,
+    max_tokens: int,
+    tokenizer: Tokenizer,
+    overlap_tokens: int = 0,
+    heading_aware: bool = True,
+) -> List[Chunk]:
+    """Split Markdown into chunks of at most max_tokens tokens.
+
+    Paragraphs and code fences are packed greedily. With heading_aware, a chunk only spans several
+    sections when all of them fit in it, and its heading path is the path the sections have in common;
+    otherwise each section starts a new chunk. Blocks larger than the budget are split into lines (code)
+    or sentences (prose), and into token windows as a last resort. Consecutive chunks of a section can
+    share up to overlap_tokens tokens of whole pieces.
+
+    Args:
+        text (str): The Markdown to split.
+        max_tokens (int): Maximum number of tokens of each chunk.
+        tokenizer (Tokenizer): The tokenizer of the embedding model, from `get_tokenizer`.
+        overlap_tokens (int, optional): Tokens repeated from the end of the previous chunk. Defaults to 0.
+        heading_aware (bool, optional): Prefer heading boundaries and record heading paths. Defaults to True.
+
+    Returns:
+        List[Chunk]: The chunks with their heading path and exact token count, in order.
+
+    Raises:
+        ValueError: If max_tokens is not positive or overlap_tokens is not smaller than max_tokens.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens must be between 0 and max_tokens")
+
+    separator_tokens = {"": 0, "\n": len(tokenizer.encode("\n")), "\n\n": len(tokenizer.encode("\n\n"))}
+    chunks: List[Chunk] = []
+    current: List[_Piece] = []
+    current_tokens = 0
+    current_path: List[str] = []
+    # Number of pieces at the start of `current` that are only repeated from the previous chunk.
+    seeded = 0
+
+    def size(pieces: List[_Piece]) -> int:
+        return sum(piece.tokens + separator_tokens[piece.separator] for piece in pieces[1:]) + pieces[0].tokens
+
+    def emit():
+        nonlocal current, current_tokens, seeded
+        if len(current) > seeded:
+            content = "".join(piece.separator + piece.text if i else piece.text for i, piece in enumerate(current))
+            content = content.strip()
+            if content:
+                chunks.append(Chunk(content, current_path, len(tokenizer.encode(content))))
+        current, current_tokens, seeded = [], 0, 0
+
+    def seed_overlap():
+        nonlocal current, current_tokens, seeded
+        tail: List[_Piece] = []
+        for piece in reversed(current):
+            if sum(p.tokens for p in tail) + piece.tokens > overlap_tokens:
+                break
+            tail.insert(0, piece)
+        emit()
+        if tail:
+            current, current_tokens, seeded = tail, size(tail), len(tail)
+
+    for path, blocks in _iter_sections(text, heading_aware):
+        pieces = []
+        for block in blocks:
+            tokens = len(tokenizer.encode(block))
+            if tokens <= max_tokens:
+                pieces.append(_Piece("\n\n", block, tokens))
+            else:
+                parts = _split_block(block, max_tokens, tokenizer)
+                parts[0].separator = "\n\n"
+                pieces.extend(parts)
+
+        section_tokens = size(pieces)
+        if current and current_tokens + separator_tokens["\n\n"] + section_tokens <= max_tokens:
+            # The whole section fits in the current chunk.
+            current.extend(pieces)
+            current_tokens += separator_tokens["\n\n"] + section_tokens
+            current_path = _common_prefix(current_path, path)
+            continue
 
+        emit()
+        current_path = path
+        for piece in pieces:
+            added = piece.tokens + (separator_tokens[piece.separator] if current else 0)
+            if current and current_tokens + added > max_tokens:
+                seed_overlap()
+                if current and current_tokens + piece.tokens + separator_tokens[piece.separator] > max_tokens:
+                    current, current_tokens, seeded = [], 0, 0
+                added = piece.tokens + (separator_tokens[piece.separator] if current else 0)
+            current.append(piece)
+            current_tokens += added
+
+    emit()
     return chunks
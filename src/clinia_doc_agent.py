@@ -2,31 +2,31 @@ from __future__ import annotations as _annotations
 
 import argparse  # Add import for argparse
 import asyncio
-from dataclasses import dataclass
+import sys
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 import logfire
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from pydantic_ai import Agent, ModelRetry, RunContext
-from pydantic_ai.models.anthropic import AnthropicModel
+from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.openai import OpenAIModel
-from supabase import Client
 
-from agent_tools import retrieve_relevant_documentation_tool
-from utils import create_markdown_file, get_clients, get_env_var
+import agent_tools
+from agent_tools import (
+    get_query_embedding,
+    retrieve_documentation_for_queries_tool,
+    retrieve_relevant_documentation_tool,
+)
+from async_rpc import close_async_rpc_clients
+from utils import configure_logfire, create_markdown_file, get_clients, get_env_var, get_openai_client
 
-load_dotenv()
-
-# TODO: Put logic for initialiation in utils.py
-llm = get_env_var("PRIMARY_MODEL") or "gpt-4.1-mini"
-base_url = get_env_var("BASE_URL") or "https://api.openai.com/v1"
-api_key = get_env_var("OPENAI_API_KEY") or "no-llm-api-key-provided"
-
-model = OpenAIModel(llm, base_url=base_url, api_key=api_key)
-embedding_model = get_env_var("EMBEDDING_MODEL") or "text-embedding-3-small"
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import Client
 
-logfire.configure(token=get_env_var("LOGFIRE_API_KEY"))
-logfire.instrument_openai()
+load_dotenv()
 
 clinia_docs_agent_prompt = """
 # Role
@@ -37,13 +37,14 @@ You are a Clinia documentation expert. Your mission is to accurately answer any
 2. Recipes – step-by-step tutorials and best practices.
 3. API Reference – complete endpoint specifications.
 
-# Available tool
+# Available tools
 - retrieve_relevant_documentation: fetches relevant documentation for a given query.
+- retrieve_documentation_for_queries: fetches relevant documentation for several queries at once. Prefer it when a question has several aspects: search all of them in one call.
 
 # Step-by-step reasoning
 
-1. Find all references to the user query in the documentation.
-2. Iterate multiple times with your tools to get all relevant information.
+1. Find all references to the user query in the documentation, searching its different aspects together.
+2. Iterate with your tools only if the results are not enough to answer.
 3. If you are not sure about the answer, use the retrieved information to create new query
 4. when you are confident about the answer, format it in markdown and return it. 
 
@@ -59,29 +60,215 @@ class CliniaDocAgentsDeps:
     Attributes:
         supabase (Client): The Supabase client for database access.
         embedding_client (AsyncOpenAI): The OpenAI client for embedding generation.
+        progress (Optional[Callable[[str], None]]): Called with a short description of each tool call, to show
+            progress while the agent works.
+        retrieval_timer (Optional[Callable[[float], None]]): Called with the duration in seconds of each
+            documentation retrieval.
     """
 
     supabase: Client
     embedding_client: AsyncOpenAI
+    progress: Optional[Callable[[str], None]] = None
+    retrieval_timer: Optional[Callable[[float], None]] = None
 
 
-clinia_docs_agent = Agent(model, system_prompt=clinia_docs_agent_prompt, deps_type=CliniaDocAgentsDeps, retries=2)
+@dataclass
+class StreamedAnswer:
+    """
+    The outcome of a streamed agent run.
 
+    Attributes:
+        text (str): The complete answer.
+        time_to_first_token (Optional[float]): Seconds from the question to the first answer token, retrieval
+            included. None if the agent produced no text.
+        runtime (float): Seconds from the question to the end of the answer.
+        tool_calls (int): The number of tool calls made before answering.
+        retrieval_time (float): Seconds spent retrieving documentation, over all tool calls.
+        request_tokens (Optional[int]): Prompt tokens over all model requests, if the model reported them.
+        response_tokens (Optional[int]): Completion tokens over all model requests, if the model reported them.
+        cached (bool): Whether the answer was served from the answer cache, without running the agent.
+    """
+
+    text: str
+    time_to_first_token: Optional[float]
+    runtime: float
+    tool_calls: int
+    retrieval_time: float = 0.0
+    request_tokens: Optional[int] = None
+    response_tokens: Optional[int] = None
+    cached: bool = False
 
-@clinia_docs_agent.tool
-async def retrieve_relevant_documentation(ctx: RunContext[CliniaDocAgentsDeps], query: str) -> str:
+
+async def retrieve_relevant_documentation(
+    ctx: RunContext[CliniaDocAgentsDeps], query: str, keyword_weight: Optional[float] = None
+) -> str:
     """
     Tool to retrieve relevant documentation chunks for a given query using the agent's dependencies.
 
     Args:
         ctx (RunContext[CliniaDocAgentsDeps]): The agent's context containing dependencies.
         query (str): The user query string.
+        keyword_weight (Optional[float]): How much exact keyword matches count relative to semantic matches
+            (e.g. 3.0 when looking for an exact API or entity name). Leave empty for the default.
 
     Returns:
         str: Formatted documentation chunks or an error message if retrieval fails.
     """
-    with logfire.span("create embedding for {search_query=}", search_query=query):
-        return await retrieve_relevant_documentation_tool(ctx.deps.supabase, ctx.deps.embedding_client, query)
+    if ctx.deps.progress is not None:
+        ctx.deps.progress(f"searching: {query}")
+    start = time.perf_counter()
+    with logfire.span("retrieve documentation for {search_query=}", search_query=query):
+        documentation = await retrieve_relevant_documentation_tool(
+            ctx.deps.supabase, ctx.deps.embedding_client, query, keyword_weight=keyword_weight
+        )
+    if ctx.deps.retrieval_timer is not None:
+        ctx.deps.retrieval_timer(time.perf_counter() - start)
+    return documentation
+
+
+async def retrieve_documentation_for_queries(
+    ctx: RunContext[CliniaDocAgentsDeps], queries: List[str], keyword_weight: Optional[float] = None
+) -> str:
+    """
+    Tool to retrieve relevant documentation chunks for several queries at once, e.g. the aspects of a question.
+
+    Args:
+        ctx (RunContext[CliniaDocAgentsDeps]): The agent's context containing dependencies.
+        queries (List[str]): The search queries, up to 5.
+        keyword_weight (Optional[float]): How much exact keyword matches count relative to semantic matches
+            (e.g. 3.0 when looking for an exact API or entity name). Leave empty for the default.
+
+    Returns:
+        str: Formatted documentation chunks or an error message if retrieval fails.
+    """
+    if ctx.deps.progress is not None:
+        ctx.deps.progress(f"searching: {'; '.join(queries)}")
+    start = time.perf_counter()
+    with logfire.span("retrieve documentation for {search_queries=}", search_queries=queries):
+        documentation = await retrieve_documentation_for_queries_tool(
+            ctx.deps.supabase, ctx.deps.embedding_client, queries, keyword_weight=keyword_weight
+        )
+    if ctx.deps.retrieval_timer is not None:
+        ctx.deps.retrieval_timer(time.perf_counter() - start)
+    return documentation
+
+
+@lru_cache(maxsize=1)
+def get_model() -> OpenAIModel:
+    """
+    Return the agent's model, created on first use from PRIMARY_MODEL. It calls the API through the shared
+    OpenAI client, so it follows BASE_URL, OPENAI_API_KEY and CLIENT_MODE like the embeddings.
+
+    Returns:
+        OpenAIModel: The shared model.
+    """
+    return OpenAIModel(get_env_var("PRIMARY_MODEL") or "gpt-4.1-mini", openai_client=get_openai_client())
+
+
+@lru_cache(maxsize=1)
+def get_agent() -> Agent[CliniaDocAgentsDeps, str]:
+    """
+    Return the Clinia documentation agent, created on first use. Logfire is configured at the same time.
+
+    Returns:
+        Agent[CliniaDocAgentsDeps, str]: The shared agent with its retrieval tools (the multi-query one unless
+            MULTI_QUERY_TOOL=false).
+    """
+    configure_logfire()
+    return Agent(
+        get_model(),
+        system_prompt=clinia_docs_agent_prompt,
+        deps_type=CliniaDocAgentsDeps,
+        retries=2,
+        tools=[retrieve_relevant_documentation]
+        + ([retrieve_documentation_for_queries] if agent_tools.MULTI_QUERY_TOOL else []),
+    )
+
+
+async def stream_agent_answer(
+    query: str,
+    deps: CliniaDocAgentsDeps,
+    on_text: Callable[[str], None],
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> StreamedAnswer:
+    """
+    Run the agent and stream its answer as it is generated.
+
+    Tool calls run first; the answer tokens are passed to `on_text` as soon as the model produces them. The
+    time to first token, the total runtime and the time spent in retrieval are returned with the token usage, and
+    recorded on a logfire span. With ANSWER_CACHE_ENABLED, the answer to a near-identical earlier question is
+    returned at once instead.
+
+    Args:
+        query (str): The user question.
+        deps (CliniaDocAgentsDeps): The agent's dependencies.
+        on_text (Callable[[str], None]): Called with each new piece of the answer.
+        on_progress (Optional[Callable[[str], None]], optional): Called with a description of each tool call.
+
+    Returns:
+        StreamedAnswer: The complete answer and its timings.
+    """
+    start = time.perf_counter()
+    time_to_first_token = None
+    tool_calls = 0
+    retrieval_time = 0.0
+    pieces = []
+
+    def progress(message: str):
+        nonlocal tool_calls
+        tool_calls += 1
+        if on_progress is not None:
+            on_progress(message)
+
+    def retrieval_timer(seconds: float):
+        nonlocal retrieval_time
+        retrieval_time += seconds
+
+    agent = get_agent()
+    with logfire.span("streamed agent answer {query=}", query=query) as span:
+        answer_cache = agent_tools.answer_cache
+        if answer_cache is not None:
+            await agent_tools.sync_corpus_version(deps.supabase)
+            question_embedding = await get_query_embedding(query, deps.embedding_client)
+            if (cached := answer_cache.lookup(question_embedding)) is not None:
+                text, similarity = cached
+                on_text(text)
+                span.set_attributes({"answer_cache_similarity": similarity, **answer_cache.stats_attributes()})
+                elapsed = time.perf_counter() - start
+                return StreamedAnswer(text, elapsed, elapsed, 0, cached=True)
+
+        run_deps = replace(deps, progress=progress, retrieval_timer=retrieval_timer)
+        async with agent.run_stream(query, deps=run_deps) as result:
+            async for delta in result.stream_text(delta=True, debounce_by=None):
+                if not delta:
+                    continue
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start
+                pieces.append(delta)
+                on_text(delta)
+            usage = result.usage()
+
+        answer = StreamedAnswer(
+            "".join(pieces),
+            time_to_first_token,
+            time.perf_counter() - start,
+            tool_calls,
+            retrieval_time=retrieval_time,
+            request_tokens=usage.request_tokens,
+            response_tokens=usage.response_tokens,
+        )
+        span.set_attributes(
+            {
+                "time_to_first_token": answer.time_to_first_token,
+                "runtime_seconds": answer.runtime,
+                "tool_calls": answer.tool_calls,
+                "retrieval_seconds": answer.retrieval_time,
+                "total_tokens": usage.total_tokens,
+            }
+        )
+        if answer_cache is not None and answer.text and any(question_embedding):
+            answer_cache.put(question_embedding, answer.text, cost=answer.runtime)
+        return answer
 
 
 async def main():
@@ -93,6 +280,9 @@ async def main():
     """
     parser = argparse.ArgumentParser(description="Run the Clinia documentation agent.")
     parser.add_argument("query", type=str, help="The query to ask the agent.")
+    parser.add_argument(
+        "--no-stream", action="store_true", help="Wait for the complete answer instead of streaming it."
+    )
     args = parser.parse_args()
 
     embedding_client, supabase = get_clients()
@@ -102,12 +292,31 @@ async def main():
         embedding_client=embedding_client,
     )
 
-    response = await clinia_docs_agent.run(args.query, deps=deps)  # Use args.query
-
-    create_markdown_file("modules", response.data)
-
-    print("Réponse de l'agent:")
-    print(response.data)
+    try:
+        if args.no_stream:
+            response = await get_agent().run(args.query, deps=deps)  # Use args.query
+            answer = response.data
+            print("Réponse de l'agent:")
+            print(answer)
+        else:
+            print("Réponse de l'agent:")
+            streamed = await stream_agent_answer(
+                args.query,
+                deps,
+                on_text=lambda delta: print(delta, end="", flush=True),
+                on_progress=lambda message: print(f"[{message}]", file=sys.stderr, flush=True),
+            )
+            answer = streamed.text
+            print()
+            print(
+                f"[first token after {streamed.time_to_first_token or 0:.1f}s, answered in {streamed.runtime:.1f}s, "
+                f"{streamed.tool_calls} tool calls]",
+                file=sys.stderr,
+            )
+    finally:
+        await close_async_rpc_clients()
+
+    create_markdown_file("modules", answer)
 
 
 if __name__ == "__main__":
@@ -1,19 +1,31 @@
+import argparse
 import asyncio
 import json
 import logging
-import re
-from dataclasses import dataclass
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 from xml.etree import ElementTree
 
-import html2text
-import requests
 from dotenv import load_dotenv
 
-from chunker import chunk_text
-from utils import get_clients, get_env_var
+from chunk_summarizer import ERROR_SUMMARY, ChunkSummarizer
+from chunk_writer import BatchWriter, SupabaseSink
+from chunker import Chunk, chunk_markdown_by_tokens, chunk_text, get_tokenizer
+from content_cache import close_content_cache, get_content_cache
+from corpus_versions import CorpusSwapError, CorpusVersions, new_corpus_version
+from crawl_manifest import CrawlManifest, PageState, diff_chunks, hash_chunk
+from embedding_batcher import EmbeddingBatcher
+from fetcher import AsyncFetcher
+from html_conversion import ConversionStats, convert_html_to_markdown, convert_page, get_html_converter
+from pipeline import Emit, Pipeline, Stage, StageStats
+from utils import get_env_var, get_openai_client, get_supabase_client
 
 load_dotenv()
 
@@ -23,15 +35,92 @@ logging.basicConfig(
 )
 log = logging.getLogger("clinia-doc-crawler")
 
-openai_client, supabase = get_clients()
-
 embedding_model = get_env_var("EMBEDDING_MODEL") or "text-embedding-3-small"
 
-html_converter = html2text.HTML2Text()
-html_converter.ignore_links = False
-html_converter.ignore_images = False
-html_converter.ignore_tables = False
-html_converter.body_width = 0  # No wrapping
+# Default chunk size in tokens per embedding model when CHUNK_MODE=tokens. Small enough that ten retrieved chunks
+# fit comfortably in the agent's context; the larger model gets more room as it keeps more of a long chunk.
+CHUNK_TOKENS_BY_MODEL = {
+    "text-embedding-3-small": 512,
+    "text-embedding-3-large": 768,
+    "text-embedding-ada-002": 512,
+}
+
+# Bump whenever the summary prompt changes so cached titles/summaries from the old prompt are not reused.
+SUMMARY_PROMPT_VERSION = "1"
+
+
+manifest_path = get_env_var("CRAWL_MANIFEST_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crawl_manifest.json"
+)
+
+
+@lru_cache(maxsize=1)
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """
+    Return the embedding batcher of the crawl, created on first use from the EMBEDDING_* environment variables.
+
+    Every chunk of every document being processed shares the same batcher, so embeddings go out as multi-input
+    requests instead of one round trip per chunk.
+
+    Returns:
+        EmbeddingBatcher: The shared batcher.
+    """
+    return EmbeddingBatcher(
+        get_openai_client(),
+        embedding_model,
+        batch_size=int(get_env_var("EMBEDDING_BATCH_SIZE") or 256),
+        max_batch_tokens=int(get_env_var("EMBEDDING_BATCH_TOKENS") or 100_000),
+        max_concurrent=int(get_env_var("EMBEDDING_CONCURRENCY") or 4),
+        cache=get_content_cache(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_summarizer() -> ChunkSummarizer:
+    """
+    Return the chunk summarizer of the crawl, created on first use from the SUMMARY_* environment variables.
+
+    SUMMARY_MODE is "chunk" (one request per chunk, the default), "batch" (the chunks of a page share requests
+    of up to SUMMARY_BATCH_SIZE chunks) or "deferred" (summaries are filled in after the chunks are stored).
+    SUMMARY_HEADING_TITLES=true titles chunks after their Markdown headings instead of asking the model.
+
+    Returns:
+        ChunkSummarizer: The shared summarizer.
+    """
+    return ChunkSummarizer(
+        get_openai_client(),
+        get_env_var("PRIMARY_MODEL") or "gpt-4o-mini",
+        mode=get_env_var("SUMMARY_MODE") or "chunk",
+        batch_size=int(get_env_var("SUMMARY_BATCH_SIZE") or 8),
+        max_concurrent=int(get_env_var("SUMMARY_CONCURRENCY") or 64),
+        heading_titles=(get_env_var("SUMMARY_HEADING_TITLES") or "false").lower() == "true",
+        cache=get_content_cache(),
+        prompt_version=SUMMARY_PROMPT_VERSION,
+    )
+
+
+def convert_processes() -> int:
+    """Return the number of processes converting HTML: CONVERT_PROCESSES, by default one per CPU (0: threads)."""
+    return int(get_env_var("CONVERT_PROCESSES") or os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=1)
+def get_convert_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Return the process pool converting HTML pages to markdown, created on first use.
+
+    HTML parsing is pure Python and CPU-bound: in threads, the GIL limits it to one core and slows down the
+    event loop. Each worker process has its own converter. The workers are started from a fork server, since
+    forking the multi-threaded crawler process is unsafe.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The shared pool, or None if CONVERT_PROCESSES=0 (convert in threads).
+    """
+    processes = convert_processes()
+    if processes <= 0:
+        return None
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context(method))
 
 
 @dataclass
@@ -45,57 +134,66 @@ class ProcessedChunk:
     embedding: List[float]
 
 
-async def get_title_and_summary(chunk: str, url: str) -> Dict[str, str]:
+@dataclass
+class PageJob:
+    """A page travelling through the crawl pipeline; `content` holds the HTML, then the markdown."""
+
+    url: str
+    previous: Optional[PageState]
+    lastmod: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content: Optional[str]
+    chunk_hashes: List[str] = field(default_factory=list)
+    has_removed_chunks: bool = False
+    pending_chunks: int = 0
+    stored_chunks: List[asyncio.Future] = field(default_factory=list)
+
+
+@dataclass
+class ChunkJob:
+    page: PageJob
+    chunk_number: int
+    chunk: Chunk
+    stored_row: Optional[Dict[str, Any]] = None
+
+
+async def get_title_and_summary(chunk: str, url: str, heading_path: Optional[List[str]] = None) -> Dict[str, str]:
     """
-    Asynchronously extract the title and summary from a documentation chunk using GPT-4.
+    Asynchronously extract the title and summary of a documentation chunk through the shared summarizer.
 
     Args:
         chunk (str): The text of the chunk to analyze.
         url (str): The source URL of the chunk.
+        heading_path (Optional[List[str]], optional): The Markdown headings the chunk is under, if known.
 
     Returns:
         Dict[str, str]: A dictionary containing the keys 'title' and 'summary'.
     """
-    system_prompt = """You are an AI that extracts titles and summaries from documentation chunks.\n    Return a JSON object with 'title' and 'summary' keys.\n    For the title: If this seems like the start of a document, extract its title. If it's a middle chunk, derive a descriptive title.\n    For the summary: Create a concise summary of the main points in this chunk.\n    Keep both title and summary concise but informative."""
-    try:
-        response = await openai_client.chat.completions.create(
-            model=get_env_var("PRIMARY_MODEL") or "gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": f"URL: {url}\n\nContent:\n{chunk[:1000]}...",
-                },
-            ],
-            response_format={"type": "json_object"},
-        )
-        return json.loads(response.choices[0].message.content)
-
-    except Exception as e:
-        log.error(f"Error getting title and summary: {e}")
-        return {"title": "Error processing title", "summary": "Error processing summary"}
+    return await get_summarizer().summarize(chunk, url, heading_path)
 
 
 async def get_embedding(text: str) -> List[float]:
     """
     Asynchronously retrieve the embedding vector for a given text using OpenAI.
 
+    The text is queued on the shared embedding batcher and sent along with the other pending chunks.
+
     Args:
         text (str): The text to embed.
 
     Returns:
         List[float]: The embedding vector for the text.
-    """
-    try:
-        response = await openai_client.embeddings.create(model=embedding_model, input=text)
-        return response.data[0].embedding
 
-    except Exception as e:
-        log.error(f"Error getting embedding: {e}")
-        return [0] * 1536  # Return zero vector on error
+    Raises:
+        EmbeddingError: If the text could not be embedded after all retries.
+    """
+    return await get_embedding_batcher().embed(text)
 
 
-async def process_chunk(chunk: str, chunk_number: int, url: str) -> ProcessedChunk:
+async def process_chunk(
+    chunk: str, chunk_number: int, url: str, heading_path: Optional[List[str]] = None, tokens: int = 0
+) -> ProcessedChunk:
     """
     Process a text chunk: extract the title, summary, embedding, and build a ProcessedChunk object.
 
@@ -103,19 +201,25 @@ async def process_chunk(chunk: str, chunk_number: int, url: str) -> ProcessedChu
         chunk (str): The text of the chunk to process.
         chunk_number (int): The index of the chunk in the document.
         url (str): The source URL of the chunk.
+        heading_path (Optional[List[str]], optional): The Markdown headings the chunk is under, if known.
+        tokens (int, optional): The token count of the chunk, if known.
 
     Returns:
         ProcessedChunk: The object containing all extracted and computed information for this chunk.
     """
-    extracted = await get_title_and_summary(chunk, url)
-    embedding = await get_embedding(chunk)
+    extracted, embedding = await asyncio.gather(get_title_and_summary(chunk, url, heading_path), get_embedding(chunk))
 
     metadata = {
         "source": "clinia_docs",
         "chunk_size": len(chunk),
         "crawled_at": datetime.now(timezone.utc).isoformat(),
         "url_path": urlparse(url).path,
+        "content_hash": hash_chunk(chunk),
     }
+    if heading_path:
+        metadata["heading_path"] = heading_path
+    if tokens:
+        metadata["chunk_tokens"] = tokens
 
     return ProcessedChunk(
         url=url,
@@ -128,181 +232,579 @@ async def process_chunk(chunk: str, chunk_number: int, url: str) -> ProcessedChu
     )
 
 
-async def insert_chunk(chunk: ProcessedChunk):
+def reuse_chunk(row: Dict[str, Any], chunk_number: int) -> ProcessedChunk:
+    """
+    Build a ProcessedChunk from an already stored row whose content only moved to another position.
+
+    Args:
+        row (Dict[str, Any]): The stored 'site_pages' row.
+        chunk_number (int): The new index of the chunk in the document.
+
+    Returns:
+        ProcessedChunk: The chunk with its stored title, summary and embedding.
+    """
+    embedding = row["embedding"]
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)
+
+    return ProcessedChunk(
+        url=row["url"],
+        chunk_number=chunk_number,
+        title=row["title"],
+        summary=row["summary"],
+        content=row["content"],
+        metadata={**row["metadata"], "crawled_at": datetime.now(timezone.utc).isoformat()},
+        embedding=embedding,
+    )
+
+
+def fetch_existing_chunks(url: str, chunk_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Fetch stored rows of a page so unchanged content can be reused without calling the APIs again.
+
+    Args:
+        url (str): The page URL.
+        chunk_numbers (List[int]): The chunk numbers to fetch.
+
+    Returns:
+        Dict[int, Dict[str, Any]]: The stored rows keyed by chunk_number (empty on error).
+    """
+    if not chunk_numbers:
+        return {}
+
+    try:
+        result = (
+            get_supabase_client()
+            .table("site_pages")
+            .select("url, chunk_number, title, summary, content, metadata, embedding")
+            .eq("url", url)
+            .in_("chunk_number", chunk_numbers)
+            .execute()
+        )
+        return {row["chunk_number"]: row for row in result.data}
+
+    except Exception as e:
+        log.error(f"Error fetching existing chunks for {url}: {e}")
+        return {}
+
+
+def chunk_to_row(chunk: ProcessedChunk) -> Dict[str, Any]:
+    """
+    Convert a processed chunk to a 'site_pages' row.
+
+    Args:
+        chunk (ProcessedChunk): The chunk to store.
+
+    Returns:
+        Dict[str, Any]: The row to upsert on (url, chunk_number).
+    """
+    return {
+        "url": chunk.url,
+        "chunk_number": chunk.chunk_number,
+        "title": chunk.title,
+        "summary": chunk.summary,
+        "content": chunk.content,
+        "metadata": chunk.metadata,
+        "embedding": chunk.embedding,
+    }
+
+
+def create_writer(table: str = "site_pages") -> BatchWriter:
+    """
+    Create the batch writer for 'site_pages' from the WRITE_* environment variables.
+
+    Args:
+        table (str, optional): The table to write to, e.g. the shadow table of a new corpus version.
+            Defaults to "site_pages".
+
+    Returns:
+        BatchWriter: A writer flushing multi-row upserts through the Supabase client.
+    """
+    return BatchWriter(
+        SupabaseSink(get_supabase_client(), table),
+        batch_size=int(get_env_var("WRITE_BATCH_SIZE") or 500),
+        flush_interval=float(get_env_var("WRITE_FLUSH_INTERVAL") or 2.0),
+    )
+
+
+def delete_chunks(url: str, from_chunk_number: int = 0):
     """
-    Insert a processed chunk into the 'site_pages' table in Supabase.
+    Delete the stored chunks of a page starting at a given chunk number.
 
     Args:
-        chunk (ProcessedChunk): The chunk to insert into the database.
+        url (str): The page URL.
+        from_chunk_number (int, optional): The first chunk number to delete. Defaults to 0 (the whole page).
 
     Returns:
-        Any: The result of the insert operation or None if an error occurs.
+        Any: The result of the delete operation or None if an error occurs.
     """
     try:
-        data = {
-            "url": chunk.url,
-            "chunk_number": chunk.chunk_number,
-            "title": chunk.title,
-            "summary": chunk.summary,
-            "content": chunk.content,
-            "metadata": chunk.metadata,
-            "embedding": chunk.embedding,
-        }
-        result = supabase.table("site_pages").insert(data).execute()
-        log.info(f"Inserted chunk {chunk.chunk_number} for {chunk.url}")
+        result = (
+            get_supabase_client()
+            .table("site_pages")
+            .delete()
+            .eq("url", url)
+            .gte("chunk_number", from_chunk_number)
+            .execute()
+        )
+        log.info(f"Deleted chunks >= {from_chunk_number} for {url}")
         return result
 
     except Exception as e:
-        log.error(f"Error inserting chunk: {e}")
+        log.error(f"Error deleting chunks for {url}: {e}")
         return None
 
 
-async def process_and_store_document(url: str, markdown: str):
+async def fill_pending_summaries(table: str = "site_pages", page_size: int = 500) -> int:
     """
-    Split a markdown document into chunks, process each chunk, and store them in the database.
+    Fill in the titles and summaries of the chunks a SUMMARY_MODE=deferred crawl stored without a summary.
+
+    Pending rows (empty summary) are read in pages ordered by id; the chunks of each docs page share batched
+    requests, and each row is updated once summarized. Chunks whose summary failed stay pending for the next pass.
 
     Args:
-        url (str): The source URL of the document.
-        markdown (str): The markdown content of the document to process.
+        table (str, optional): The table to update. Defaults to "site_pages".
+        page_size (int, optional): The number of rows read at a time. Defaults to 500.
 
     Returns:
-        None
+        int: The number of chunks filled in.
     """
-    chunks = chunk_text(markdown, 1000)
+    supabase = get_supabase_client()
+    summarizer = get_summarizer()
+    filled, last_id = 0, 0
+
+    async def update(row: Dict[str, Any], extracted: Dict[str, str]) -> bool:
+        if extracted["summary"] in ("", ERROR_SUMMARY["summary"]):
+            return False
+        query = (
+            supabase.table(table)
+            .update({"title": extracted["title"], "summary": extracted["summary"]})
+            .eq("url", row["url"])
+            .eq("chunk_number", row["chunk_number"])
+        )
+        try:
+            await asyncio.to_thread(query.execute)
+            return True
+        except Exception as e:
+            log.error(f"Error storing the summary of chunk {row['chunk_number']} of {row['url']}: {e}")
+            return False
+
+    async def fill(url: str, rows: List[Dict[str, Any]]) -> int:
+        results = await summarizer.summarize_page(
+            url, [row["content"] for row in rows], [row["metadata"].get("heading_path") for row in rows]
+        )
+        return sum(
+            await asyncio.gather(*[update(row, extracted) for row, extracted in zip(rows, results, strict=True)])
+        )
 
-    log.info(f"Split document into {len(chunks)} chunks for {url}")
-    tasks = [process_chunk(chunk, i, url) for i, chunk in enumerate(chunks)]
+    while True:
+        query = (
+            supabase.table(table)
+            .select("id, url, chunk_number, content, metadata")
+            .eq("summary", "")
+            .gt("id", last_id)
+            .order("id")
+            .limit(page_size)
+        )
+        rows = (await asyncio.to_thread(query.execute)).data
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
 
-    processed_chunks = await asyncio.gather(*tasks)
+        pages: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            pages.setdefault(row["url"], []).append(row)
+        filled += sum(await asyncio.gather(*[fill(url, page_rows) for url, page_rows in pages.items()]))
 
-    log.info(f"Processed {len(processed_chunks)} chunks for {url}")
-    insert_tasks = [insert_chunk(chunk) for chunk in processed_chunks]
-    await asyncio.gather(*insert_tasks)
-    log.info(f"Stored {len(processed_chunks)} chunks for {url}")
+    log.info(f"Filled in {filled} deferred summaries")
+    return filled
 
 
-def fetch_url_content(url: str) -> str:
+def split_markdown(markdown: str) -> List[Chunk]:
     """
-    Retrieve the content of a URL and convert it to markdown.
+    Split a page into chunks with the configured chunking mode.
+
+    CHUNK_MODE=characters (the default) uses `chunk_text` with CHUNK_SIZE characters (default 1000).
+    CHUNK_MODE=tokens uses `chunk_markdown_by_tokens` with the tokenizer of the embedding model, CHUNK_TOKENS
+    tokens (default: CHUNK_TOKENS_BY_MODEL), CHUNK_OVERLAP_TOKENS tokens of overlap (default 0) and heading-aware
+    boundaries unless CHUNK_HEADING_AWARE is "false".
 
     Args:
-        url (str): The URL to fetch.
+        markdown (str): The page content.
 
     Returns:
-        str: The content converted to markdown.
+        List[Chunk]: The chunks of the page, in order.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        markdown = html_converter.handle(response.text)
-        markdown = re.sub(r"\n{3,}", "\n\n", markdown)
-        return markdown
+    if (get_env_var("CHUNK_MODE") or "characters") == "tokens":
+        return chunk_markdown_by_tokens(
+            markdown,
+            max_tokens=int(get_env_var("CHUNK_TOKENS") or CHUNK_TOKENS_BY_MODEL.get(embedding_model, 512)),
+            tokenizer=get_tokenizer(embedding_model),
+            overlap_tokens=int(get_env_var("CHUNK_OVERLAP_TOKENS") or 0),
+            heading_aware=(get_env_var("CHUNK_HEADING_AWARE") or "true").lower() != "false",
+        )
+    return [Chunk(content) for content in chunk_text(markdown, int(get_env_var("CHUNK_SIZE") or 1000))]
+
+
+def create_fetcher() -> AsyncFetcher:
+    """
+    Create the shared page fetcher from the FETCH_* environment variables.
+
+    Returns:
+        AsyncFetcher: A fetcher with one pooled HTTP client.
+    """
+    return AsyncFetcher(
+        per_host_limit=int(get_env_var("FETCH_PER_HOST_LIMIT") or 10),
+        min_request_interval=float(get_env_var("FETCH_MIN_INTERVAL") or 0.0),
+        max_page_bytes=int(get_env_var("FETCH_MAX_PAGE_BYTES") or 5 * 1024 * 1024),
+    )
 
-    except requests.RequestException as e:
-        raise RuntimeError(f"Error fetching {url}: {str(e)}") from e
 
+def finalize_page(page: PageJob, manifest: Optional[CrawlManifest]):
+    """
+    Delete the stale tail of a page once all its changed chunks are stored, and record it in the manifest.
+
+    Args:
+        page (PageJob): The page whose chunks are all stored.
+        manifest (Optional[CrawlManifest]): The crawl manifest to update.
+
+    Raises:
+        RuntimeError: If the stale chunks could not be deleted, so the page is not recorded as up to date.
+    """
+    if page.has_removed_chunks and delete_chunks(page.url, len(page.chunk_hashes)) is None:
+        raise RuntimeError(f"Could not delete stale chunks of {page.url}")
 
-async def crawl_parallel_with_requests(urls: List[str], max_concurrent: int = 10):
+    if manifest is not None:
+        manifest.set(page.url, PageState(page.lastmod, page.etag, page.last_modified, page.chunk_hashes))
+    log.info(f"Stored {len(page.chunk_hashes)} chunks for {page.url}")
+
+
+async def crawl_pipeline(
+    urls: List[str],
+    fetcher: AsyncFetcher,
+    writer: BatchWriter,
+    manifest: Optional[CrawlManifest] = None,
+    lastmods: Optional[Dict[str, Optional[str]]] = None,
+) -> Dict[str, StageStats]:
     """
-    Asynchronously crawl multiple URLs in parallel with a concurrency limit.
+    Crawl URLs through a staged pipeline: fetch → convert → chunk → summarize/embed → store.
+
+    Each stage has its own workers (CRAWL_*_WORKERS) and a bounded input queue (CRAWL_QUEUE_SIZE), so a
+    slow LLM call never holds a fetch slot and a backlog of pages cannot grow without bound. When the
+    manifest knows the previous state of a page, only the chunks whose content hash changed are
+    summarized, embedded and upserted; chunks that merely moved reuse their stored row and chunks past
+    the new end of the document are deleted.
 
     Args:
         urls (List[str]): The list of URLs to crawl.
-        max_concurrent (int, optional): The maximum number of concurrent tasks. Defaults to 5.
+        fetcher (AsyncFetcher): The shared page fetcher.
+        writer (BatchWriter): The batch writer receiving the processed chunks; it is flushed before returning.
+        manifest (Optional[CrawlManifest], optional): The crawl manifest used for conditional requests and
+            chunk diffing; it is updated with the state of every page stored successfully.
+        lastmods (Optional[Dict[str, Optional[str]]], optional): The sitemap <lastmod> of each URL.
 
     Returns:
-        None
+        Dict[str, StageStats]: The throughput statistics of each stage.
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
+    lastmods = lastmods or {}
+    loop = asyncio.get_running_loop()
+    finalizers: set[asyncio.Task] = set()
+    main_content = (get_env_var("HTML_MAIN_CONTENT") or "true").lower() == "true"
+    conversions = ConversionStats()
+
+    async def finalize_when_stored(page: PageJob):
+        try:
+            await asyncio.gather(*page.stored_chunks)
+            await loop.run_in_executor(None, finalize_page, page, manifest)
+        except Exception as e:
+            log.error(f"Error storing {page.url}: {e}")
+
+    async def fetch(url: str, emit: Emit):
+        previous = manifest.get(url) if manifest else None
+        log.info(f"Fetching content from: {url}")
+        response = await fetcher.fetch(
+            url,
+            etag=previous.etag if previous else None,
+            last_modified=previous.last_modified if previous else None,
+        )
+        if response.not_modified:
+            log.info(f"Not modified: {url}")
+            manifest.set(url, replace(previous, lastmod=lastmods.get(url)))
+            return
 
-    async def process_url(url: str):
-        async with semaphore:
-            log.info(f"Crawling: {url}")
-            try:
-                loop = asyncio.get_running_loop()
-                log.info(f"Fetching content from: {url}")
-                markdown = await loop.run_in_executor(None, fetch_url_content, url)
-                if markdown:
-                    log.info(f"Successfully crawled: {url}")
-                    await process_and_store_document(url, markdown)
-                else:
-                    log.warning(f"Failed: {url} - No content retrieved")
+        await emit(
+            PageJob(
+                url=url,
+                previous=previous,
+                lastmod=lastmods.get(url),
+                etag=response.etag,
+                last_modified=response.last_modified,
+                content=response.text,
+            )
+        )
 
-            except Exception as e:
-                log.error(f"Error processing {url}: {str(e)}")
+    async def convert(page: PageJob, emit: Emit):
+        result = await loop.run_in_executor(get_convert_pool(), convert_page, page.content, main_content)
+        conversions.add(result)
+        page.content = result.markdown
+        if not page.content:
+            log.warning(f"Failed: {page.url} - No content retrieved")
+            return
+        await emit(page)
+
+    async def chunk(page: PageJob, emit: Emit):
+        chunks = await loop.run_in_executor(None, split_markdown, page.content)
+        page.content = None
+        page.chunk_hashes = [hash_chunk(chunk.content) for chunk in chunks]
+        old_hashes = page.previous.chunk_hashes if page.previous else []
+        changed, removed = diff_chunks(old_hashes, page.chunk_hashes)
+        page.has_removed_chunks = bool(removed)
+        page.pending_chunks = len(changed)
+
+        log.info(f"Split {page.url} into {len(chunks)} chunks ({len(changed)} changed, {len(removed)} removed)")
+
+        old_positions = {digest: i for i, digest in enumerate(old_hashes)}
+        moved = {i: old_positions[page.chunk_hashes[i]] for i in changed if page.chunk_hashes[i] in old_positions}
+        existing = {}
+        if moved:
+            existing = await loop.run_in_executor(None, fetch_existing_chunks, page.url, sorted(set(moved.values())))
+
+        if not changed:
+            await loop.run_in_executor(None, finalize_page, page, manifest)
+            return
 
-    log.info(f"Processing {len(urls)} URLs with concurrency {max_concurrent}")
-    await asyncio.gather(*[process_url(url) for url in urls])
+        for i in changed:
+            await emit(ChunkJob(page=page, chunk_number=i, chunk=chunks[i], stored_row=existing.get(moved.get(i))))
+
+    async def enrich(job: ChunkJob, emit: Emit):
+        if job.stored_row is not None:
+            processed = reuse_chunk(job.stored_row, job.chunk_number)
+        else:
+            processed = await process_chunk(
+                job.chunk.content, job.chunk_number, job.page.url, job.chunk.heading_path, job.chunk.tokens
+            )
+        await emit((job.page, processed))
+
+    async def store(item: Tuple[PageJob, ProcessedChunk], emit: Emit):
+        page, processed = item
+        page.stored_chunks.append(await writer.write(chunk_to_row(processed)))
+
+        page.pending_chunks -= 1
+        if page.pending_chunks == 0:
+            # The page is finalized once the writer has committed every one of its batches.
+            task = loop.create_task(finalize_when_stored(page))
+            finalizers.add(task)
+            task.add_done_callback(finalizers.discard)
+
+    queue_size = int(get_env_var("CRAWL_QUEUE_SIZE") or 100)
+    pipeline = Pipeline(
+        [
+            Stage("fetch", fetch, workers=int(get_env_var("CRAWL_FETCH_WORKERS") or 10), queue_size=queue_size),
+            Stage(
+                "convert",
+                convert,
+                workers=int(get_env_var("CRAWL_CONVERT_WORKERS") or max(2, convert_processes())),
+                queue_size=queue_size,
+            ),
+            Stage("chunk", chunk, workers=int(get_env_var("CRAWL_CHUNK_WORKERS") or 2), queue_size=queue_size),
+            # Chunks in flight, not API calls: the summarizer and the embedding batcher bound those. Batched
+            # summaries need several chunks of each page waiting at once.
+            Stage("enrich", enrich, workers=int(get_env_var("CRAWL_ENRICH_WORKERS") or 256), queue_size=queue_size),
+            Stage("store", store, workers=int(get_env_var("CRAWL_STORE_WORKERS") or 4), queue_size=queue_size),
+        ]
+    )
 
+    log.info(f"Processing {len(urls)} URLs")
+    try:
+        stats = await pipeline.run(urls)
+        log.info(
+            f"Converted {conversions.pages} pages ({conversions.html_chars / 1e6:.1f} MB of HTML, "
+            f"{conversions.kept_ratio:.0%} kept as main content) in {conversions.cpu_seconds:.1f} CPU seconds on "
+            f"{max(convert_processes(), 1)} processes: {conversions.pages_per_core_second:.1f} pages/s per core"
+        )
+        return stats
+    finally:
+        await writer.close()
+        while finalizers:
+            await asyncio.gather(*list(finalizers))
 
-def get_clinia_docs_urls() -> List[str]:
+
+def get_clinia_docs_sitemap() -> Dict[str, Optional[str]]:
     """
-    Retrieve the list of Clinia documentation URLs from the XML sitemap.
+    Retrieve the Clinia documentation URLs and their last modification date from the XML sitemap.
 
     Returns:
-        List[str]: The list of URLs extracted from the sitemap.
+        Dict[str, Optional[str]]: The <lastmod> value (or None) of each URL, in sitemap order.
     """
+    import requests
+
     sitemap_url = "https://docs.clinia.com/sitemap.xml"
     try:
         response = requests.get(sitemap_url)
         response.raise_for_status()
         root = ElementTree.fromstring(response.content)
         namespace = {"ns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-        urls = [loc.text for loc in root.findall(".//ns:loc", namespace)]
-        return urls
+        entries = {}
+        for entry in root.findall(".//ns:url", namespace):
+            loc = entry.findtext("ns:loc", namespaces=namespace)
+            if loc:
+                entries[loc.strip()] = entry.findtext("ns:lastmod", namespaces=namespace)
+        return entries
 
     except Exception as e:
         log.error(f"Error fetching sitemap: {e}")
-        return []
+        return {}
 
 
-def clear_existing_records():
+def get_clinia_docs_urls() -> List[str]:
     """
-    Delete existing records from the 'clinia_docs' source in the 'site_pages' table.
+    Retrieve the list of Clinia documentation URLs from the XML sitemap.
 
     Returns:
-        Any: The result of the delete operation or None if an error occurs.
+        List[str]: The list of URLs extracted from the sitemap.
     """
-    try:
-        result = supabase.table("site_pages").delete().eq("metadata->>source", "clinia_docs").execute()
-        log.info("Cleared existing clinia_doc_pages records from site_pages")
-        return result
+    return list(get_clinia_docs_sitemap())
 
-    except Exception as e:
-        log.error(f"Error clearing existing records: {e}")
-        return None
 
+async def crawl_into_new_version(urls: List[str], manifest: CrawlManifest, lastmods: Dict[str, Optional[str]]):
+    """
+    Crawl every URL into the shadow table of a new corpus version and swap it in once validated.
 
-async def crawl_clinia_docs():
+    Retrieval keeps reading the previous corpus until the swap, so it never sees a partial index. The manifest
+    is only meaningful for the live corpus: it is cleared and refilled here, and the caller must not save it
+    if the swap fails.
+
+    Args:
+        urls (List[str]): The list of URLs to crawl.
+        manifest (CrawlManifest): The crawl manifest, rebuilt for the new version.
+        lastmods (Dict[str, Optional[str]]): The sitemap <lastmod> of each URL.
+
+    Raises:
+        CorpusSwapError: If the new version could not be loaded, validated or activated.
+    """
+    versions = CorpusVersions(get_supabase_client())
+    version = new_corpus_version()
+    table = versions.create_shadow(version)
+
+    manifest.clear()
+    writer = create_writer(table)
+    async with create_fetcher() as fetcher:
+        await crawl_pipeline(urls, fetcher, writer, manifest=manifest, lastmods=lastmods)
+
+    if writer.stats.failed_rows:
+        raise CorpusSwapError(f"{writer.stats.failed_rows} rows could not be written to {table}")
+    versions.finalize(
+        version,
+        writer.stats.rows,
+        min_ratio=float(get_env_var("CORPUS_MIN_ROW_RATIO") or 0.9),
+        index_method=get_env_var("VECTOR_INDEX_METHOD") or "hnsw",
+        quantization=get_env_var("VECTOR_QUANTIZATION") or "none",
+        dimensions=int(get_env_var("VECTOR_DIMENSIONS") or 1536),
+    )
+    versions.activate(version)
+    versions.gc(keep=int(get_env_var("CORPUS_KEEP_VERSIONS") or 1))
+
+
+def touch_corpus_version():
+    """Tell the agents the live corpus changed in place, so their semantic caches drop stale search results."""
+    try:
+        CorpusVersions(get_supabase_client()).touch()
+    except CorpusSwapError as e:
+        log.warning(f"Could not record the corpus change, cached search results will only expire: {e}")
+
+
+async def crawl_clinia_docs(incremental: bool = False):
     """
-    Main orchestration for crawling: clears old records, fetches URLs, and launches the crawling process.
+    Main orchestration for crawling: fetches URLs and launches the crawling process.
+
+    A full crawl loads a new corpus version next to the live one and atomically swaps it in (see
+    `crawl_into_new_version`). In incremental mode the live corpus is updated in place: pages the sitemap
+    reports as unchanged are skipped, the others are fetched conditionally and only their changed chunks
+    are re-processed. Pages that left the sitemap are deleted.
+
+    Args:
+        incremental (bool, optional): Only re-process what changed since the last crawl. Defaults to False.
 
     Returns:
         None
     """
+    manifest = CrawlManifest.load(manifest_path)
+    completed = False
+    start = time.perf_counter()
     try:
         log.info("Starting crawling process...")
 
-        log.info("Clearing existing records…")
-        clear_existing_records()
-
         log.info("Fetching URLs from Clinia docs sitemap…")
-        urls = get_clinia_docs_urls()
+        sitemap = get_clinia_docs_sitemap()
 
-        if not urls:
+        if not sitemap:
             log.warning("No URLs found to crawl")
             return
 
-        log.info(f"Found {len(urls)} URLs to crawl")
-        await crawl_parallel_with_requests(urls)
-        log.info("Crawling process completed")
+        try:
+            if incremental:
+                removed = [url for url in manifest.pages if url not in sitemap]
+                for url in removed:
+                    log.info(f"Removed from sitemap: {url}")
+                    if delete_chunks(url) is not None:
+                        manifest.remove(url)
+
+                urls = [url for url in sitemap if not manifest.is_unchanged_in_sitemap(url, sitemap[url])]
+                log.info(
+                    f"Found {len(urls)} URLs to crawl ({len(sitemap) - len(urls)} unchanged according to the sitemap)"
+                )
+                async with create_fetcher() as fetcher:
+                    await crawl_pipeline(urls, fetcher, create_writer(), manifest=manifest, lastmods=sitemap)
+                if urls or removed:
+                    touch_corpus_version()
+            else:
+                log.info(f"Found {len(sitemap)} URLs to crawl into a new corpus version")
+                await crawl_into_new_version(list(sitemap), manifest, sitemap)
+            completed = True
+            log.info(f"Chunks stored after {time.perf_counter() - start:.1f}s")
+            if get_summarizer().mode == "deferred":
+                await fill_pending_summaries()
+        finally:
+            await get_embedding_batcher().close()
+            await get_summarizer().close()
+
+        stats = get_embedding_batcher().stats
+        log.info(
+            f"Embedded {stats.inputs} chunks in {stats.requests} requests "
+            f"(mean batch {stats.mean_batch_size:.1f}, {stats.retries} retries, {stats.failed_inputs} failed, "
+            f"{stats.cache_hits} served from cache)"
+        )
+        get_summarizer().log_stats()
+        if (cache := get_content_cache()) is not None:
+            cache.log_stats()
+        log.info(f"Crawling process completed in {time.perf_counter() - start:.1f}s")
 
     except Exception as e:
         log.error(f"Error in crawling process: {str(e)}")
 
+    finally:
+        # A failed full crawl leaves the previous corpus live, and the manifest on disk still describes it.
+        if incremental or completed:
+            manifest.save()
+        close_content_cache()
+
 
 if __name__ == "__main__":
-    asyncio.run(crawl_clinia_docs())
+    parser = argparse.ArgumentParser(description="Crawl the Clinia documentation into Supabase.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-process pages and chunks that changed since the last crawl instead of rebuilding everything.",
+    )
+    parser.add_argument(
+        "--fill-summaries",
+        action="store_true",
+        help="Only fill in the summaries of chunks stored without one (SUMMARY_MODE=deferred), then exit.",
+    )
+    args = parser.parse_args()
+
+    if args.fill_summaries:
+        asyncio.run(fill_pending_summaries())
+        close_content_cache()
+    else:
+        asyncio.run(crawl_clinia_docs(incremental=args.incremental))
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from utils import get_env_var
+
+log = logging.getLogger("clinia-doc-crawler")
+
+# Entries evicted at once when a table is full, as a fraction of max_entries, so eviction is not paid on every put.
+EVICTION_FRACTION = 0.05
+# Cache hits whose last_used update is written at once, in one transaction, rather than one UPDATE per hit.
+TOUCH_BATCH_SIZE = 256
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def cache_key(model: str, prompt_version: str, text: str) -> str:
+    """Return the content address of a model output.
+
+    Args:
+        model (str): The model producing the output.
+        prompt_version (str): The version of the prompt (or "embedding" for embeddings).
+        text (str): The input text.
+
+    Returns:
+        str: The hex SHA-256 digest identifying the output.
+    """
+    return hashlib.sha256(f"{model}\0{prompt_version}\0{text}".encode("utf-8")).hexdigest()
+
+
+class ContentCache:
+    """
+    Disk-backed, content-addressed cache for chunk titles/summaries and embeddings.
+
+    Everything lives in one SQLite file. Embeddings are stored as packed float32 blobs (6 KB for a
+    1536-dimension vector instead of ~30 KB of JSON). Each table is bounded to ``max_entries`` rows and
+    the least recently used rows are evicted first.
+
+    Lookups and writes are called from the event loop, so neither scans a table: row counts are kept in memory
+    (counted once at open), and the last_used times of hits are buffered and written in batches of
+    TOUCH_BATCH_SIZE, before an eviction and on close.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats: Dict[str, CacheStats] = {"summary": CacheStats(), "embedding": CacheStats()}
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        # Upper bounds of the table sizes: a put that replaces an existing row still counts one more.
+        self._counts = {
+            table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("summaries", "embeddings")
+        }
+        self._touched: Dict[str, Dict[str, float]] = {"summaries": {}, "embeddings": {}}
+
+    def get_summary(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Look up a cached title and summary.
+
+        Args:
+            key (str): The cache key from `cache_key`.
+
+        Returns:
+            Optional[Dict[str, str]]: The 'title' and 'summary' keys, or None on a miss.
+        """
+        row = self._get("summaries", "title, summary", key, "summary")
+        return {"title": row[0], "summary": row[1]} if row else None
+
+    def put_summary(self, key: str, title: str, summary: str):
+        self._put(
+            "summaries", "(key, title, summary, last_used) VALUES (?, ?, ?, ?)", (key, title, summary, time.time())
+        )
+
+    def get_embedding(self, key: str) -> Optional[List[float]]:
+        """
+        Look up a cached embedding.
+
+        Args:
+            key (str): The cache key from `cache_key`.
+
+        Returns:
+            Optional[List[float]]: The embedding vector, or None on a miss.
+        """
+        row = self._get("embeddings", "vector", key, "embedding")
+        return array("f", row[0]).tolist() if row else None
+
+    def put_embedding(self, key: str, embedding: List[float]):
+        blob = array("f", embedding).tobytes()
+        self._put("embeddings", "(key, vector, last_used) VALUES (?, ?, ?)", (key, blob, time.time()))
+
+    def close(self):
+        with self._lock:
+            for table in self._touched:
+                self._flush_touched(table)
+            self._conn.close()
+
+    def _get(self, table: str, columns: str, key: str, kind: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {columns} FROM {table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats[kind].misses += 1
+                return None
+            self.stats[kind].hits += 1
+            touched = self._touched[table]
+            touched[key] = time.time()
+            if len(touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touched(table)
+            return row
+
+    def _put(self, table: str, values_sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {table} {values_sql}", params)
+            self._counts[table] += 1
+            if self._counts[table] <= self.max_entries:
+                return
+            # The in-memory count overestimates after replaced rows: count for real before evicting.
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            if count > self.max_entries:
+                self._flush_touched(table)
+                evicted = count - self.max_entries + max(1, int(self.max_entries * EVICTION_FRACTION))
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE key IN (SELECT key FROM {table} ORDER BY last_used LIMIT ?)",
+                    (evicted,),
+                )
+                self.stats["summary" if table == "summaries" else "embedding"].evictions += evicted
+                count -= evicted
+            self._counts[table] = count
+
+    def _flush_touched(self, table: str):
+        # Called with the lock held.
+        touched = self._touched[table]
+        if not touched:
+            return
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            f"UPDATE {table} SET last_used = ? WHERE key = ?", [(used, key) for key, used in touched.items()]
+        )
+        self._conn.execute("COMMIT")
+        touched.clear()
+
+    def log_stats(self):
+        for kind, stats in self.stats.items():
+            log.info(
+                f"Content cache {kind}: {stats.hits} hits, {stats.misses} misses "
+                f"({stats.hit_rate:.0%} hit rate), {stats.evictions} evictions"
+            )
+
+
+@lru_cache(maxsize=1)
+def get_content_cache() -> Optional[ContentCache]:
+    """
+    Return the process-wide content cache, opening it on first use.
+
+    The cache lives in CONTENT_CACHE_PATH (default: .cache/content_cache.sqlite at the project root) and is
+    disabled when CONTENT_CACHE_DISABLED is set.
+
+    Returns:
+        Optional[ContentCache]: The shared cache, or None if it is disabled or cannot be opened.
+    """
+    if get_env_var("CONTENT_CACHE_DISABLED"):
+        return None
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = get_env_var("CONTENT_CACHE_PATH") or os.path.join(project_root, ".cache", "content_cache.sqlite")
+    try:
+        return ContentCache(path, max_entries=int(get_env_var("CONTENT_CACHE_MAX_ENTRIES") or 200_000))
+    except Exception as e:
+        log.error(f"Error opening content cache at {path}: {e}")
+        return None
+
+
+def close_content_cache():
+    """Close the process-wide content cache if it was opened, writing its pending last_used updates."""
+    if get_content_cache.cache_info().currsize and (cache := get_content_cache()) is not None:
+        cache.close()
+    get_content_cache.cache_clear()
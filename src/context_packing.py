@@ -0,0 +1,182 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from embedding_batcher import estimate_tokens
+
+# Characters of the start of a chunk looked for at the end of the previous one when merging overlapping chunks.
+OVERLAP_PROBE_CHARS = 64
+
+
+@dataclass
+class PackedContext:
+    text: str
+    candidates: int
+    chunks: int
+    sections: int
+    tokens: int
+
+
+@dataclass
+class _Section:
+    url: str
+    title: str
+    last_chunk: int
+    rank: int
+    text: str
+
+
+def row_embedding(row: Dict[str, Any]) -> Optional[np.ndarray]:
+    """
+    Return the embedding returned with a search result as a float32 array.
+
+    Args:
+        row (Dict[str, Any]): A search result; PostgREST returns vectors as strings like "[0.1,0.2]".
+
+    Returns:
+        Optional[np.ndarray]: The embedding, or None if the row has none.
+    """
+    embedding = row.get("embedding")
+    if embedding is None:
+        return None
+    if isinstance(embedding, str):
+        embedding = json.loads(embedding)
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def parse_embeddings(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert the embeddings of search results to float32 arrays in place, once, and return the rows."""
+    for row in rows:
+        if row.get("embedding") is not None:
+            row["embedding"] = row_embedding(row)
+    return rows
+
+
+def mmr_order(rows: List[Dict[str, Any]], diversity: float = 0.3) -> List[int]:
+    """
+    Order search results by maximal marginal relevance: each next row is the most relevant one that is least
+    similar to the rows already picked.
+
+    Relevance is the row's `similarity` to the query when the search returns it (vector search), its rank
+    otherwise (hybrid search scores are not on the same scale as cosine similarities). Rows are kept in their
+    order if any of them has no embedding.
+
+    Args:
+        rows (List[Dict[str, Any]]): The search results, best first.
+        diversity (float, optional): The weight of novelty against relevance, from 0 (relevance only) to 1.
+            Defaults to 0.3.
+
+    Returns:
+        List[int]: The indexes of the rows, in the order they should be used.
+    """
+    embeddings = [row_embedding(row) for row in rows]
+    if not rows or diversity <= 0 or any(embedding is None for embedding in embeddings):
+        return list(range(len(rows)))
+
+    if all("similarity" in row for row in rows):
+        relevance = np.array([row["similarity"] for row in rows], dtype=np.float32)
+    else:
+        relevance = 1.0 - np.arange(len(rows), dtype=np.float32) / len(rows)
+    matrix = np.stack(embeddings)
+    similarities = matrix @ matrix.T
+
+    order = [0]
+    redundancy = similarities[0].copy()
+    remaining = np.ones(len(rows), dtype=bool)
+    remaining[0] = False
+    while remaining.any():
+        scores = np.where(remaining, (1 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        order.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, similarities[best])
+    return order
+
+
+def merge_overlap(previous: str, following: str) -> str:
+    """
+    Join two consecutive chunks of a page, dropping the text the second one repeats from the first (overlap).
+
+    Args:
+        previous (str): The earlier chunk.
+        following (str): The chunk right after it.
+
+    Returns:
+        str: The joined text.
+    """
+    probe = following[:OVERLAP_PROBE_CHARS]
+    start = previous.rfind(probe) if probe else -1
+    while start > 0:
+        if following.startswith(previous[start:]):
+            return previous + following[len(previous) - start :]
+        start = previous.rfind(probe, 0, start + len(probe) - 1)
+    return previous + "\n\n" + following
+
+
+def pack_context(
+    rows: List[Dict[str, Any]],
+    token_budget: int = 2000,
+    diversity: float = 0.3,
+    summaries_only: bool = False,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> PackedContext:
+    """
+    Pack search results into a compact context for the agent, within a token budget.
+
+    Rows are taken in maximal marginal relevance order (see `mmr_order`) while they fit in the budget; exact
+    duplicates are dropped. Consecutive chunks of a page are merged into one section, and each section is written
+    once with its title and source URL, in the order of its best row.
+
+    Args:
+        rows (List[Dict[str, Any]]): The search results, best first.
+        token_budget (int, optional): The maximum size of the packed text, in tokens. Defaults to 2000.
+        diversity (float, optional): The weight of novelty in the selection (0 keeps the search order). Defaults
+            to 0.3.
+        summaries_only (bool, optional): Use the stored summary of each chunk instead of its content. Defaults to
+            False.
+        count_tokens (Callable[[str], int], optional): Measures a text. Defaults to a 4 characters per token
+            estimate.
+
+    Returns:
+        PackedContext: The packed text and what went into it.
+    """
+    order = mmr_order(rows, diversity)
+    selected: Dict[int, str] = {}
+    seen = set()
+    used = 0
+    for index in order:
+        row = rows[index]
+        text = (row.get("summary") if summaries_only else None) or row["content"]
+        if text in seen:
+            continue
+        # The title and URL lines are counted for every chunk, even though merged chunks share them.
+        header = count_tokens(row["title"] + row["url"]) + 4
+        cost = count_tokens(text) + header
+        if used + cost > token_budget:
+            if selected:
+                continue
+            # Never return nothing: cut the best row down to about the budget.
+            text = text[: max(token_budget - header, 0) * 4]
+            cost = token_budget
+        seen.add(text)
+        selected[index] = text
+        used += cost
+
+    rank = {index: position for position, index in enumerate(order)}
+    sections: List[_Section] = []
+    for index in sorted(selected, key=lambda i: (rows[i]["url"], rows[i].get("chunk_number", 0))):
+        row, text = rows[index], selected[index]
+        chunk_number = row.get("chunk_number", 0)
+        last = sections[-1] if sections else None
+        if last is not None and last.url == row["url"] and last.last_chunk + 1 == chunk_number:
+            last.text = last.text + "\n" + text if summaries_only else merge_overlap(last.text, text)
+            last.last_chunk = chunk_number
+            last.rank = min(last.rank, rank[index])
+        else:
+            sections.append(_Section(row["url"], row["title"], chunk_number, rank[index], text))
+
+    sections.sort(key=lambda section: section.rank)
+    text = "\n\n".join(f"## {section.title}\nSource: {section.url}\n{section.text.strip()}" for section in sections)
+    return PackedContext(text, len(rows), len(selected), len(sections), count_tokens(text))
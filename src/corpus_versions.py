@@ -0,0 +1,153 @@
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+log = logging.getLogger("clinia-doc-crawler")
+
+
+class CorpusSwapError(Exception):
+    """Raised when a new corpus version cannot be loaded, validated or activated."""
+
+
+def new_corpus_version(now: Optional[datetime] = None) -> str:
+    """
+    Return a version identifier for a new corpus, sortable by creation time.
+
+    Args:
+        now (Optional[datetime], optional): The creation time. Defaults to the current UTC time.
+
+    Returns:
+        str: The version, e.g. 'v20250101t120000'; its shadow table is 'site_pages_<version>'.
+    """
+    return "v" + (now or datetime.now(timezone.utc)).strftime("%Y%m%dt%H%M%S")
+
+
+class CorpusVersions:
+    """
+    Client for the versioned corpus functions of `supabase_script/corpus_versions.sql`.
+
+    A full crawl loads a shadow table while retrieval keeps reading the live `site_pages`. Once loaded, the
+    shadow table gets its vector index, is validated against the number of rows the crawler wrote and is
+    renamed to `site_pages` in a single transaction.
+    """
+
+    def __init__(self, client, schema_reload_timeout: float = 30.0):
+        self.client = client
+        self.schema_reload_timeout = schema_reload_timeout
+
+    def create_shadow(self, version: str) -> str:
+        """
+        Create the empty shadow table of a new version and wait until it can be written through the API.
+
+        Args:
+            version (str): The new version, from `new_corpus_version`.
+
+        Returns:
+            str: The name of the shadow table.
+        """
+        table = self._rpc("create_corpus_shadow", {"p_version": version})
+        self._wait_for_table(table)
+        log.info(f"Created corpus version {version} ({table})")
+        return table
+
+    def finalize(
+        self,
+        version: str,
+        expected_rows: int,
+        min_ratio: float = 0.9,
+        index_method: str = "hnsw",
+        quantization: str = "none",
+        dimensions: int = 1536,
+    ) -> int:
+        """
+        Validate a loaded shadow table and build its indexes.
+
+        Args:
+            version (str): The version being loaded.
+            expected_rows (int): The number of rows the crawler wrote.
+            min_ratio (float, optional): The minimum size of the new corpus relative to the live one. Defaults to 0.9.
+            index_method (str, optional): The vector index to build, "hnsw" or "ivfflat". Defaults to "hnsw".
+            quantization (str, optional): What the index stores: "none", "halfvec" or "binary". Defaults to "none".
+            dimensions (int, optional): The number of leading dimensions indexed. Defaults to 1536 (all).
+
+        Returns:
+            int: The number of rows of the new version.
+
+        Raises:
+            CorpusSwapError: If the shadow table is empty, is missing rows or is too small to replace the live corpus.
+        """
+        row = self._rpc(
+            "finalize_corpus_shadow",
+            {
+                "p_version": version,
+                "p_expected_rows": expected_rows,
+                "p_min_ratio": min_ratio,
+                "p_index_method": index_method,
+                "p_quantization": quantization,
+                "p_dimensions": dimensions,
+            },
+        )
+        if row["status"] != "ready":
+            raise CorpusSwapError(
+                f"Corpus version {version} failed validation: {row['row_count']} rows loaded, {expected_rows} "
+                f"written and at least {min_ratio:.0%} of the live corpus required"
+            )
+        log.info(f"Corpus version {version} is ready with {row['row_count']} rows")
+        return row["row_count"]
+
+    def activate(self, version: str):
+        """
+        Atomically make a ready version the live `site_pages` table and retire the previous one.
+
+        Args:
+            version (str): The version to activate.
+        """
+        self._rpc("activate_corpus_version", {"p_version": version})
+        log.info(f"Activated corpus version {version}")
+
+    def gc(self, keep: int = 1) -> List[str]:
+        """
+        Drop retired versions beyond the `keep` most recent ones, and failed or abandoned loads.
+
+        Args:
+            keep (int, optional): The number of retired versions kept for rollback. Defaults to 1.
+
+        Returns:
+            List[str]: The versions dropped.
+        """
+        dropped = self._rpc("gc_corpus_versions", {"p_keep": keep}) or []
+        if dropped:
+            log.info(f"Dropped corpus versions: {', '.join(dropped)}")
+        return dropped
+
+    def current(self) -> str:
+        """
+        Return the identifier of the live corpus, which changes on every swap and every incremental crawl.
+
+        Returns:
+            str: The active version and the time of its last change, or 'unversioned' before the first swap.
+        """
+        return self._rpc("current_corpus_version", {})
+
+    def touch(self):
+        """Record that the live corpus was changed in place, e.g. by an incremental crawl."""
+        self._rpc("touch_corpus_version", {})
+
+    def _rpc(self, name: str, params: Dict[str, Any]) -> Any:
+        try:
+            return self.client.rpc(name, params).execute().data
+        except Exception as e:
+            raise CorpusSwapError(f"{name} failed: {e}") from e
+
+    def _wait_for_table(self, table: str):
+        # PostgREST reloads its schema cache asynchronously after the NOTIFY sent by create_corpus_shadow.
+        deadline = time.monotonic() + self.schema_reload_timeout
+        while True:
+            try:
+                self.client.table(table).select("id").limit(1).execute()
+                return
+            except Exception as e:
+                if time.monotonic() > deadline:
+                    raise CorpusSwapError(f"Shadow table {table} is not visible through the API: {e}") from e
+                time.sleep(0.5)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class PageState:
+    """
+    What the crawler knew about a page the last time it was stored.
+
+    Attributes:
+        lastmod (Optional[str]): The <lastmod> value from the sitemap.
+        etag (Optional[str]): The ETag response header.
+        last_modified (Optional[str]): The Last-Modified response header.
+        chunk_hashes (List[str]): The content hash of each stored chunk, indexed by chunk_number.
+    """
+
+    lastmod: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    chunk_hashes: List[str] = field(default_factory=list)
+
+
+def hash_chunk(content: str) -> str:
+    """Return the content hash used to detect changed chunks.
+
+    Args:
+        content (str): The chunk text.
+
+    Returns:
+        str: The hex SHA-256 digest of the chunk.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def diff_chunks(old_hashes: List[str], new_hashes: List[str]) -> Tuple[List[int], List[int]]:
+    """Compare the stored chunk hashes of a page with the freshly computed ones.
+
+    Args:
+        old_hashes (List[str]): The hashes stored in the manifest, indexed by chunk_number.
+        new_hashes (List[str]): The hashes of the new chunks, indexed by chunk_number.
+
+    Returns:
+        Tuple[List[int], List[int]]:
+            - List[int]: The chunk numbers that must be (re)written.
+            - List[int]: The chunk numbers that no longer exist and must be deleted.
+    """
+    changed = [i for i, digest in enumerate(new_hashes) if i >= len(old_hashes) or old_hashes[i] != digest]
+    removed = list(range(len(new_hashes), len(old_hashes)))
+    return changed, removed
+
+
+class CrawlManifest:
+    """Per-URL crawl state persisted as a JSON file between crawler runs."""
+
+    def __init__(self, path: str, pages: Optional[Dict[str, PageState]] = None):
+        self.path = path
+        self.pages: Dict[str, PageState] = pages or {}
+
+    @classmethod
+    def load(cls, path: str) -> "CrawlManifest":
+        """
+        Load the manifest from disk, or return an empty one if the file does not exist yet.
+
+        Args:
+            path (str): The path of the JSON manifest file.
+
+        Returns:
+            CrawlManifest: The loaded manifest.
+        """
+        if not os.path.exists(path):
+            return cls(path)
+
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return cls(path, {url: PageState(**state) for url, state in raw.get("pages", {}).items()})
+
+    def save(self):
+        """Atomically write the manifest to disk."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pages": {url: asdict(state) for url, state in sorted(self.pages.items())}}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, url: str) -> Optional[PageState]:
+        return self.pages.get(url)
+
+    def set(self, url: str, state: PageState):
+        self.pages[url] = state
+
+    def remove(self, url: str):
+        self.pages.pop(url, None)
+
+    def clear(self):
+        self.pages.clear()
+
+    def is_unchanged_in_sitemap(self, url: str, lastmod: Optional[str]) -> bool:
+        """
+        Tell whether the sitemap reports the page as unchanged since it was stored.
+
+        Args:
+            url (str): The page URL.
+            lastmod (Optional[str]): The <lastmod> value currently in the sitemap.
+
+        Returns:
+            bool: True if both the stored and current lastmod are known and equal.
+        """
+        state = self.pages.get(url)
+        return bool(state and lastmod and state.lastmod == lastmod)
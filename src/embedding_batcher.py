@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional
+
+from content_cache import ContentCache, cache_key
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+log = logging.getLogger("clinia-doc-crawler")
+
+# Status codes worth retrying as-is: timeouts, conflicts, rate limits and server errors.
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class EmbeddingError(RuntimeError):
+    """Raised when an input could not be embedded after all retries."""
+
+
+@dataclass
+class _PendingInput:
+    text: str
+    tokens: int
+    future: asyncio.Future
+    cache_key: Optional[str] = None
+
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    inputs: int = 0
+    retries: int = 0
+    failed_inputs: int = 0
+    cache_hits: int = 0
+    request_seconds: float = 0.0
+    batch_sizes: List[int] = field(default_factory=list)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound-ish token estimate (~4 characters per token) used to respect the batch token budget.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return len(text) // 4 + 1
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Tell whether an embeddings API error is transient.
+
+    Errors without an HTTP status (connection errors, timeouts) are considered transient.
+
+    Args:
+        error (Exception): The error raised by the OpenAI client.
+
+    Returns:
+        bool: True if the same request may succeed when sent again.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+class EmbeddingBatcher:
+    """Collect texts from many concurrent callers and embed them with multi-input requests.
+
+    Callers simply ``await batcher.embed(text)``. Inputs are buffered until the batch is full (by count or by
+    estimated tokens) or until ``flush_interval`` elapses, then sent as one ``embeddings.create`` call. At most
+    ``max_concurrent`` requests are in flight. A transient failure retries the batch with exponential backoff; a
+    permanent failure is bisected so only the offending slice is retried, and inputs that still fail raise
+    ``EmbeddingError`` to their caller instead of silently receiving a zero vector.
+
+    When a content cache is given, inputs already embedded with the same model are answered from it
+    without being queued, and every new embedding is stored in it.
+    """
+
+    def __init__(
+        self,
+        client: "AsyncOpenAI",
+        model: str,
+        batch_size: int = 256,
+        max_batch_tokens: int = 100_000,
+        max_concurrent: int = 4,
+        max_retries: int = 5,
+        flush_interval: float = 0.05,
+        backoff_base: float = 0.5,
+        cache: Optional[ContentCache] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.flush_interval = flush_interval
+        self.backoff_base = backoff_base
+        self.cache = cache
+        self.stats = BatcherStats()
+
+        self._pending: List[_PendingInput] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed one text, sharing the API request with every other input queued at the same time.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            List[float]: The embedding vector for the text.
+
+        Raises:
+            EmbeddingError: If the text could not be embedded after all retries.
+        """
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.model, "embedding", text)
+            cached = self.cache.get_embedding(key)
+            if cached is not None:
+                self.stats.cache_hits += 1
+                return cached
+
+        loop = asyncio.get_running_loop()
+        item = _PendingInput(text=text, tokens=estimate_tokens(text), future=loop.create_future(), cache_key=key)
+
+        if self._pending and self._pending_tokens + item.tokens > self.max_batch_tokens:
+            self._flush()
+
+        self._pending.append(item)
+        self._pending_tokens += item.tokens
+
+        if len(self._pending) >= self.batch_size or self._pending_tokens >= self.max_batch_tokens:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush)
+
+        return await item.future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, preserving their order.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One embedding vector per input text.
+        """
+        return list(await asyncio.gather(*[self.embed(text) for text in texts]))
+
+    async def close(self):
+        """Send whatever is still buffered and wait for every in-flight request to finish."""
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        self._spawn(batch, attempt=0)
+
+    def _spawn(self, batch: List[_PendingInput], attempt: int):
+        task = asyncio.get_running_loop().create_task(self._send(batch, attempt))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[_PendingInput], attempt: int):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        try:
+            async with self._semaphore:
+                start = time.perf_counter()
+                self.stats.requests += 1
+                self.stats.batch_sizes.append(len(batch))
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.model, input=[item.text for item in batch]
+                    )
+                finally:
+                    self.stats.request_seconds += time.perf_counter() - start
+
+        except Exception as e:
+            await self._handle_failure(batch, attempt, e)
+            return
+
+        for data in response.data:
+            if 0 <= data.index < len(batch) and not batch[data.index].future.done():
+                item = batch[data.index]
+                item.future.set_result(data.embedding)
+                self.stats.inputs += 1
+                if self.cache is not None and item.cache_key:
+                    self.cache.put_embedding(item.cache_key, data.embedding)
+        missing = [item for item in batch if not item.future.done()]
+
+        if missing:
+            # Only the inputs the API did not answer are sent again.
+            await self._handle_failure(missing, attempt, EmbeddingError("Incomplete embeddings response"))
+
+    async def _handle_failure(self, batch: List[_PendingInput], attempt: int, error: Exception):
+        retryable = _is_retryable(error)
+
+        if retryable and attempt < self.max_retries:
+            self.stats.retries += 1
+            delay = self.backoff_base * (2**attempt)
+            log.warning(f"Embedding batch of {len(batch)} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            self._spawn(batch, attempt + 1)
+            return
+
+        if not retryable and len(batch) > 1:
+            # Bisect so one bad input does not sink the whole batch.
+            middle = len(batch) // 2
+            self.stats.retries += 1
+            self._spawn(batch[:middle], attempt)
+            self._spawn(batch[middle:], attempt)
+            return
+
+        log.error(f"Error getting embedding for {len(batch)} input(s): {error}")
+        for item in batch:
+            if not item.future.done():
+                self.stats.failed_inputs += 1
+                item.future.set_exception(EmbeddingError(f"Could not embed input: {error}"))
@@ -0,0 +1,402 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import agent_tools
+from agent_tools import SAMPLE_DATA_PATH
+from async_rpc import close_async_rpc_clients
+from clinia_doc_agent import CliniaDocAgentsDeps, stream_agent_answer
+from utils import get_clients, get_env_var
+
+log = logging.getLogger("clinia-doc-crawler")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE_PATH = os.path.join(PROJECT_ROOT, "evals", "baseline.json")
+
+# Per-run measurements summarized as p50/p95/mean and compared against the baseline (lower is better).
+METRICS = ("latency", "time_to_first_token", "retrieval_time", "tool_calls", "total_tokens")
+
+# The columns of the eval notebook's results CSV, then the runner's own measurements. Appending to a file written by
+# the notebook keeps its columns.
+CSV_HEADER = [
+    "eval_launch_time",
+    "question",
+    "expected_answer",
+    "agent_response",
+    "runtime_seconds",
+    "ttft_seconds",
+    "all_terms_found",
+    "missing_terms",
+    "tool_calls",
+    "total_tokens",
+    "retrieval_seconds",
+]
+
+
+@dataclass
+class EvalResult:
+    """
+    One run of one eval question.
+
+    Attributes:
+        index (int): The position of the question in the eval set.
+        repetition (int): The repetition (round) the run belongs to.
+        question (str): The question.
+        expected_answer (str): The comma-separated terms the answer must contain.
+        answer (str): The agent's answer.
+        latency (Optional[float]): Seconds from the question to the end of the answer.
+        time_to_first_token (Optional[float]): Seconds from the question to the first answer token.
+        retrieval_time (Optional[float]): Seconds spent retrieving documentation.
+        tool_calls (Optional[int]): The number of tool calls.
+        total_tokens (Optional[int]): Prompt and completion tokens over all model requests, if reported.
+        missing_terms (List[str]): The expected terms absent from the answer.
+        error (Optional[str]): The error that ended the run, if any.
+    """
+
+    index: int
+    repetition: int
+    question: str
+    expected_answer: str
+    answer: str = ""
+    latency: Optional[float] = None
+    time_to_first_token: Optional[float] = None
+    retrieval_time: Optional[float] = None
+    tool_calls: Optional[int] = None
+    total_tokens: Optional[int] = None
+    missing_terms: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def correct(self) -> bool:
+        return self.error is None and not self.missing_terms
+
+
+def find_missing_terms(expected_answer: str, answer: str) -> List[str]:
+    """
+    Return the expected terms (comma separated) that do not appear in the answer, ignoring case.
+
+    Args:
+        expected_answer (str): The expected answer, e.g. "Standard Search, Health-Grade Search".
+        answer (str): The agent's answer.
+
+    Returns:
+        List[str]: The missing terms, lowercased.
+    """
+    answer = answer.lower()
+    terms = [term.strip().lower() for term in expected_answer.split(",")]
+    return [term for term in terms if term and term not in answer]
+
+
+async def run_question(
+    sample: Dict[str, str],
+    index: int,
+    repetition: int,
+    deps: CliniaDocAgentsDeps,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+) -> EvalResult:
+    """
+    Ask one eval question to the agent and score the answer.
+
+    Args:
+        sample (Dict[str, str]): The eval sample, with "question" and "answer" keys.
+        index (int): The position of the question in the eval set.
+        repetition (int): The repetition the run belongs to.
+        deps (CliniaDocAgentsDeps): The agent's dependencies.
+        semaphore (asyncio.Semaphore): Limits the number of questions asked at once.
+        timeout (float): Seconds allowed for the answer.
+
+    Returns:
+        EvalResult: The measurements of the run; errors are recorded, not raised.
+    """
+    result = EvalResult(index, repetition, sample["question"], sample["answer"])
+    async with semaphore:
+        try:
+            answer = await asyncio.wait_for(stream_agent_answer(result.question, deps, on_text=lambda _: None), timeout)
+        except Exception as e:
+            log.error(f"Eval question {index} failed: {e!r}")
+            result.error = repr(e)
+            return result
+
+    result.answer = answer.text
+    result.latency = answer.runtime
+    result.time_to_first_token = answer.time_to_first_token
+    result.retrieval_time = answer.retrieval_time
+    result.tool_calls = answer.tool_calls
+    if answer.request_tokens is not None or answer.response_tokens is not None:
+        result.total_tokens = (answer.request_tokens or 0) + (answer.response_tokens or 0)
+    result.missing_terms = find_missing_terms(result.expected_answer, answer.text)
+    return result
+
+
+async def run_evals(
+    samples: List[Dict[str, str]],
+    deps: CliniaDocAgentsDeps,
+    concurrency: int = 4,
+    repeat: int = 1,
+    timeout: float = 120.0,
+) -> List[EvalResult]:
+    """
+    Run every eval question `repeat` times.
+
+    Each repetition is a round: its questions run concurrently, at most `concurrency` at a time. The query
+    embedding and semantic caches are cleared before each round, so every round pays for the same calls.
+
+    Args:
+        samples (List[Dict[str, str]]): The eval samples, with "question" and "answer" keys.
+        deps (CliniaDocAgentsDeps): The agent's dependencies.
+        concurrency (int, optional): Maximum questions asked at once. Defaults to 4.
+        repeat (int, optional): Runs of each question. Defaults to 1.
+        timeout (float, optional): Seconds allowed for each answer. Defaults to 120.
+
+    Returns:
+        List[EvalResult]: The results, ordered by repetition then question.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+    for repetition in range(repeat):
+        agent_tools.clear_query_caches()
+        results += await asyncio.gather(
+            *[run_question(sample, index, repetition, deps, semaphore, timeout) for index, sample in enumerate(samples)]
+        )
+    return results
+
+
+def summarize(results: List[EvalResult]) -> Dict[str, Any]:
+    """
+    Aggregate eval results: accuracy, error count and p50/p95/mean of each metric, overall and per question.
+
+    Args:
+        results (List[EvalResult]): The results of `run_evals`.
+
+    Returns:
+        Dict[str, Any]: The summary, JSON serializable.
+    """
+
+    def stats(runs: List[EvalResult]) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "runs": len(runs),
+            "errors": sum(run.error is not None for run in runs),
+            "accuracy": sum(run.correct for run in runs) / len(runs) if runs else 0.0,
+        }
+        for metric in METRICS:
+            values = [getattr(run, metric) for run in runs if getattr(run, metric) is not None]
+            if values:
+                p50, p95 = np.percentile(values, [50, 95])
+                summary[metric] = {"p50": float(p50), "p95": float(p95), "mean": float(np.mean(values))}
+        return summary
+
+    questions: Dict[str, List[EvalResult]] = {}
+    for result in results:
+        questions.setdefault(result.question, []).append(result)
+    return {**stats(results), "questions": {question: stats(runs) for question, runs in questions.items()}}
+
+
+def compare_to_baseline(
+    summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2, accuracy_drop: float = 0.05
+) -> List[str]:
+    """
+    List the regressions of a summary against a baseline summary.
+
+    Args:
+        summary (Dict[str, Any]): The summary of the current run.
+        baseline (Dict[str, Any]): The summary of the baseline run.
+        tolerance (float, optional): Relative increase of a metric's p50 or p95 considered a regression.
+            Defaults to 0.2 (20%).
+        accuracy_drop (float, optional): Absolute accuracy drop considered a regression. Defaults to 0.05.
+
+    Returns:
+        List[str]: A description of each regression; empty if none.
+    """
+    regressions = []
+    if summary["accuracy"] < baseline["accuracy"] - accuracy_drop:
+        regressions.append(f"accuracy {baseline['accuracy']:.2f} -> {summary['accuracy']:.2f}")
+    if summary["errors"] > baseline["errors"]:
+        regressions.append(f"errors {baseline['errors']} -> {summary['errors']}")
+    for metric in METRICS:
+        if metric not in summary or metric not in baseline:
+            continue
+        for stat in ("p50", "p95"):
+            before, after = baseline[metric][stat], summary[metric][stat]
+            if after > before * (1 + tolerance) and after - before > 1e-3:
+                regressions.append(f"{metric} {stat} {before:.3f} -> {after:.3f} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def format_report(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Format a summary as a table, with the baseline values next to the current ones when given."""
+    lines = [
+        f"{summary['runs']} runs, {summary['errors']} errors, accuracy {summary['accuracy']:.2f}"
+        + (f" (baseline {baseline['accuracy']:.2f})" if baseline else "")
+    ]
+    for metric in METRICS:
+        if metric not in summary:
+            continue
+        line = f"{metric:>20}  " + "  ".join(f"{stat} {summary[metric][stat]:9.3f}" for stat in ("p50", "p95", "mean"))
+        if baseline and metric in baseline:
+            line += "  | baseline " + "  ".join(f"{stat} {baseline[metric][stat]:9.3f}" for stat in ("p50", "p95"))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def append_results_to_csv(path: str, results: List[EvalResult], launch_time: str):
+    """
+    Append the results to a CSV file with CSV_HEADER columns, writing the header for a new file.
+
+    An existing file keeps its own header: the results fill the columns it has (e.g. only the notebook's).
+    """
+    header = CSV_HEADER
+    if os.path.isfile(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None) or CSV_HEADER
+    new_file = not os.path.isfile(path) or os.path.getsize(path) == 0
+
+    def seconds(value: Optional[float]) -> str:
+        return f"{value:.2f}" if value is not None else ""
+
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=header, restval="", extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        for result in results:
+            writer.writerow(
+                {
+                    "eval_launch_time": launch_time,
+                    "question": result.question,
+                    "expected_answer": result.expected_answer,
+                    "agent_response": result.answer if result.error is None else result.error,
+                    "runtime_seconds": seconds(result.latency),
+                    "ttft_seconds": seconds(result.time_to_first_token),
+                    "all_terms_found": result.correct,
+                    "missing_terms": ";".join(result.missing_terms),
+                    "tool_calls": result.tool_calls if result.tool_calls is not None else "",
+                    "total_tokens": result.total_tokens if result.total_tokens is not None else "",
+                    "retrieval_seconds": seconds(result.retrieval_time),
+                }
+            )
+
+
+def run_metadata(args: argparse.Namespace, samples: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Describe what was measured, so a report can be matched with the code and settings that produced it."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "launched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "model": get_env_var("PRIMARY_MODEL") or "gpt-4.1-mini",
+        "retrieval_mode": agent_tools.retrieval_mode,
+        "retrieval_backend": agent_tools.retrieval_backend,
+        "backends": "fake" if args.fake_backends else "configured",
+        "multi_query_tool": agent_tools.MULTI_QUERY_TOOL,
+        "questions": len(samples),
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+    }
+
+
+def start_fake_backends(sub_queries: int = 1):
+    """
+    Start the local fake OpenAI and Supabase servers of benchmarks/ and return clients pointed at them.
+
+    Args:
+        sub_queries (int, optional): The aspects of each question the fake model searches. Defaults to 1.
+
+    Returns:
+        Tuple: The OpenAI client, the Supabase client and the two servers (to stop them).
+    """
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "benchmarks"))
+    from fake_openai_server import FakeOpenAIConfig, FakeOpenAIServer
+    from fake_supabase_server import FAKE_SUPABASE_KEY, FakeSupabaseServer
+    from openai import AsyncOpenAI
+    from supabase import Client
+
+    openai_server = FakeOpenAIServer(config=FakeOpenAIConfig(sub_queries=sub_queries)).start()
+    supabase_server = FakeSupabaseServer().start()
+    # The agent's model is created on first use and reads its endpoint from the environment.
+    os.environ["BASE_URL"] = openai_server.base_url
+    embedding_client = AsyncOpenAI(base_url=openai_server.base_url, api_key="fake")
+    return embedding_client, Client(supabase_server.url, FAKE_SUPABASE_KEY), (openai_server, supabase_server)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Run the eval questions through the agent and report accuracy and performance."
+    )
+    parser.add_argument("--samples", default=SAMPLE_DATA_PATH, help="Eval set (JSON list of question/answer)")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N questions")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of each question")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions asked at once")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds allowed per answer")
+    parser.add_argument("--fake-backends", action="store_true", help="Use the local fake OpenAI and Supabase servers")
+    parser.add_argument(
+        "--fake-sub-queries", type=int, default=1, help="Aspects of each question the fake model searches"
+    )
+    parser.add_argument("--output", help="Write the metadata, summary and every result to this JSON file")
+    parser.add_argument(
+        "--csv",
+        help="Append the results to this CSV file (the eval notebook columns, then tool calls, tokens and retrieval time)",
+    )
+    parser.add_argument("--baseline", help=f"Compare against this report, e.g. {DEFAULT_BASELINE_PATH}")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE_PATH, help="Save the report as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative p50/p95 increase that fails the run")
+    args = parser.parse_args()
+
+    with open(args.samples, encoding="utf-8") as f:
+        samples = json.load(f)
+    if args.limit:
+        samples = samples[: args.limit]
+
+    servers = ()
+    if args.fake_backends:
+        embedding_client, supabase, servers = start_fake_backends(args.fake_sub_queries)
+    else:
+        embedding_client, supabase = get_clients()
+    deps = CliniaDocAgentsDeps(supabase=supabase, embedding_client=embedding_client)
+
+    try:
+        metadata = run_metadata(args, samples)
+        results = await run_evals(samples, deps, args.concurrency, args.repeat, args.timeout)
+    finally:
+        await close_async_rpc_clients()
+        for server in servers:
+            server.stop()
+
+    summary = summarize(results)
+    report = {"metadata": metadata, "summary": summary, "results": [asdict(result) for result in results]}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+
+    print(format_report(summary, baseline))
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        log.info(f"Wrote eval report to {path}")
+    if args.csv:
+        append_results_to_csv(args.csv, results, metadata["launched_at"])
+
+    if baseline is not None:
+        regressions = compare_to_baseline(summary, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,201 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+log = logging.getLogger("clinia-doc-crawler")
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FetchError(RuntimeError):
+    """Raised when a page cannot be fetched after all retries."""
+
+
+class PageTooLargeError(FetchError):
+    """Raised when a page body exceeds the configured maximum size."""
+
+
+@dataclass
+class FetchResponse:
+    url: str
+    status: int
+    text: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date.
+
+    Args:
+        response (httpx.Response): The response carrying the header.
+
+    Returns:
+        Optional[float]: The number of seconds to wait, or None if the header is absent or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncFetcher:
+    """
+    Polite asynchronous page fetcher sharing one pooled HTTP client.
+
+    All requests go through a single ``httpx.AsyncClient`` with keep-alive (and HTTP/2 when the ``h2``
+    package is installed), so pages reuse connections instead of paying a TCP/TLS handshake each.
+    Each host gets its own concurrency limit and a minimum delay between requests; 429 and 5xx
+    responses are retried with exponential backoff (honoring Retry-After), and bodies are streamed
+    so a page larger than ``max_page_bytes`` is abandoned without being buffered.
+
+    Use as an async context manager, or call ``close()`` when done.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        per_host_limit: int = 10,
+        min_request_interval: float = 0.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        max_page_bytes: int = 5 * 1024 * 1024,
+        timeout: float = 30.0,
+        user_agent: str = DEFAULT_USER_AGENT,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.per_host_limit = per_host_limit
+        self.min_request_interval = min_request_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_page_bytes = max_page_bytes
+
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": user_agent},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_slot: Dict[str, float] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> FetchResponse:
+        """
+        Fetch a page, optionally as a conditional request.
+
+        Args:
+            url (str): The URL to fetch.
+            etag (Optional[str], optional): Sent as If-None-Match.
+            last_modified (Optional[str], optional): Sent as If-Modified-Since.
+
+        Returns:
+            FetchResponse: The decoded body and validators, or a 304 response without a body.
+
+        Raises:
+            PageTooLargeError: If the body exceeds max_page_bytes.
+            FetchError: If the page cannot be fetched after all retries.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+
+        attempt = 0
+        while True:
+            retry_after = None
+            async with semaphore:
+                await self._wait_for_slot(host)
+                try:
+                    result = await self._fetch_once(url, headers)
+                    if isinstance(result, FetchResponse):
+                        return result
+                    error = FetchError(f"HTTP {result.status_code} for {url}")
+                    if result.status_code not in RETRYABLE_STATUS_CODES:
+                        raise error
+                    retry_after = _retry_after_seconds(result)
+                except httpx.HTTPError as e:
+                    error = e
+
+            if attempt >= self.max_retries:
+                raise FetchError(f"Error fetching {url}: {error}") from error
+
+            delay = retry_after if retry_after is not None else self.backoff_base * (2**attempt)
+            log.warning(f"Fetching {url} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _fetch_once(self, url: str, headers: Dict[str, str]):
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return FetchResponse(url=url, status=304)
+            if response.status_code >= 400:
+                return response
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_page_bytes:
+                raise PageTooLargeError(f"{url} is {declared} bytes (max {self.max_page_bytes})")
+
+            body = bytearray()
+            async for part in response.aiter_bytes():
+                body.extend(part)
+                if len(body) > self.max_page_bytes:
+                    raise PageTooLargeError(f"{url} exceeds {self.max_page_bytes} bytes")
+
+            return FetchResponse(
+                url=url,
+                status=response.status_code,
+                text=bytes(body).decode(response.encoding or "utf-8", errors="replace"),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+
+    async def _wait_for_slot(self, host: str):
+        if self.min_request_interval <= 0:
+            return
+
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._host_next_slot.get(host, 0.0))
+            self._host_next_slot[host] = slot + self.min_request_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
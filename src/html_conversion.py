@@ -0,0 +1,250 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import html2text
+
+# Elements dropped wherever they are: site navigation, sidebars, scripts and interactive widgets.
+BOILERPLATE_TAGS = {
+    "head",
+    "nav",
+    "aside",
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+    "button",
+}
+# Page headers and footers are dropped outside the main content only: an article often opens with its own header.
+PAGE_CHROME_TAGS = {"header", "footer"}
+# Class or id names of boilerplate blocks that are plain divs (docs themes: Docusaurus, Mintlify, MkDocs...).
+BOILERPLATE_NAMES = (
+    r"sidebar|navbar|breadcrumbs?|toc|table-of-contents|pagination|footer|cookie|feedback|edit-this-page|"
+    r"skip-to-content|theme-doc-toc[\w-]*"
+)
+# Outside the main content, any class or id word matches ("site-footer"); inside it, only whole class or id names
+# do, so that content blocks such as "card-footer" are kept.
+BOILERPLATE_ATTRIBUTE_RE = re.compile(rf"(?:^|[\s_-])(?:{BOILERPLATE_NAMES})(?:$|[\s_-])", re.IGNORECASE)
+BOILERPLATE_NAME_RE = re.compile(BOILERPLATE_NAMES, re.IGNORECASE)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Main content candidates, most specific first. A candidate with less visible text than this is ignored.
+MAIN_CONTENT_KINDS = ("article", "main", "role-main")
+MIN_MAIN_CONTENT_CHARS = 200
+
+# HTML2Text keeps parsing state on the instance, so each conversion thread needs its own converter.
+_converters = threading.local()
+
+
+@dataclass
+class ConversionResult:
+    markdown: str
+    html_chars: int
+    # Characters of HTML left after main content extraction (html_chars when extraction is off).
+    kept_chars: int
+    # CPU time of the conversion in the process that ran it.
+    cpu_seconds: float
+
+
+@dataclass
+class ConversionStats:
+    pages: int = 0
+    html_chars: int = 0
+    kept_chars: int = 0
+    markdown_chars: int = 0
+    cpu_seconds: float = 0.0
+
+    def add(self, result: ConversionResult):
+        self.pages += 1
+        self.html_chars += result.html_chars
+        self.kept_chars += result.kept_chars
+        self.markdown_chars += len(result.markdown)
+        self.cpu_seconds += result.cpu_seconds
+
+    @property
+    def pages_per_core_second(self) -> float:
+        return self.pages / self.cpu_seconds if self.cpu_seconds else 0.0
+
+    @property
+    def kept_ratio(self) -> float:
+        return self.kept_chars / self.html_chars if self.html_chars else 0.0
+
+
+def get_html_converter() -> "html2text.HTML2Text":
+    """
+    Return the HTML to markdown converter of the current thread.
+
+    Returns:
+        html2text.HTML2Text: A converter configured to keep links, images and tables without wrapping.
+    """
+    converter = getattr(_converters, "converter", None)
+    if converter is None:
+        import html2text
+
+        converter = html2text.HTML2Text()
+        converter.ignore_links = False
+        converter.ignore_images = False
+        converter.ignore_tables = False
+        converter.body_width = 0  # No wrapping
+        _converters.converter = converter
+    return converter
+
+
+class _MainContentParser(HTMLParser):
+    # Re-emits the HTML it reads without boilerplate, into one buffer for the whole page and one per main
+    # content candidate (the first <article>, <main> and role="main" element).
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.page: List[str] = []
+        self.page_text = 0
+        self.candidates: Dict[str, List[str]] = {}
+        self.candidate_text: Dict[str, int] = {}
+        self._open: Dict[str, int] = {}
+        self._stack: List[str] = []
+        self._skip_depth: Optional[int] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if self._skip_depth is None:
+                self._emit(self.get_starttag_text())
+            return
+
+        if tag == "body" and "head" in self._stack:
+            # </head> is optional: the body closes it.
+            self.handle_endtag("head")
+        self._stack.append(tag)
+        if self._skip_depth is None and self._is_boilerplate(tag, dict(attrs)):
+            self._skip_depth = len(self._stack)
+        if self._skip_depth is not None:
+            return
+
+        kind = self._candidate_kind(tag, dict(attrs))
+        if kind is not None and kind not in self.candidates:
+            self.candidates[kind], self.candidate_text[kind] = [], 0
+            self._open[kind] = len(self._stack)
+        self._emit(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        if self._skip_depth is None and not self._is_boilerplate(tag, dict(attrs)):
+            self._emit(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        # Close the elements left open inside this one, as browsers do.
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            if self._skip_depth is None:
+                self._emit(f"</{closed}>")
+            elif depth == self._skip_depth:
+                self._skip_depth = None
+            for kind, open_depth in list(self._open.items()):
+                if open_depth == depth:
+                    del self._open[kind]
+            if closed == tag:
+                return
+
+    def handle_data(self, data):
+        if self._skip_depth is None:
+            self._emit(data, text=len(data.strip()))
+
+    def handle_entityref(self, name):
+        if self._skip_depth is None:
+            self._emit(f"&{name};", text=1)
+
+    def handle_charref(self, name):
+        if self._skip_depth is None:
+            self._emit(f"&#{name};", text=1)
+
+    def _emit(self, piece: str, text: int = 0):
+        self.page.append(piece)
+        self.page_text += text
+        for kind in self._open:
+            self.candidates[kind].append(piece)
+            self.candidate_text[kind] += text
+
+    def _is_boilerplate(self, tag: str, attrs: Dict[str, Optional[str]]) -> bool:
+        if tag in BOILERPLATE_TAGS or (tag in PAGE_CHROME_TAGS and not self._open):
+            return True
+        names = f"{attrs.get('class') or ''} {attrs.get('id') or ''}".strip()
+        if self._open:
+            return any(BOILERPLATE_NAME_RE.fullmatch(name) for name in names.split())
+        if attrs.get("role") in ("navigation", "banner", "contentinfo", "complementary"):
+            return True
+        return bool(names) and bool(BOILERPLATE_ATTRIBUTE_RE.search(names))
+
+    @staticmethod
+    def _candidate_kind(tag: str, attrs: Dict[str, Optional[str]]) -> Optional[str]:
+        if tag in ("article", "main"):
+            return tag
+        if attrs.get("role") == "main":
+            return "role-main"
+        return None
+
+
+def extract_main_content(html: str) -> str:
+    """
+    Keep only the main documentation content of a page, without navigation, sidebars, headers and footers.
+
+    The content is the first <article>, <main> or role="main" element (in that order of preference) with at
+    least MIN_MAIN_CONTENT_CHARS characters of text, or the whole page otherwise. Boilerplate elements
+    (BOILERPLATE_TAGS, and blocks whose class or id names a sidebar, table of contents, breadcrumb...) are
+    dropped either way. Inside a main content candidate, only whole class or id names count, and ARIA roles
+    are not used, so that the content's own footers and callouts are kept.
+
+    Args:
+        html (str): The page HTML.
+
+    Returns:
+        str: The HTML of the main content.
+    """
+    parser = _MainContentParser()
+    parser.feed(html)
+    parser.close()
+    for kind in MAIN_CONTENT_KINDS:
+        if parser.candidate_text.get(kind, 0) >= MIN_MAIN_CONTENT_CHARS:
+            return "".join(parser.candidates[kind])
+    return "".join(parser.page)
+
+
+def convert_html_to_markdown(html: str, main_content: bool = True) -> str:
+    """
+    Convert an HTML page to markdown.
+
+    Args:
+        html (str): The HTML to convert.
+        main_content (bool, optional): Convert only the main content (see `extract_main_content`). Defaults to
+            True.
+
+    Returns:
+        str: The content converted to markdown.
+    """
+    if main_content:
+        html = extract_main_content(html)
+    markdown = get_html_converter().handle(html)
+    return re.sub(r"\n{3,}", "\n\n", markdown)
+
+
+def convert_page(html: str, main_content: bool = True) -> ConversionResult:
+    """
+    Convert an HTML page to markdown and measure the work, in whatever process runs it (see `crawl_pipeline`).
+
+    Args:
+        html (str): The HTML to convert.
+        main_content (bool, optional): Convert only the main content. Defaults to True.
+
+    Returns:
+        ConversionResult: The markdown, the HTML kept and the CPU time spent.
+    """
+    start = time.thread_time()
+    kept = extract_main_content(html) if main_content else html
+    markdown = convert_html_to_markdown(kept, main_content=False)
+    return ConversionResult(markdown, len(html), len(kept), time.thread_time() - start)
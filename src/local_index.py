@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from utils import get_clients, get_env_var
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+log = logging.getLogger("clinia-doc-crawler")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+ROWS_FILE = "rows.jsonl"
+MANIFEST_FILE = "manifest.json"
+ROW_COLUMNS = "id, url, chunk_number, title, summary, content, metadata"
+LOCAL_QUANTIZATIONS = ("none", "int8", "binary")
+
+
+def default_local_index_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return get_env_var("LOCAL_INDEX_PATH") or os.path.join(project_root, ".cache", "local_index")
+
+
+def export_snapshot(supabase: Client, path: str, dtype: str = "float32", page_size: int = 500) -> int:
+    """
+    Export `site_pages` to a local snapshot directory usable by `LocalIndex`.
+
+    The snapshot holds the embeddings as an .npy matrix (memory-mappable), the other columns as JSON lines in the
+    same order, and a manifest. Files are written next to the old ones and renamed, so a process loading the
+    snapshot never sees a half-written one.
+
+    Args:
+        supabase (Client): The Supabase client for database access.
+        path (str): The snapshot directory.
+        dtype (str, optional): "float32" or "float16" (half the size). Defaults to "float32".
+        page_size (int, optional): The number of rows fetched per request. Defaults to 500.
+
+    Returns:
+        int: The number of rows exported.
+    """
+    rows: List[Dict[str, Any]] = []
+    embeddings: List[List[float]] = []
+    start = 0
+    while True:
+        page = (
+            supabase.table("site_pages")
+            .select(f"{ROW_COLUMNS}, embedding")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+        )
+        for row in page:
+            embedding = row.pop("embedding")
+            # PostgREST returns vectors as their text representation.
+            embeddings.append(json.loads(embedding) if isinstance(embedding, str) else embedding)
+            rows.append(row)
+        if len(page) < page_size:
+            break
+        start += page_size
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = (matrix / np.where(norms == 0, 1, norms)).astype(dtype)
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, EMBEDDINGS_FILE + ".tmp"), "wb") as f:
+        np.save(f, matrix)
+    with open(os.path.join(path, ROWS_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    manifest = {
+        "rows": len(rows),
+        "dimensions": int(matrix.shape[1]) if len(rows) else 0,
+        "dtype": dtype,
+        "embedding_model": get_env_var("EMBEDDING_MODEL") or "text-embedding-3-small",
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(path, MANIFEST_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    for name in (EMBEDDINGS_FILE, ROWS_FILE, MANIFEST_FILE):
+        os.replace(os.path.join(path, name + ".tmp"), os.path.join(path, name))
+
+    log.info(f"Exported {len(rows)} rows of site_pages to {path} ({dtype})")
+    return len(rows)
+
+
+class LocalIndex:
+    """
+    In-process replacement for `match_site_pages` over an exported snapshot of `site_pages`.
+
+    float32 embeddings are memory-mapped, so the OS page cache is shared by every process using the snapshot;
+    float16 ones are converted to float32 once at load since NumPy has no fast half-precision matrix product.
+    A search is one matrix-vector product and a partial sort, about a millisecond for the documentation corpus
+    (a few thousand chunks).
+
+    With a `quantization` ("int8": one byte per dimension, "binary": one bit per dimension) or fewer `dimensions`
+    (the leading ones, renormalized: Matryoshka truncation, only meaningful for text-embedding-3-* models), only
+    that compact matrix is kept in memory. It shortlists `match_count * rescore_factor` candidates, which are
+    ranked by their full-precision embeddings read from the memory-mapped snapshot.
+    """
+
+    def __init__(
+        self, path: str, quantization: str = "none", dimensions: Optional[int] = None, rescore_factor: int = 4
+    ):
+        if quantization not in LOCAL_QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {LOCAL_QUANTIZATIONS}")
+
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(path, ROWS_FILE), encoding="utf-8") as f:
+            self.rows: List[Dict[str, Any]] = [json.loads(line) for line in f]
+        if len(self.rows) != len(embeddings):
+            raise ValueError(f"Corrupted local index at {path}: {len(self.rows)} rows, {len(embeddings)} vectors")
+
+        self.quantization = quantization
+        self.full_dimensions = embeddings.shape[1] if embeddings.ndim == 2 else 0
+        self.dimensions = min(dimensions or self.full_dimensions, self.full_dimensions)
+        self.rescore_factor = max(1, rescore_factor)
+        self.compact = quantization != "none" or self.dimensions < self.full_dimensions
+        self._filter_masks: Dict[str, np.ndarray] = {}
+
+        if not self.compact:
+            self.embeddings = embeddings if embeddings.dtype == np.float32 else np.asarray(embeddings, np.float32)
+            return
+
+        # Full-precision vectors stay on disk: only the rescored candidates are read.
+        self.embeddings = embeddings
+        if self.dimensions < self.full_dimensions and not self.manifest.get("embedding_model", "").startswith(
+            "text-embedding-3"
+        ):
+            log.warning(f"Truncating {self.manifest.get('embedding_model')} embeddings, which are not Matryoshka")
+        reduced = self._reduce(embeddings)
+        if quantization == "int8":
+            self._scales = np.maximum(np.abs(reduced).max(axis=0), 1e-12) / 127
+            self._codes = np.round(reduced / self._scales).astype(np.int8)
+        elif quantization == "binary":
+            self._codes = self._pack_bits(reduced)
+        else:
+            self._codes = reduced
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the vectors scanned by every search (the compact matrix when there is one)."""
+        return self._codes.nbytes if self.compact else self.embeddings.nbytes
+
+    def search(
+        self,
+        query_embedding: List[float],
+        match_count: int = 10,
+        filter: Optional[Dict[str, Any]] = None,
+        embedding_dimensions: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the rows closest to a query embedding, like `match_site_pages`.
+
+        Args:
+            query_embedding (List[float]): The query embedding.
+            match_count (int, optional): The number of rows to return. Defaults to 10.
+            filter (Optional[Dict[str, Any]], optional): Only rows whose metadata contains these top-level
+                key/value pairs are returned. Defaults to no filter.
+            embedding_dimensions (int, optional): Also return the leading dimensions of each row's embedding,
+                renormalized, as `embedding`. Defaults to 0 (no embedding).
+
+        Returns:
+            List[Dict[str, Any]]: The matching rows with their `similarity`, best first.
+        """
+        if not len(self.rows) or match_count <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        mask = self._filter_mask(filter) if filter else None
+
+        if not self.compact:
+            top, scores = self._top_k(self.embeddings @ query, mask, match_count)
+        else:
+            candidates, _ = self._top_k(self._shortlist_scores(query), mask, match_count * self.rescore_factor)
+            candidates = np.sort(candidates)
+            full_scores = np.asarray(self.embeddings[candidates], dtype=np.float32) @ query
+            order, scores = self._top_k(full_scores, None, match_count)
+            top = candidates[order]
+
+        rows = [{**self.rows[i], "similarity": float(score)} for i, score in zip(top, scores, strict=True)]
+        if embedding_dimensions > 0:
+            embeddings = np.asarray(self.embeddings[np.sort(top)], dtype=np.float32)[:, :embedding_dimensions]
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            by_index = dict(zip(np.sort(top).tolist(), embeddings, strict=True))
+            for row, i in zip(rows, top.tolist(), strict=True):
+                row["embedding"] = by_index[i]
+        return rows
+
+    def _shortlist_scores(self, query: np.ndarray) -> np.ndarray:
+        reduced = self._reduce(query)
+        if self.quantization == "int8":
+            return self._codes @ (reduced * self._scales)
+        if self.quantization == "binary":
+            distances = np.bitwise_count(self._codes ^ self._pack_bits(reduced)).sum(axis=-1, dtype=np.int32)
+            return -distances.astype(np.float32)
+        return self._codes @ reduced
+
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        reduced = np.asarray(vectors[..., : self.dimensions], dtype=np.float32)
+        if self.dimensions < self.full_dimensions:
+            norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+            reduced = reduced / np.where(norms == 0, 1, norms)
+        return reduced
+
+    @staticmethod
+    def _pack_bits(vectors: np.ndarray) -> np.ndarray:
+        packed = np.packbits(vectors > 0, axis=-1)
+        # Pad to whole 64-bit words so hamming distances are computed 8 bytes at a time.
+        padding = [(0, 0)] * (packed.ndim - 1) + [(0, -packed.shape[-1] % 8)]
+        return np.ascontiguousarray(np.pad(packed, padding)).view(np.uint64)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, mask: Optional[np.ndarray], count: int) -> tuple[np.ndarray, np.ndarray]:
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        count = min(count, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        top = top[scores[top] != -np.inf]
+        return top, scores[top]
+
+    def _filter_mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True)
+        if key not in self._filter_masks:
+            self._filter_masks[key] = np.array(
+                [all(row["metadata"].get(name) == value for name, value in filter.items()) for row in self.rows]
+            )
+        return self._filter_masks[key]
+
+
+@lru_cache(maxsize=None)
+def get_local_index(path: Optional[str] = None) -> LocalIndex:
+    """
+    Return the local index of a snapshot, loading it on first use in this process.
+
+    The in-memory representation is configured with LOCAL_INDEX_QUANTIZATION ("none", "int8" or "binary"),
+    VECTOR_DIMENSIONS and VECTOR_RESCORE_FACTOR.
+
+    Args:
+        path (Optional[str], optional): The snapshot directory. Defaults to LOCAL_INDEX_PATH or .cache/local_index.
+
+    Returns:
+        LocalIndex: The loaded index.
+    """
+    path = path or default_local_index_path()
+    start = time.perf_counter()
+    index = LocalIndex(
+        path,
+        quantization=get_env_var("LOCAL_INDEX_QUANTIZATION") or "none",
+        dimensions=int(get_env_var("VECTOR_DIMENSIONS") or 0) or None,
+        rescore_factor=int(get_env_var("VECTOR_RESCORE_FACTOR") or 4),
+    )
+    log.info(
+        f"Loaded local index {path}: {len(index)} rows, {index.quantization} x {index.dimensions} dimensions "
+        f"({index.nbytes / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s"
+    )
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export site_pages to a local index snapshot.")
+    parser.add_argument("--path", default=default_local_index_path())
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    _, supabase = get_clients()
+    export_snapshot(supabase, args.path, dtype=args.dtype)
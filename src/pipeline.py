@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+log = logging.getLogger("clinia-doc-crawler")
+
+Emit = Callable[[Any], Awaitable[None]]
+Handler = Callable[[Any, Emit], Awaitable[None]]
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    emitted: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline.
+
+    Attributes:
+        name (str): The name used in logs and statistics.
+        handler (Handler): ``async def handler(item, emit)``; awaits ``emit(output)`` zero, one or many
+            times to pass outputs to the next stage. Emitting blocks while the next queue is full.
+        workers (int): The number of items processed concurrently.
+        queue_size (int): The capacity of the queue feeding this stage.
+    """
+
+    name: str
+    handler: Handler
+    workers: int = 1
+    queue_size: int = 100
+
+
+class Pipeline:
+    """
+    Bounded producer/consumer pipeline: each stage has its own workers and input queue.
+
+    Because every queue is bounded, a slow stage makes the previous ones wait instead of letting
+    work pile up in memory, and each stage can be sized independently (e.g. few fetchers, many
+    workers waiting on API calls). A failing item is logged and counted but does not stop the
+    pipeline.
+    """
+
+    def __init__(self, stages: List[Stage], report_interval: float = 10.0):
+        self.stages = stages
+        self.report_interval = report_interval
+        self.stats: Dict[str, StageStats] = {stage.name: StageStats(stage.name, stage.workers) for stage in stages}
+        self._queues: List[asyncio.Queue] = []
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {stage.name: queue.qsize() for stage, queue in zip(self.stages, self._queues, strict=True)}
+
+    async def run(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> Dict[str, StageStats]:
+        """
+        Feed the items to the first stage and wait until every stage has drained.
+
+        Args:
+            items (Union[Iterable[Any], AsyncIterable[Any]]): The inputs of the first stage.
+
+        Returns:
+            Dict[str, StageStats]: The statistics of each stage.
+        """
+        self._queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        for stats in self.stats.values():
+            stats.started_at = time.perf_counter()
+
+        workers = [
+            [asyncio.create_task(self._worker(index)) for _ in range(stage.workers)]
+            for index, stage in enumerate(self.stages)
+        ]
+        reporter = asyncio.create_task(self._report()) if self.report_interval > 0 else None
+
+        try:
+            await self._feed(items)
+            # A stage is done once its queue is drained: everything it emitted is already queued downstream.
+            for stage, queue, stage_workers in zip(self.stages, self._queues, workers, strict=True):
+                await queue.join()
+                self.stats[stage.name].finished_at = time.perf_counter()
+                for worker in stage_workers:
+                    worker.cancel()
+                await asyncio.gather(*stage_workers, return_exceptions=True)
+        finally:
+            for worker in [worker for stage_workers in workers for worker in stage_workers]:
+                worker.cancel()
+            if reporter is not None:
+                reporter.cancel()
+
+        self.log_stats()
+        return self.stats
+
+    async def _feed(self, items: Union[Iterable[Any], AsyncIterable[Any]]):
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await self._put(0, item)
+        else:
+            for item in items:
+                await self._put(0, item)
+
+    async def _put(self, index: int, item: Any):
+        queue = self._queues[index]
+        await queue.put(item)
+        stats = self.stats[self.stages[index].name]
+        stats.max_queue_depth = max(stats.max_queue_depth, queue.qsize())
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        queue = self._queues[index]
+        is_last = index == len(self.stages) - 1
+
+        async def emit(output: Any):
+            stats.emitted += 1
+            if not is_last:
+                await self._put(index + 1, output)
+
+        while True:
+            item = await queue.get()
+            start = time.perf_counter()
+            try:
+                await stage.handler(item, emit)
+                stats.processed += 1
+            except Exception as e:
+                stats.failed += 1
+                log.error(f"[{stage.name}] {e}")
+            finally:
+                stats.busy_seconds += time.perf_counter() - start
+                queue.task_done()
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.log_stats()
+
+    def log_stats(self):
+        depths = self.queue_depths()
+        for stage in self.stages:
+            stats = self.stats[stage.name]
+            log.info(
+                f"[{stage.name}] {stats.processed} done, {stats.failed} failed, {stats.throughput:.1f}/s, "
+                f"queue {depths.get(stage.name, 0)}/{stage.queue_size} (max {stats.max_queue_depth}), "
+                f"{stats.workers} workers"
+            )
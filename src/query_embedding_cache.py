@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+EmbedFunction = Callable[[str], Awaitable[List[float]]]
+EmbedManyFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+# How a lookup was served.
+HIT = "hit"
+MISS = "miss"
+COALESCED = "coalesced"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Return the cache key of a query: case-folded, whitespace collapsed and trailing punctuation removed.
+
+    Args:
+        query (str): The query as written by the agent or the user.
+
+    Returns:
+        str: The normalized query.
+    """
+    return " ".join(query.casefold().split()).rstrip("?!.")
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that did not call the API (cache hits and requests joining an in-flight call)."""
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    embedding: List[float]
+    expires_at: float
+    # How long the API call that produced the embedding took: the latency saved by every hit.
+    cost: float
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory TTL + LRU cache of query embeddings with in-flight de-duplication.
+
+    Queries are keyed by `normalize_query`. Concurrent lookups of the same query on the same event loop share
+    a single API call; the entries themselves are shared across event loops and threads (Streamlit runs each
+    session on its own thread and loop). Failed calls are not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = QueryCacheStats()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._in_flight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, query: str, embed: EmbedFunction) -> Tuple[List[float], str]:
+        """
+        Return the embedding of a query, calling `embed` only if it is neither cached nor already being computed.
+
+        Args:
+            query (str): The query to embed.
+            embed (EmbedFunction): Computes the embedding on a miss; exceptions are propagated and not cached.
+
+        Returns:
+            Tuple[List[float], str]: The embedding and how it was served (HIT, MISS or COALESCED).
+        """
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.stats.hits += 1
+                self.stats.saved_seconds += entry.cost
+                return entry.embedding, HIT
+
+        loop = asyncio.get_running_loop()
+        in_flight_key = (id(loop), key)
+        if (future := self._in_flight.get(in_flight_key)) is not None:
+            with self._lock:
+                self.stats.coalesced += 1
+            return await asyncio.shield(future), COALESCED
+
+        future = loop.create_future()
+        self._in_flight[in_flight_key] = future
+        with self._lock:
+            self.stats.misses += 1
+        try:
+            start = time.perf_counter()
+            embedding = await embed(query)
+            self.put(query, embedding, cost=time.perf_counter() - start)
+            future.set_result(embedding)
+            return embedding, MISS
+        except BaseException as e:
+            future.set_exception(e)
+            # Only the waiters care about the error; avoid "exception was never retrieved" warnings.
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[in_flight_key]
+
+    async def get_many(self, queries: List[str], embed_many: EmbedManyFunction) -> List[Tuple[List[float], str]]:
+        """
+        Return the embeddings of several queries, computing every miss with a single call to `embed_many`.
+
+        Queries that normalize to the same key are embedded once. Unlike `get`, misses do not join calls in flight
+        for other lookups.
+
+        Args:
+            queries (List[str]): The queries to embed.
+            embed_many (EmbedManyFunction): Computes the embeddings of the missed queries, in order; exceptions are
+                propagated and nothing is cached.
+
+        Returns:
+            List[Tuple[List[float], str]]: The embedding of each query and how it was served (HIT or MISS).
+        """
+        served: Dict[str, Tuple[List[float], str]] = {}
+        misses: Dict[str, str] = {}
+        with self._lock:
+            for query in queries:
+                key = normalize_query(query)
+                if key in served or key in misses:
+                    continue
+                entry = self._lookup(key)
+                if entry is None:
+                    misses[key] = query
+                    continue
+                self.stats.hits += 1
+                self.stats.saved_seconds += entry.cost
+                served[key] = (entry.embedding, HIT)
+
+        if misses:
+            with self._lock:
+                self.stats.misses += len(misses)
+            start = time.perf_counter()
+            embeddings = await embed_many(list(misses.values()))
+            cost = (time.perf_counter() - start) / len(misses)
+            for (key, query), embedding in zip(misses.items(), embeddings, strict=True):
+                self.put(query, embedding, cost=cost)
+                served[key] = (embedding, MISS)
+
+        return [served[normalize_query(query)] for query in queries]
+
+    def put(self, query: str, embedding: List[float], cost: float = 0.0):
+        """
+        Store the embedding of a query, evicting the least recently used entry when the cache is full.
+
+        Args:
+            query (str): The query.
+            embedding (List[float]): Its embedding.
+            cost (float, optional): The seconds the embedding took to compute. Defaults to 0.0.
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = _Entry(embedding, self.clock() + self.ttl, cost)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        """Drop every cached embedding. The statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    async def prewarm(self, queries: Iterable[str], embed: EmbedFunction, concurrency: int = 4) -> int:
+        """
+        Embed a list of expected queries ahead of time.
+
+        Args:
+            queries (Iterable[str]): The queries, e.g. the questions of the evaluation set.
+            embed (EmbedFunction): Computes an embedding.
+            concurrency (int, optional): Maximum concurrent API calls. Defaults to 4.
+
+        Returns:
+            int: The number of queries embedded (already cached or failed ones are not counted).
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(query: str) -> bool:
+            async with semaphore:
+                try:
+                    _, outcome = await self.get(query, embed)
+                except Exception:
+                    return False
+                return outcome == MISS
+
+        results = await asyncio.gather(*[warm(query) for query in dict.fromkeys(queries)])
+        return sum(results)
+
+    def _lookup(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            del self._entries[key]
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
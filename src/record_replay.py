@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from utils import get_env_var
+
+log = logging.getLogger("clinia-doc-crawler")
+
+CLIENT_MODES = ("live", "record", "replay")
+
+# Response headers worth replaying. Bodies are stored decoded, so the transfer headers must not be replayed.
+KEPT_HEADERS = ("content-type", "content-range")
+
+
+@dataclass
+class ReplayStats:
+    recorded: int = 0
+    hits: int = 0
+    misses: int = 0
+    injected_errors: int = 0
+    rate_limited: int = 0
+
+
+def request_key(method: str, path: str, query: str, body: bytes) -> str:
+    """
+    Return the address of a request in the replay store.
+
+    The host is left out, so a recording can be replayed against any base URL, and JSON bodies are normalized
+    so key order does not matter.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The URL path.
+        query (str): The URL query string.
+        body (bytes): The request body.
+
+    Returns:
+        str: The hex SHA-256 digest identifying the request.
+    """
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass
+    query = "&".join(sorted(query.split("&"))) if query else ""
+    digest = hashlib.sha256(f"{method.upper()} {path}?{query}\n".encode("utf-8"))
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _key(request: httpx.Request) -> str:
+    return request_key(request.method, request.url.path, request.url.query.decode("ascii"), request.content)
+
+
+def _embedding_input_keys(request: httpx.Request) -> Optional[List[str]]:
+    # Embedding requests are stored per input: the crawler's batches depend on timing (see EmbeddingBatcher), so a
+    # replayed crawl groups the same texts differently. The key of an input is that of a request embedding it alone.
+    if request.method != "POST" or not request.url.path.endswith("/embeddings"):
+        return None
+    try:
+        params = json.loads(request.content)
+    except ValueError:
+        return None
+    inputs = params.get("input") if isinstance(params, dict) else None
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    if not isinstance(inputs, list) or not all(isinstance(text, str) for text in inputs):
+        return None
+    query = request.url.query.decode("ascii")
+    return [
+        request_key("POST", request.url.path, query, json.dumps({**params, "input": [text]}).encode("utf-8"))
+        for text in inputs
+    ]
+
+
+def _split_embeddings(body: bytes, count: int) -> Optional[List[bytes]]:
+    # One single-input response per input, with the prompt tokens shared out evenly.
+    try:
+        response = json.loads(body)
+        data = sorted(response["data"], key=lambda item: item["index"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if len(data) != count:
+        return None
+    prompt_tokens = (response.get("usage") or {}).get("prompt_tokens", 0)
+    tokens = [prompt_tokens // count + (i < prompt_tokens % count) for i in range(count)]
+    return [
+        json.dumps(
+            {**response, "data": [{**item, "index": 0}], "usage": {"prompt_tokens": n, "total_tokens": n}}
+        ).encode("utf-8")
+        for item, n in zip(data, tokens, strict=True)
+    ]
+
+
+def _join_embeddings(bodies: List[bytes]) -> bytes:
+    responses = [json.loads(body) for body in bodies]
+    tokens = sum((response.get("usage") or {}).get("prompt_tokens", 0) for response in responses)
+    data = [{**response["data"][0], "index": i} for i, response in enumerate(responses)]
+    return json.dumps(
+        {**responses[0], "data": data, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+    ).encode("utf-8")
+
+
+class ReplayStore:
+    """
+    Disk-backed store of recorded HTTP exchanges, keyed by `request_key`.
+
+    Everything lives in one SQLite file; response bodies are zlib-compressed, so a recorded crawl or eval run
+    (mostly JSON embeddings and chat completions) stays small. Recording a request again replaces its response.
+    Embedding requests are stored as one exchange per input, so any batch of recorded inputs can be replayed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS exchanges (key TEXT PRIMARY KEY, method TEXT NOT NULL, path TEXT NOT NULL, "
+            "status INTEGER NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL)"
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """
+        Look up a recorded response.
+
+        Args:
+            key (str): The request key from `request_key`.
+
+        Returns:
+            Optional[Tuple[int, Dict[str, str], bytes]]: The status, headers and body, or None if not recorded.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status, headers, body FROM exchanges WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), zlib.decompress(row[2])
+
+    def put(self, key: str, method: str, path: str, status: int, headers: Dict[str, str], body: bytes):
+        """Record the response of a request."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO exchanges (key, method, path, status, headers, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, path, status, json.dumps(headers), zlib.compress(body)),
+            )
+
+    def summary(self) -> Dict[str, Any]:
+        """Count the recorded exchanges per endpoint and measure the stored size."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method || ' ' || path, COUNT(*), SUM(LENGTH(body)) FROM exchanges GROUP BY 1 ORDER BY 2 DESC"
+            ).fetchall()
+        return {endpoint: {"exchanges": count, "compressed_bytes": size} for endpoint, count, size in rows}
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Forward requests to the real services and record every successful exchange.
+
+    Responses are read completely before being returned, so streamed chat completions arrive at once while
+    recording.
+    """
+
+    def __init__(self, store: ReplayStore, inner: Any):
+        self.store = store
+        self.inner = inner
+        self.stats = ReplayStats()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        response = self.inner.handle_request(request)
+        body = response.read()
+        response.close()
+        return self._record(request, response, body)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        return self._record(request, response, body)
+
+    def _record(self, request: httpx.Request, response: httpx.Response, body: bytes) -> httpx.Response:
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        if response.is_success:
+            keys, bodies = [_key(request)], [body]
+            input_keys = _embedding_input_keys(request)
+            if input_keys:
+                input_bodies = _split_embeddings(body, len(input_keys))
+                if input_bodies is not None:
+                    keys, bodies = input_keys, input_bodies
+            for key, stored in zip(keys, bodies, strict=True):
+                self.store.put(key, request.method, request.url.path, response.status_code, headers, stored)
+            self.stats.recorded += 1
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def close(self):
+        self.inner.close()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Serve recorded responses without any network access, like a local stand-in of the recorded services.
+
+    Every request waits `latency` seconds. A seeded random generator fails a fraction `error_rate` of them with
+    a 500, and more than `max_in_flight` concurrent requests get a 429, to exercise retries and concurrency
+    settings under rate limits. Requests that were never recorded get a 404.
+    """
+
+    def __init__(
+        self,
+        store: ReplayStore,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        max_in_flight: int = 0,
+        seed: int = 0,
+    ):
+        self.store = store
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.stats = ReplayStats()
+        self._random = random.Random(seed)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        with self._admit() as refused:
+            if refused is not None:
+                return refused
+            time.sleep(self.latency)
+            return self._respond(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        with self._admit() as refused:
+            if refused is not None:
+                return refused
+            await asyncio.sleep(self.latency)
+            return self._respond(request)
+
+    @contextmanager
+    def _admit(self) -> Iterator[Optional[httpx.Response]]:
+        """Count the request in flight and decide whether it is refused (rate limit or injected error)."""
+        with self._lock:
+            self._in_flight += 1
+            refused = None
+            if self.max_in_flight and self._in_flight > self.max_in_flight:
+                self.stats.rate_limited += 1
+                refused = _error_response(429, "rate_limit_error", "Rate limit reached (replay)")
+            elif self.error_rate and self._random.random() < self.error_rate:
+                self.stats.injected_errors += 1
+                refused = _error_response(500, "server_error", "Injected error (replay)")
+        try:
+            yield refused
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _respond(self, request: httpx.Request) -> httpx.Response:
+        input_keys = _embedding_input_keys(request)
+        if input_keys:
+            recorded = [self.store.get(key) for key in input_keys]
+            if all(recorded):
+                status, headers, _ = recorded[0]
+                recorded = status, headers, _join_embeddings([body for _, _, body in recorded])
+            else:
+                # Recordings made before embeddings were stored per input.
+                recorded = self.store.get(_key(request))
+        else:
+            recorded = self.store.get(_key(request))
+        if recorded is None:
+            with self._lock:
+                self.stats.misses += 1
+            log.warning(f"No recorded response for {request.method} {request.url.path}")
+            return _error_response(404, "not_recorded", f"No recorded response for {request.method} {request.url}")
+        with self._lock:
+            self.stats.hits += 1
+        status, headers, body = recorded
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+def _error_response(status: int, error_type: str, message: str) -> httpx.Response:
+    # Shaped like OpenAI errors; retry-after 0 keeps client retries immediate.
+    return httpx.Response(
+        status,
+        headers={"retry-after": "0"},
+        json={"error": {"message": message, "type": error_type}, "message": message},
+    )
+
+
+def default_replay_store_path() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return get_env_var("REPLAY_STORE_PATH") or os.path.join(project_root, ".cache", "replay.sqlite")
+
+
+@lru_cache(maxsize=1)
+def get_replay_store() -> ReplayStore:
+    """Return the process-wide replay store at REPLAY_STORE_PATH (default: .cache/replay.sqlite), opening it once."""
+    return ReplayStore(default_replay_store_path())
+
+
+def client_mode() -> str:
+    """Return CLIENT_MODE: live (default), record or replay."""
+    mode = get_env_var("CLIENT_MODE") or "live"
+    if mode not in CLIENT_MODES:
+        raise ValueError(f"Unknown CLIENT_MODE {mode!r}, expected one of {CLIENT_MODES}")
+    return mode
+
+
+def client_transport(asynchronous: bool) -> Optional[Any]:
+    """
+    Return the HTTP transport of the OpenAI or Supabase client for the current CLIENT_MODE.
+
+    In replay mode, REPLAY_LATENCY (seconds, default 0), REPLAY_ERROR_RATE (default 0), REPLAY_MAX_IN_FLIGHT
+    (default 0: no rate limit) and REPLAY_SEED (default 0) shape the stand-in.
+
+    Args:
+        asynchronous (bool): Whether the transport is for an async client (OpenAI) or a sync one (Supabase).
+
+    Returns:
+        Optional[Any]: The transport, or None in live mode (the clients' own).
+    """
+    mode = client_mode()
+    if mode == "live":
+        return None
+    if mode == "record":
+        inner = httpx.AsyncHTTPTransport() if asynchronous else httpx.HTTPTransport()
+        return RecordingTransport(get_replay_store(), inner)
+    return ReplayTransport(
+        get_replay_store(),
+        latency=float(get_env_var("REPLAY_LATENCY") or 0.0),
+        error_rate=float(get_env_var("REPLAY_ERROR_RATE") or 0.0),
+        max_in_flight=int(get_env_var("REPLAY_MAX_IN_FLIGHT") or 0),
+        seed=int(get_env_var("REPLAY_SEED") or 0),
+    )
+
+
+def install_supabase_transport(supabase: Any, transport: Any):
+    """
+    Route the PostgREST calls (tables and rpc) of a Supabase client through a transport.
+
+    supabase-py does not accept an HTTP client, so its PostgREST session is replaced by one with the same base
+    URL, headers and timeout.
+
+    Args:
+        supabase (Client): The Supabase client.
+        transport (Any): A sync httpx transport.
+    """
+    session = supabase.postgrest.session
+    supabase.postgrest.session = type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        transport=transport,
+    )
+    session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the recorded OpenAI and Supabase exchanges.")
+    parser.add_argument("--path", default=default_replay_store_path())
+    args = parser.parse_args()
+
+    summary = ReplayStore(args.path).summary()
+    for endpoint, counts in summary.items():
+        print(f"{endpoint:<50} {counts['exchanges']:>7} exchanges  {counts['compressed_bytes'] / 1e6:8.2f} MB")
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# How a lookup was served.
+HIT = "hit"
+MISS = "miss"
+
+
+@dataclass
+class SemanticCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    scope: str
+    value: Any
+    expires_at: float
+    # How long producing the value took: the latency saved by every hit.
+    cost: float
+
+
+class SemanticCache:
+    """
+    In-memory TTL + LRU cache keyed by the embedding of the query that produced each value.
+
+    A lookup returns the value of the most similar cached query if their cosine similarity reaches `threshold`
+    and both were cached under the same `scope` (the search parameters the value depends on), so paraphrases
+    of a question share one result. Embeddings are kept in a preallocated matrix of `max_entries` rows and
+    compared in a single matrix-vector product. Every entry is dropped when the corpus version changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = SemanticCacheStats()
+        self.version: Optional[str] = None
+        self._matrix: Optional[np.ndarray] = None
+        # Row of the matrix -> entry, least recently used first.
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, embedding: List[float], scope: str = "") -> Optional[Tuple[Any, float]]:
+        """
+        Return the value cached for the most similar query, if similar enough.
+
+        Args:
+            embedding (List[float]): The embedding of the query.
+            scope (str, optional): Only values cached under the same scope match. Defaults to "".
+
+        Returns:
+            Optional[Tuple[Any, float]]: The value and the similarity of its query, or None on a miss.
+        """
+        query = _unit(embedding)
+        with self._lock:
+            match = self._best_match(query, scope)
+            if match is None:
+                self.stats.misses += 1
+                return None
+            row, similarity = match
+            entry = self._entries[row]
+            self._entries.move_to_end(row)
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry.cost
+            return entry.value, similarity
+
+    def put(self, embedding: List[float], value: Any, scope: str = "", cost: float = 0.0):
+        """
+        Cache the value of a query, evicting the least recently used entry when the cache is full.
+
+        Args:
+            embedding (List[float]): The embedding of the query.
+            value (Any): The value to return for similar queries.
+            scope (str, optional): The parameters the value depends on besides the query. Defaults to "".
+            cost (float, optional): The seconds the value took to produce. Defaults to 0.0.
+        """
+        vector = _unit(embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._entries.clear()
+            if len(self._entries) < self.max_entries:
+                row = len(self._entries)
+            else:
+                row, _ = self._entries.popitem(last=False)
+                self.stats.evictions += 1
+            self._matrix[row] = vector
+            self._entries[row] = _Entry(scope, value, self.clock() + self.ttl, cost)
+
+    def set_version(self, version: Optional[str]) -> bool:
+        """
+        Record the version of the corpus the cached values come from, dropping them all if it changed.
+
+        Args:
+            version (Optional[str]): The current corpus version.
+
+        Returns:
+            bool: True if the cache was invalidated.
+        """
+        with self._lock:
+            if version == self.version:
+                return False
+            invalidated = bool(self._entries)
+            self.version = version
+            self._entries.clear()
+            if invalidated:
+                self.stats.invalidations += 1
+            return invalidated
+
+    def clear(self):
+        """Drop every cached value. The statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats_attributes(self) -> Dict[str, Any]:
+        """Return the statistics of the cache, as logfire span attributes."""
+        return {
+            "semantic_cache_hit_rate": self.stats.hit_rate,
+            "semantic_cache_saved_seconds": self.stats.saved_seconds,
+            "semantic_cache_entries": len(self._entries),
+        }
+
+    def _best_match(self, query: np.ndarray, scope: str) -> Optional[Tuple[int, float]]:
+        if not self._entries or self._matrix is None or self._matrix.shape[1] != len(query):
+            return None
+        # Rows are filled in order and evicted rows are reused, so the used rows are always the first ones.
+        similarities = self._matrix[: len(self._entries)] @ query
+        now = self.clock()
+        for row in np.argsort(-similarities):
+            similarity = float(similarities[row])
+            if similarity < self.threshold:
+                return None
+            entry = self._entries[int(row)]
+            if entry.scope != scope:
+                continue
+            if entry.expires_at <= now:
+                self._remove(int(row))
+                self.stats.expirations += 1
+                return None
+            return int(row), similarity
+        return None
+
+    def _remove(self, row: int):
+        # Keep the used rows contiguous: move the last used row into the freed one.
+        last = len(self._entries) - 1
+        del self._entries[row]
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._entries = OrderedDict((row if key == last else key, entry) for key, entry in self._entries.items())
+
+
+def _unit(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -1,10 +1,14 @@
 import logging
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from supabase import Client
+
+# The client libraries take about a second to import: they are only loaded when a client is first needed.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import Client
 
 # Setup logging
 logging.basicConfig(
@@ -23,26 +27,82 @@ def get_env_var(key: str) -> Optional[str]:
     return bytes(value, "utf-8").decode("unicode_escape")
 
 
-def get_clients():
-    openai_client = None
+@lru_cache(maxsize=1)
+def get_openai_client() -> "AsyncOpenAI":
+    """
+    Return the process-wide OpenAI client, created on first use from BASE_URL and OPENAI_API_KEY.
+
+    With CLIENT_MODE=record or replay, its requests are recorded or served from the replay store (see
+    record_replay.py).
+
+    Returns:
+        AsyncOpenAI: The shared client.
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    from record_replay import client_transport
+
     base_url = get_env_var("BASE_URL") or "https://api.openai.com/v1"
     api_key = get_env_var("OPENAI_API_KEY") or "no-api-key-provided"
+    transport = client_transport(asynchronous=True)
+    http_client = DefaultAsyncHttpxClient(transport=transport) if transport is not None else None
+    return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+
+
+@lru_cache(maxsize=1)
+def get_supabase_client() -> Optional["Client"]:
+    """
+    Return the process-wide Supabase client, created on first use from SUPABASE_URL and SUPABASE_SERVICE_KEY.
 
-    openai_client = AsyncOpenAI(base_url=base_url, api_key=api_key)  # Supabase client setup
+    With CLIENT_MODE=record or replay, its table and rpc requests are recorded or served from the replay store.
+
+    Returns:
+        Optional[Client]: The shared client, or None if it could not be created.
+    """
+    from supabase import Client
+
+    from record_replay import client_transport, install_supabase_transport
 
     supabase = None
 
-    supabase_url = f"https://{get_env_var("SUPABASE_URL")}"
+    supabase_url = get_env_var("SUPABASE_URL")
+    if supabase_url and "://" not in supabase_url:
+        supabase_url = f"https://{supabase_url}"
     supabase_key = get_env_var("SUPABASE_SERVICE_KEY")
 
     if supabase_url and supabase_key:
         try:
             supabase: Client = Client(supabase_url, supabase_key)
+            if (transport := client_transport(asynchronous=False)) is not None:
+                install_supabase_transport(supabase, transport)
 
         except Exception as e:
             log.error(f"Error initializing Supabase client: {e}")
             supabase = None
-    return openai_client, supabase
+    return supabase
+
+
+def get_clients() -> Tuple["AsyncOpenAI", Optional["Client"]]:
+    """
+    Return the shared OpenAI and Supabase clients.
+
+    Returns:
+        Tuple[AsyncOpenAI, Optional[Client]]: The OpenAI client and the Supabase client (None if unavailable).
+    """
+    return get_openai_client(), get_supabase_client()
+
+
+@lru_cache(maxsize=1)
+def configure_logfire():
+    """
+    Configure logfire and instrument OpenAI clients, once per process.
+
+    Traces are only sent when LOGFIRE_API_KEY is set, so nothing needs credentials to run.
+    """
+    import logfire
+
+    logfire.configure(token=get_env_var("LOGFIRE_API_KEY"), send_to_logfire="if-token-present")
+    logfire.instrument_openai()
 
 
 def create_markdown_file(filename: str, content: str) -> str:
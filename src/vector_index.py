@@ -0,0 +1,88 @@
+import argparse
+from typing import Optional
+
+from supabase import Client
+
+from utils import get_clients, get_env_var, log
+
+INDEX_METHODS = ("hnsw", "ivfflat")
+QUANTIZATIONS = ("none", "halfvec", "binary")
+
+
+def rebuild_vector_index(
+    supabase: Client,
+    table: str = "site_pages",
+    method: str = "hnsw",
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: Optional[int] = None,
+    quantization: str = "none",
+    dimensions: int = 1536,
+) -> str:
+    """
+    (Re)build the vector index of a loaded table with `create_vector_index` (supabase_script/vector_index.sql).
+
+    The new index is built before the previous one is dropped, so searches keep using an index meanwhile.
+
+    Args:
+        supabase (Client): The Supabase client for database access.
+        table (str, optional): The table to index. Defaults to "site_pages".
+        method (str, optional): "hnsw" or "ivfflat". Defaults to "hnsw".
+        m (int, optional): HNSW: the number of links per node. Defaults to 16.
+        ef_construction (int, optional): HNSW: the candidate list size while building. Defaults to 64.
+        lists (Optional[int], optional): ivfflat: the number of lists. Defaults to one per 1000 rows.
+        quantization (str, optional): What the index stores: "none" (float32), "halfvec" (float16) or "binary"
+            (one bit per dimension). Searches rescore the candidates with the full vectors. Defaults to "none".
+        dimensions (int, optional): Index only the first dimensions, renormalized (text-embedding-3-* models).
+            Defaults to 1536 (all).
+
+    Returns:
+        str: The name of the new index.
+    """
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unknown vector index method {method!r}, expected one of {INDEX_METHODS}")
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+
+    index_name = (
+        supabase.rpc(
+            "create_vector_index",
+            {
+                "p_table": table,
+                "p_method": method,
+                "p_m": m,
+                "p_ef_construction": ef_construction,
+                "p_lists": lists,
+                "p_quantization": quantization,
+                "p_dimensions": dimensions,
+            },
+        )
+        .execute()
+        .data
+    )
+    log.info(f"Built vector index {index_name} on {table} ({quantization}, {dimensions} dimensions)")
+    return index_name
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the vector index of the documentation corpus after a load.")
+    parser.add_argument("--table", default="site_pages")
+    parser.add_argument("--method", choices=INDEX_METHODS, default=get_env_var("VECTOR_INDEX_METHOD") or "hnsw")
+    parser.add_argument("--m", type=int, default=16, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, default=64, help="HNSW candidate list size while building")
+    parser.add_argument("--lists", type=int, default=None, help="ivfflat lists (default: rows / 1000)")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, default=get_env_var("VECTOR_QUANTIZATION") or "none")
+    parser.add_argument("--dimensions", type=int, default=int(get_env_var("VECTOR_DIMENSIONS") or 1536))
+    args = parser.parse_args()
+
+    _, supabase = get_clients()
+    rebuild_vector_index(
+        supabase,
+        args.table,
+        args.method,
+        args.m,
+        args.ef_construction,
+        args.lists,
+        quantization=args.quantization,
+        dimensions=args.dimensions,
+    )
@@ -0,0 +1,229 @@
+-- Versioned corpus: full re-crawls load a shadow table and swap it in atomically.
+--
+-- Retrieval always reads `site_pages`. A full crawl writes into `site_pages_<version>`, builds the vector index
+-- once the bulk load is done, validates the row count and then renames the tables in a single transaction, so
+-- queries never see a partial corpus. The previous corpus is kept as `site_pages_<old version>` for rollback
+-- until it is garbage-collected.
+--
+-- Run once after `initialisation.sql` and `vector_index.sql`, as the owner of `site_pages` (the SQL editor's
+-- `postgres` role). The crawler calls these functions over PostgREST with the service key: they run as their owner
+-- (`security definer`), which can create, rename and index the corpus tables in `public`, and only `service_role`
+-- may execute those that change the corpus.
+
+create table if not exists corpus_versions (
+    version text primary key,
+    status text not null default 'loading' check (status in ('loading', 'ready', 'active', 'retired', 'failed')),
+    row_count bigint,
+    created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    activated_at timestamp with time zone,
+    -- Last in-place change of the active corpus by an incremental crawl.
+    updated_at timestamp with time zone
+);
+
+alter table corpus_versions add column if not exists updated_at timestamp with time zone;
+alter table corpus_versions enable row level security;
+
+
+-- Create the empty shadow table of a new version, without its vector index.
+create or replace function create_corpus_shadow(p_version text)
+returns text
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+    shadow text := 'site_pages_' || p_version;
+begin
+    if p_version !~ '^[a-z0-9_]+$' then
+        raise exception 'Invalid corpus version %', p_version;
+    end if;
+
+    insert into corpus_versions (version) values (p_version);
+
+    execute format($f$
+        create table %I (
+            id bigserial primary key,
+            url varchar not null,
+            chunk_number integer not null,
+            title varchar not null,
+            summary varchar not null,
+            content text not null,
+            metadata jsonb not null default '{}'::jsonb,
+            embedding vector(1536),
+            fts tsvector generated always as (to_tsvector('english', content)) stored,
+            created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+            unique(url, chunk_number)
+        )$f$, shadow);
+    execute format('alter table %I enable row level security', shadow);
+    execute format('create policy "Allow public read access" on %I for select to public using (true)', shadow);
+
+    -- Let PostgREST see the new table so the crawler can write into it.
+    notify pgrst, 'reload schema';
+    return shadow;
+end;
+$$;
+
+
+-- Build the indexes of a loaded shadow table once it is validated. Returns the version, whose status is 'failed' when
+-- the shadow table is empty, is missing rows the crawler wrote or is much smaller than the live corpus.
+drop function if exists finalize_corpus_shadow(text, bigint, float);
+drop function if exists finalize_corpus_shadow(text, bigint, float, text);
+create or replace function finalize_corpus_shadow(
+    p_version text,
+    p_expected_rows bigint,
+    p_min_ratio float default 0.9,
+    p_index_method text default 'hnsw',
+    p_quantization text default 'none',
+    p_dimensions int default 1536
+)
+returns corpus_versions
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+    shadow text := 'site_pages_' || p_version;
+    loaded bigint;
+    live bigint;
+    result corpus_versions;
+begin
+    perform 1 from corpus_versions where version = p_version and status = 'loading' for update;
+    if not found then
+        raise exception 'Corpus version % is not loading', p_version;
+    end if;
+
+    execute format('select count(*) from %I', shadow) into loaded;
+    select count(*) into live from site_pages;
+
+    if loaded <> p_expected_rows or loaded = 0 or loaded < live * p_min_ratio then
+        update corpus_versions set status = 'failed', row_count = loaded where version = p_version
+        returning * into result;
+        return result;
+    end if;
+
+    -- Building the vector index once on the full table is much faster than maintaining it row by row, and an
+    -- ivfflat index gets lists trained on the actual data (see vector_index.sql).
+    perform create_vector_index(
+        shadow, p_index_method, p_quantization => p_quantization, p_dimensions => p_dimensions
+    );
+    execute format('create index on %I using gin (metadata)', shadow);
+    execute format('create index on %I using gin (fts)', shadow);
+    execute format('analyze %I', shadow);
+
+    update corpus_versions set status = 'ready', row_count = loaded where version = p_version
+    returning * into result;
+    return result;
+end;
+$$;
+
+
+-- Atomically make a ready version the one `site_pages` points to; the previous corpus is renamed and retired.
+create or replace function activate_corpus_version(p_version text)
+returns void
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+    previous text;
+begin
+    perform 1 from corpus_versions where version = p_version and status = 'ready' for update;
+    if not found then
+        raise exception 'Corpus version % is not ready', p_version;
+    end if;
+
+    -- Queries queue behind the rename lock, so give up rather than stall them behind a long transaction.
+    set local lock_timeout = '5s';
+
+    select version into previous from corpus_versions where status = 'active' for update;
+    if previous is null then
+        -- The corpus loaded before versioning was introduced.
+        previous := 'pre_' || to_char(timezone('utc'::text, now()), 'YYYYMMDDHH24MISS');
+        insert into corpus_versions (version, status) values (previous, 'active');
+    end if;
+
+    execute format('alter table site_pages rename to %I', 'site_pages_' || previous);
+    execute format('alter table %I rename to site_pages', 'site_pages_' || p_version);
+
+    update corpus_versions set status = 'retired' where version = previous;
+    update corpus_versions set status = 'active', activated_at = timezone('utc'::text, now()) where version = p_version;
+
+    notify pgrst, 'reload schema';
+end;
+$$;
+
+
+-- Drop the tables of retired versions beyond the `p_keep` most recent ones, and of failed or abandoned loads.
+create or replace function gc_corpus_versions(p_keep int default 1)
+returns setof text
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+    stale record;
+begin
+    for stale in
+        select version from (
+            select version, status, created_at,
+                   row_number() over (partition by status = 'retired' order by created_at desc) as rank
+            from corpus_versions
+            where status in ('retired', 'failed', 'loading', 'ready')
+        ) versions
+        where (status = 'retired' and rank > p_keep)
+           or status = 'failed'
+           or (status in ('loading', 'ready') and created_at < timezone('utc'::text, now()) - interval '1 day')
+    loop
+        execute format('drop table if exists %I', 'site_pages_' || stale.version);
+        delete from corpus_versions where version = stale.version;
+        return next stale.version;
+    end loop;
+end;
+$$;
+
+
+-- Record that an incremental crawl changed the live corpus in place, so caches of search results are dropped.
+create or replace function touch_corpus_version()
+returns void
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+begin
+    update corpus_versions set updated_at = timezone('utc'::text, now()) where status = 'active';
+    if not found then
+        -- The corpus loaded before versioning was introduced.
+        insert into corpus_versions (version, status, updated_at)
+        values ('pre_' || to_char(timezone('utc'::text, now()), 'YYYYMMDDHH24MISS'), 'active', timezone('utc'::text, now()));
+    end if;
+end;
+$$;
+
+
+-- Identify the corpus retrieval currently reads: changes on every swap and every incremental crawl.
+create or replace function current_corpus_version()
+returns text
+language sql
+stable
+security definer
+set search_path = public, extensions
+as $$
+    select coalesce(
+        (select version || '@' || coalesce(updated_at, activated_at, created_at)::text
+         from corpus_versions where status = 'active'),
+        'unversioned'
+    );
+$$;
+
+
+-- Only the crawler (service key) may change the corpus; anyone may read which version is active.
+revoke execute on function create_corpus_shadow(text) from public, anon, authenticated;
+revoke execute on function finalize_corpus_shadow(text, bigint, float, text, text, int) from public, anon, authenticated;
+revoke execute on function activate_corpus_version(text) from public, anon, authenticated;
+revoke execute on function gc_corpus_versions(int) from public, anon, authenticated;
+revoke execute on function touch_corpus_version() from public, anon, authenticated;
+grant execute on function create_corpus_shadow(text) to service_role;
+grant execute on function finalize_corpus_shadow(text, bigint, float, text, text, int) to service_role;
+grant execute on function activate_corpus_version(text) to service_role;
+grant execute on function gc_corpus_versions(int) to service_role;
+grant execute on function touch_corpus_version() to service_role;
@@ -17,9 +17,9 @@ create table site_pages (
     unique(url, chunk_number)
 );
 
-SET maintenance_work_mem = '128MB';
-create index on site_pages using ivfflat (embedding vector_ip_ops);
-SET maintenance_work_mem = '32MB';
+-- The vector index is built once the table is loaded: an ivfflat index trained on an empty table has poor recall.
+-- Full crawls build it on the new corpus version; otherwise run `select create_vector_index('site_pages');`
+-- (supabase_script/vector_index.sql) after loading.
 
 -- Create an index on metadata for faster filtering
 create index idx_site_pages_metadata on site_pages using gin (metadata);
@@ -51,9 +51,9 @@ create table site_pages (
     unique(url, chunk_number)
 );
 
-SET maintenance_work_mem = '128MB';
-create index on site_pages using ivfflat (embedding vector_ip_ops);
-SET maintenance_work_mem = '32MB';
+-- The vector index is built once the table is loaded: an ivfflat index trained on an empty table has poor recall.
+-- Full crawls build it on the new corpus version; otherwise run `select create_vector_index('site_pages');`
+-- (supabase_script/vector_index.sql) after loading.
 
 -- Create an index on metadata for faster filtering
 create index idx_site_pages_metadata on site_pages using gin (metadata);
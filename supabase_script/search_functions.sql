@@ -0,0 +1,169 @@
+-- Retrieval functions used by the agent. Run after `initialisation.sql` (and `corpus_versions.sql`).
+
+-- Full-text index on the generated tsvector column
+create index if not exists idx_site_pages_fts on site_pages using gin (fts);
+
+
+-- Recall/speed knob shared by the search functions: set the HNSW ef_search or ivfflat probes for this
+-- transaction only. Null keeps the server default.
+create or replace function set_vector_search_params(ef_search int default null, probes int default null)
+returns void
+language plpgsql
+as $$
+begin
+    if ef_search is not null then
+        perform set_config('hnsw.ef_search', ef_search::text, true);
+    end if;
+    if probes is not null then
+        perform set_config('ivfflat.probes', probes::text, true);
+    end if;
+end;
+$$;
+
+
+-- The leading dimensions of an embedding returned with search results, or null when none are requested.
+create or replace function returned_embedding(p_embedding vector, p_dimensions int)
+returns halfvec
+language sql
+immutable
+as $$
+    select case when p_dimensions > 0 then l2_normalize(subvector(p_embedding, 1, least(p_dimensions, 1536)))::halfvec end;
+$$;
+
+
+-- Vector search. Embeddings are normalized, so ordering by negative inner product (<#>) is the cosine order and
+-- matches the vector_ip_ops index. With a quantized or truncated index (see vector_index.sql), pass the same
+-- quantization and dimensions: the index shortlists match_count * rescore_factor candidates, which are then ranked
+-- by their full-precision embeddings. With embedding_dimensions > 0, each row also carries the first
+-- embedding_dimensions dimensions of its embedding (normalized, half precision) for diversity selection.
+drop function if exists match_site_pages(vector, int, jsonb);
+drop function if exists match_site_pages(vector, int, jsonb, int, int);
+drop function if exists match_site_pages(vector, int, jsonb, int, int, text, int, int);
+create or replace function match_site_pages (
+    query_embedding vector(1536),
+    match_count int default 10,
+    filter jsonb default '{}'::jsonb,
+    ef_search int default null,
+    probes int default null,
+    quantization text default 'none',
+    dimensions int default 1536,
+    rescore_factor int default 4,
+    embedding_dimensions int default 0
+) returns table (
+    id bigint,
+    url varchar,
+    chunk_number integer,
+    title varchar,
+    summary varchar,
+    content text,
+    metadata jsonb,
+    similarity float,
+    embedding halfvec
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+    if query_embedding is null then
+        return;
+    end if;
+    perform set_vector_search_params(ef_search, probes);
+
+    if quantization = 'none' and dimensions = 1536 then
+        return query
+        select site_pages.id, site_pages.url, site_pages.chunk_number, site_pages.title, site_pages.summary,
+               site_pages.content, site_pages.metadata, -(site_pages.embedding <#> query_embedding) as similarity,
+               returned_embedding(site_pages.embedding, embedding_dimensions)
+        from site_pages
+        where site_pages.metadata @> filter
+        order by site_pages.embedding <#> query_embedding
+        limit match_count;
+        return;
+    end if;
+
+    return query execute format(
+        'with candidates as (
+            select site_pages.id from site_pages
+            where site_pages.metadata @> $2
+            order by %s %s %s
+            limit $3 * $4
+        )
+        select site_pages.id, site_pages.url, site_pages.chunk_number, site_pages.title, site_pages.summary,
+               site_pages.content, site_pages.metadata, -(site_pages.embedding <#> $1) as similarity,
+               returned_embedding(site_pages.embedding, $5)
+        from candidates
+        join site_pages on site_pages.id = candidates.id
+        order by site_pages.embedding <#> $1
+        limit $3',
+        quantized_embedding_sql('site_pages.embedding', quantization, dimensions),
+        case when quantization = 'binary' then '<~>' else '<#>' end,
+        quantized_embedding_sql('$1', quantization, dimensions)
+    )
+    using query_embedding, filter, match_count, greatest(rescore_factor, 1), embedding_dimensions;
+end;
+$$;
+
+
+-- Hybrid search: full-text and vector search merged with weighted reciprocal rank fusion.
+-- With a null query_embedding only the full-text search runs (keyword fast path).
+drop function if exists hybrid_search_site_pages(text, vector, int, jsonb, float, float, int);
+drop function if exists hybrid_search_site_pages(text, vector, int, jsonb, float, float, int, int, int);
+drop function if exists hybrid_search_site_pages(text, vector, int, jsonb, float, float, int, int, int, text, int, int);
+create or replace function hybrid_search_site_pages (
+    query_text text,
+    query_embedding vector(1536) default null,
+    match_count int default 10,
+    filter jsonb default '{}'::jsonb,
+    full_text_weight float default 1,
+    semantic_weight float default 1,
+    rrf_k int default 50,
+    ef_search int default null,
+    probes int default null,
+    quantization text default 'none',
+    dimensions int default 1536,
+    rescore_factor int default 4,
+    embedding_dimensions int default 0
+) returns table (
+    id bigint,
+    url varchar,
+    chunk_number integer,
+    title varchar,
+    summary varchar,
+    content text,
+    metadata jsonb,
+    score float,
+    embedding halfvec
+)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+    return query
+    with full_text as (
+        select site_pages.id,
+               row_number() over (
+                   order by ts_rank_cd(site_pages.fts, websearch_to_tsquery('english', query_text)) desc
+               ) as rank_ix
+        from site_pages
+        where site_pages.fts @@ websearch_to_tsquery('english', query_text) and site_pages.metadata @> filter
+        order by rank_ix
+        limit match_count * 2
+    ),
+    semantic as (
+        select matches.id, row_number() over (order by matches.similarity desc) as rank_ix
+        from match_site_pages(
+            query_embedding, match_count * 2, filter, ef_search, probes, quantization, dimensions, rescore_factor
+        ) as matches
+    )
+    select site_pages.id, site_pages.url, site_pages.chunk_number, site_pages.title, site_pages.summary,
+           site_pages.content, site_pages.metadata,
+           (coalesce(1.0 / (rrf_k + full_text.rank_ix), 0.0) * full_text_weight
+            + coalesce(1.0 / (rrf_k + semantic.rank_ix), 0.0) * semantic_weight)::float as score,
+           returned_embedding(site_pages.embedding, embedding_dimensions)
+    from full_text
+    full outer join semantic on full_text.id = semantic.id
+    join site_pages on site_pages.id = coalesce(full_text.id, semantic.id)
+    order by score desc
+    limit match_count;
+end;
+$$;
@@ -0,0 +1,114 @@
+-- Vector index management. Run after `initialisation.sql`, as the owner of `site_pages`: `create_vector_index` runs as
+-- its owner (`security definer`), so the crawler can index the corpus tables with the service key.
+--
+-- HNSW (the default) gives better recall/speed trade-offs than ivfflat and does not depend on the data present
+-- when it is built; ivfflat builds faster and uses less memory. Embeddings are normalized and the search functions
+-- order by negative inner product.
+--
+-- Recall is tuned per query with `hnsw.ef_search` / `ivfflat.probes`, see the `ef_search` and `probes`
+-- parameters of `match_site_pages` and `hybrid_search_site_pages`.
+--
+-- The index can hold a compact form of the embeddings while the table keeps the full float32 vectors:
+--   quantization 'none'    vector     (4 bytes per dimension)
+--                'halfvec' float16    (2 bytes per dimension)
+--                'binary'  sign bits  (1 bit per dimension, hamming distance)
+--   dimensions   < 1536    only the first dimensions, renormalized (Matryoshka truncation, text-embedding-3-* only)
+-- With a compact index, the search functions fetch `rescore_factor` times more candidates from it and rank them by
+-- the full-precision vectors. Searches must pass the same quantization and dimensions as the index.
+
+
+-- The indexed expression for a quantization and a number of dimensions, applied to `p_value` (a column or a
+-- query parameter). Index and queries must use the very same expression for the planner to use the index.
+create or replace function quantized_embedding_sql(p_value text, p_quantization text, p_dimensions int)
+returns text
+language plpgsql
+immutable
+as $$
+declare
+    reduced text := case
+        when p_dimensions = 1536 then p_value
+        else format('l2_normalize(subvector(%s, 1, %s))', p_value, p_dimensions)
+    end;
+begin
+    if p_dimensions < 1 or p_dimensions > 1536 then
+        raise exception 'Embedding dimensions must be between 1 and 1536, got %', p_dimensions;
+    end if;
+
+    if p_quantization = 'none' then
+        return case when p_dimensions = 1536 then p_value else format('(%s)::vector(%s)', reduced, p_dimensions) end;
+    elsif p_quantization = 'halfvec' then
+        return format('(%s)::halfvec(%s)', reduced, p_dimensions);
+    elsif p_quantization = 'binary' then
+        return format('binary_quantize(%s)::bit(%s)', reduced, p_dimensions);
+    end if;
+    raise exception 'Unknown embedding quantization %', p_quantization;
+end;
+$$;
+
+
+-- (Re)build the vector index of a table once its data is loaded. The new index is built before the old ones are
+-- dropped, so reads keep using an index during the build; writes wait for it. For a very large live table, run
+-- the equivalent `create index concurrently` from psql instead.
+drop function if exists create_vector_index(text, text, int, int, int);
+create or replace function create_vector_index(
+    p_table text default 'site_pages',
+    p_method text default 'hnsw',
+    p_m int default 16,
+    p_ef_construction int default 64,
+    p_lists int default null,
+    p_quantization text default 'none',
+    p_dimensions int default 1536
+)
+returns text
+language plpgsql
+security definer
+set search_path = public, extensions
+as $$
+declare
+    row_total bigint;
+    index_name text := p_table || '_embedding_' || p_method || '_' || to_char(clock_timestamp(), 'YYYYMMDDHH24MISS');
+    indexed text := quantized_embedding_sql('embedding', p_quantization, p_dimensions);
+    opclass text := case p_quantization
+        when 'halfvec' then 'halfvec_ip_ops'
+        when 'binary' then 'bit_hamming_ops'
+        else 'vector_ip_ops'
+    end;
+    old_index record;
+begin
+    if p_method not in ('hnsw', 'ivfflat') then
+        raise exception 'Unknown vector index method %', p_method;
+    end if;
+
+    set local maintenance_work_mem = '512MB';
+
+    if p_method = 'hnsw' then
+        execute format(
+            'create index %I on %I using hnsw ((%s) %s) with (m = %s, ef_construction = %s)',
+            index_name, p_table, indexed, opclass, p_m, p_ef_construction
+        );
+    else
+        execute format('select count(*) from %I', p_table) into row_total;
+        -- pgvector's guidance: rows / 1000 lists up to 1M rows, sqrt(rows) above.
+        execute format(
+            'create index %I on %I using ivfflat ((%s) %s) with (lists = %s)',
+            index_name, p_table, indexed, opclass,
+            coalesce(p_lists, greatest(10, case when row_total > 1000000 then sqrt(row_total)::int else row_total / 1000 end))
+        );
+    end if;
+
+    for old_index in
+        select indexname from pg_indexes
+        where schemaname = current_schema() and tablename = p_table and indexname <> index_name
+          and indexdef ~ 'USING (hnsw|ivfflat) .*embedding'
+    loop
+        execute format('drop index %I', old_index.indexname);
+    end loop;
+
+    execute format('analyze %I', p_table);
+    return index_name;
+end;
+$$;
+
+
+revoke execute on function create_vector_index(text, text, int, int, int, text, int) from public, anon, authenticated;
+grant execute on function create_vector_index(text, text, int, int, int, text, int) to service_role;
@@ -0,0 +1,187 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import agent_tools
+from agent_tools import (
+    full_text_weight_for,
+    fuse_results,
+    looks_like_identifier,
+    search_documentation,
+    search_documentation_queries,
+)
+from query_embedding_cache import QueryEmbeddingCache
+from semantic_cache import SemanticCache
+
+
+class FakeSupabase:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        data = self.results.pop(0)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    calls = []
+
+    async def fake_get_embedding(text, client):
+        calls.append(text)
+        return [1.0] * 1536
+
+    monkeypatch.setattr(agent_tools, "get_embedding", fake_get_embedding)
+    monkeypatch.setattr(agent_tools, "query_embedding_cache", QueryEmbeddingCache())
+    monkeypatch.setattr(agent_tools, "retrieval_cache", None)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("Resolution queue", True),
+        ('"Bundle Operation"', True),
+        ("createRecord", True),
+        ("What are the two types of search?", False),
+        ("how to link two entities", False),
+        ("Which module is used for data management", False),
+    ],
+)
+def test_looks_like_identifier(query, expected):
+    assert looks_like_identifier(query) is expected
+
+
+def test_code_like_terms_weigh_full_text_more():
+    assert full_text_weight_for("what does bundle_operation return") == 2.0
+    assert full_text_weight_for('the "Resolution queue"') == 2.0
+    assert full_text_weight_for("how are entities linked") == 1.0
+
+
+def test_keyword_fast_path_skips_the_embedding(embeddings):
+    supabase = FakeSupabase([[{"title": "Resolution queue"}]])
+    rows = asyncio.run(search_documentation(supabase, None, "Resolution queue", mode="hybrid"))
+
+    assert rows == [{"title": "Resolution queue"}]
+    assert embeddings == []
+    name, params = supabase.calls[0]
+    assert name == "hybrid_search_site_pages" and params["query_embedding"] is None
+
+
+def test_keyword_fast_path_falls_back_to_fused_search(embeddings):
+    supabase = FakeSupabase([[], [{"title": "Queues"}]])
+    rows = asyncio.run(search_documentation(supabase, None, "Resolution queue", mode="hybrid", keyword_weight=3.0))
+
+    assert rows == [{"title": "Queues"}]
+    assert embeddings == ["Resolution queue"]
+    _, params = supabase.calls[1]
+    assert params["query_embedding"] == [1.0] * 1536
+    assert params["full_text_weight"] == 3.0
+
+
+def test_vector_mode_calls_match_site_pages(embeddings):
+    supabase = FakeSupabase([[{"title": "Search"}]])
+    asyncio.run(search_documentation(supabase, None, "What are the two types of search?", mode="vector"))
+    assert [name for name, _ in supabase.calls] == ["match_site_pages"]
+
+
+def test_vector_search_params_are_passed_to_the_search_functions(embeddings, monkeypatch):
+    monkeypatch.setattr(agent_tools, "vector_search_params", {"ef_search": 100})
+    supabase = FakeSupabase([[{"title": "Search"}], [{"title": "Search"}]])
+    asyncio.run(search_documentation(supabase, None, "What are the two types of search?", mode="vector"))
+    asyncio.run(search_documentation(supabase, None, "What are the two types of search?", mode="hybrid"))
+    assert [params["ef_search"] for _, params in supabase.calls] == [100, 100]
+
+
+def test_similar_queries_reuse_the_rows_until_the_corpus_changes(embeddings, monkeypatch):
+    monkeypatch.setattr(agent_tools, "retrieval_cache", SemanticCache(threshold=0.9))
+    monkeypatch.setattr(agent_tools, "CORPUS_VERSION_CHECK_INTERVAL", 0.0)
+    supabase = FakeSupabase(["v1@1", [{"title": "Search"}], "v1@1", "v1@2", [{"title": "New search"}]])
+
+    def search(query):
+        return asyncio.run(search_documentation(supabase, None, query, mode="vector"))
+
+    assert search("What are the two types of search?") == [{"title": "Search"}]
+    assert search("types of search in clinia") == [{"title": "Search"}]
+    assert search("types of search in clinia") == [{"title": "New search"}]
+    assert [name for name, _ in supabase.calls] == [
+        "current_corpus_version",
+        "match_site_pages",
+        "current_corpus_version",
+        "current_corpus_version",
+        "match_site_pages",
+    ]
+    assert agent_tools.retrieval_cache.stats.hits == 1
+    assert agent_tools.retrieval_cache.stats.invalidations == 1
+
+
+def test_fuse_results_ranks_chunks_found_by_several_queries_first():
+    a, b, c = ({"url": url, "chunk_number": 0, "similarity": 0.8} for url in "abc")
+    fused = fuse_results([[a, b], [c, b]])
+
+    assert [row["url"] for row in fused] == ["b", "a", "c"]
+    assert fused[0]["fused_score"] == pytest.approx(2 / 62)
+    assert "similarity" not in fused[0] and "similarity" in b
+
+
+def test_sub_queries_are_embedded_in_one_request_and_searched_together(monkeypatch):
+    monkeypatch.setattr(agent_tools, "query_embedding_cache", QueryEmbeddingCache())
+    monkeypatch.setattr(agent_tools, "retrieval_cache", None)
+    requests = []
+
+    async def create(model, input):
+        requests.append(input)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[float(i + 1)] * 1536) for i in range(len(input))]
+        )
+
+    class RowsByEmbedding:
+        calls = []
+
+        def rpc(self, name, params):
+            self.calls.append(name)
+            first = int(params["query_embedding"][0])
+            rows = [{"url": f"page-{first}", "chunk_number": 0}, {"url": "shared", "chunk_number": 0}]
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=rows))
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    supabase = RowsByEmbedding()
+    rows = asyncio.run(
+        search_documentation_queries(
+            supabase, client, ["pricing tiers", "Pricing tiers?", "rate limits", " "], mode="vector"
+        )
+    )
+
+    assert requests == [["pricing tiers", "rate limits"]]
+    assert supabase.calls == ["match_site_pages", "match_site_pages"]
+    assert [row["url"] for row in rows] == ["shared", "page-1", "page-2"]
+
+
+def test_identifier_sub_queries_take_the_keyword_fast_path_without_embeddings(monkeypatch):
+    monkeypatch.setattr(agent_tools, "query_embedding_cache", QueryEmbeddingCache())
+    monkeypatch.setattr(agent_tools, "retrieval_cache", None)
+    requests = []
+
+    async def create(model, input):
+        requests.append(input)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0] * 1536) for i in range(len(input))])
+
+    class RowsByQuery:
+        def rpc(self, name, params):
+            rows = [{"url": params["query_text"], "chunk_number": 0}]
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=rows))
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+
+    def search(queries):
+        return asyncio.run(
+            search_documentation_queries(RowsByQuery(), client, queries, mode="hybrid", backend="supabase")
+        )
+
+    assert [row["url"] for row in search(["Resolution queue", "createRecord"])] == ["Resolution queue", "createRecord"]
+    assert requests == []
+    search(["Resolution queue", "how are records linked"])
+    assert requests == [["how are records linked"]]
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+from pydantic_ai.models.function import FunctionModel
+from test_clinia_doc_agent import search_then_answer
+
+import async_rpc
+import clinia_doc_agent
+from app_resources import AppResources
+from clinia_doc_agent import get_agent
+
+
+class FakeEmbeddingClient:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def resources():
+    resources = AppResources(embedding_client=FakeEmbeddingClient(), supabase=None, max_concurrent_runs=2)
+    yield resources
+    resources.close()
+
+
+def test_stream_answer_calls_back_from_the_calling_thread(resources, monkeypatch):
+    async def fake_retrieve(supabase, embedding_client, query, keyword_weight=None):
+        return "Resolution queue"
+
+    monkeypatch.setattr(clinia_doc_agent, "retrieve_relevant_documentation_tool", fake_retrieve)
+    caller = threading.get_ident()
+    threads, pieces, progress = set(), [], []
+
+    def on_text(delta):
+        threads.add(threading.get_ident())
+        pieces.append(delta)
+
+    with get_agent().override(model=FunctionModel(stream_function=search_then_answer)):
+        answer = resources.stream_answer("How do I merge records?", on_text, progress.append)
+
+    assert threads == {caller}
+    assert progress == ["searching: queues"]
+    assert "".join(pieces) == answer.text == "Use the Resolution queue."
+    assert resources.stats.completed == 1 and resources.stats.in_flight == 0
+
+
+def test_runs_share_one_loop_and_respect_the_concurrency_limit(resources):
+    running, peak, loops = 0, 0, set()
+
+    async def work():
+        nonlocal running, peak
+        loops.add(asyncio.get_running_loop())
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return "done"
+
+    futures = [resources.submit(work()) for _ in range(6)]
+    assert [future.result(5) for future in futures] == ["done"] * 6
+    assert len(loops) == 1
+    assert peak == 2
+
+
+def test_close_waits_for_in_flight_runs_then_rejects_new_ones(resources, monkeypatch):
+    from supabase import Client
+
+    monkeypatch.setattr(async_rpc, "SUPABASE_ASYNC_RPC", True)
+    supabase = Client("http://supabase.test", "fake.fake.fake")
+
+    async def slow():
+        async_rpc.get_async_rpc_client(supabase)
+        await asyncio.sleep(0.05)
+        return 42
+
+    future = resources.submit(slow())
+    resources.close()
+
+    assert future.result(0) == 42
+    assert resources.embedding_client.closed
+    assert resources._loop not in async_rpc._clients
+    assert resources.health() == {"event_loop": False, "openai": False, "supabase": False}
+    with pytest.raises(RuntimeError):
+        resources.submit(slow())
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+import agent_tools
+import async_rpc
+import record_replay
+from async_rpc import AsyncRpcClient, RpcTimeoutError, get_async_rpc_client
+
+REST_URL = "http://supabase.test/rest/v1"
+
+
+def rpc_client(handler, **kwargs):
+    return AsyncRpcClient(REST_URL, {"apikey": "key"}, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_rpc_posts_the_params_and_returns_the_rows():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=[{"title": "Search"}])
+
+    async def run():
+        client = rpc_client(handler)
+        try:
+            return await client.rpc("match_site_pages", {"match_count": 3})
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == [{"title": "Search"}]
+    assert str(requests[0].url) == f"{REST_URL}/rpc/match_site_pages"
+    assert requests[0].headers["apikey"] == "key"
+    assert json.loads(requests[0].content) == {"match_count": 3}
+
+
+def test_slow_calls_time_out_and_errors_raise_api_errors():
+    async def handler(request):
+        if request.url.path.endswith("slow"):
+            await asyncio.sleep(1)
+        return httpx.Response(400, json={"message": "function not found", "code": "PGRST202"})
+
+    async def run():
+        client = rpc_client(handler, timeout=0.05)
+        try:
+            with pytest.raises(RpcTimeoutError):
+                await client.rpc("slow", {})
+            with pytest.raises(APIError, match="function not found"):
+                await client.rpc("missing", {})
+            return client.stats
+        finally:
+            await client.close()
+
+    stats = asyncio.run(run())
+    assert (stats.requests, stats.timeouts, stats.errors) == (2, 1, 1)
+
+
+def test_each_event_loop_gets_its_own_client(monkeypatch):
+    from supabase import Client
+
+    monkeypatch.setattr(async_rpc, "SUPABASE_ASYNC_RPC", True)
+    supabase = Client("http://supabase.test", "fake.fake.fake")
+
+    async def client_of_loop():
+        first, second = get_async_rpc_client(supabase), get_async_rpc_client(supabase)
+        assert first is second
+        await async_rpc.close_async_rpc_clients()
+        return first
+
+    assert asyncio.run(client_of_loop()) is not asyncio.run(client_of_loop())
+
+    # Clients of loops that ended without closing them are dropped, not kept forever.
+    async def leaked_client():
+        # Open connections reference their loop, which keeps the weak key alive.
+        get_async_rpc_client(supabase).loop = asyncio.get_running_loop()
+
+    asyncio.run(leaked_client())
+    asyncio.run(leaked_client())
+    assert len(async_rpc._clients) == 1
+    async_rpc._clients.clear()
+
+    async def without_postgrest():
+        return get_async_rpc_client(object())
+
+    assert asyncio.run(without_postgrest()) is None
+
+
+def test_corpus_version_is_read_through_the_shared_client_of_the_project(monkeypatch):
+    from supabase import Client
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json="v1@2026-10-17")
+
+    monkeypatch.setattr(async_rpc, "SUPABASE_ASYNC_RPC", True)
+    monkeypatch.setattr(record_replay, "client_transport", lambda asynchronous: httpx.MockTransport(handler))
+    supabase = Client("http://supabase.test", "fake.fake.fake")
+
+    async def run():
+        try:
+            return await agent_tools._current_corpus_version(supabase)
+        finally:
+            await async_rpc.close_async_rpc_clients()
+
+    assert asyncio.run(run()) == "v1@2026-10-17"
+    assert str(requests[0].url) == "http://supabase.test/rest/v1/rpc/current_corpus_version"
+    assert requests[0].headers["apikey"] == "fake.fake.fake"
+    assert requests[0].headers["content-profile"] == "public"
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from chunk_summarizer import ChunkSummarizer, heading_title, title_from_url
+from content_cache import ContentCache
+
+
+class FakeCompletions:
+    def __init__(self, drop_ids=()):
+        self.calls = []
+        self.drop_ids = set(drop_ids)
+
+    async def create(self, model, messages, response_format):
+        prompt = messages[-1]["content"]
+        self.calls.append(prompt)
+        await asyncio.sleep(0)
+        ids = [int(i) for i in re.findall(r"<chunk id=(\d+)>", prompt)]
+        if ids:
+            chunks = [
+                {"id": i, "title": f"Title {i}", "summary": f"Summary {i}"} for i in ids if i not in self.drop_ids
+            ]
+            content = {"chunks": chunks}
+        else:
+            content = {"title": "Single title", "summary": "Single summary"}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+
+def make_summarizer(completions, **kwargs):
+    kwargs.setdefault("flush_interval", 0.001)
+    return ChunkSummarizer(SimpleNamespace(chat=SimpleNamespace(completions=completions)), "model", **kwargs)
+
+
+def summarize_all(summarizer, chunks):
+    async def run():
+        results = await asyncio.gather(*[summarizer.summarize(content, url) for content, url in chunks])
+        await summarizer.close()
+        return results
+
+    return asyncio.run(run())
+
+
+def test_batch_mode_packs_the_chunks_of_a_page_into_one_request():
+    completions = FakeCompletions()
+    summarizer = make_summarizer(completions, mode="batch", batch_size=3)
+    chunks = [(f"chunk {i}", "https://docs/a") for i in range(5)] + [("other", "https://docs/b")]
+
+    results = summarize_all(summarizer, chunks)
+
+    # Two requests for the five chunks of page a (3 + 2); the lone chunk of page b gets the single-chunk prompt.
+    assert len(completions.calls) == 3
+    assert sum("<chunk id=" in prompt for prompt in completions.calls) == 2
+    assert [result["summary"] for result in results[:5]] == [f"Summary {i}" for i in range(1, 6)]
+    assert results[5] == {"title": "Single title", "summary": "Single summary"}
+    assert summarizer.stats.calls_per_page == 1.5
+
+
+def test_chunks_missing_from_a_batched_answer_are_summarized_alone():
+    completions = FakeCompletions(drop_ids={2})
+    summarizer = make_summarizer(completions, mode="batch")
+
+    results = summarize_all(summarizer, [("first", "https://docs/a"), ("second", "https://docs/a")])
+
+    assert results == [
+        {"title": "Title 1", "summary": "Summary 1"},
+        {"title": "Single title", "summary": "Single summary"},
+    ]
+    assert len(completions.calls) == 2
+
+
+def test_heading_titles_and_cached_summaries_skip_the_model(tmp_path):
+    cache = ContentCache(str(tmp_path / "cache.sqlite"))
+    completions = FakeCompletions()
+    summarizer = make_summarizer(completions, heading_titles=True, cache=cache)
+    content = "## Creating a partition\n\nPartitions group records."
+
+    first = summarize_all(summarizer, [(content, "https://docs/a")])
+    second = summarize_all(summarizer, [(content, "https://docs/a")])
+
+    assert first == second == [{"title": "Creating a partition", "summary": "Single summary"}]
+    assert len(completions.calls) == 1
+    assert summarizer.stats.cache_hits == 1
+
+
+def test_deferred_mode_stores_placeholders_then_fills_pages_in_batches():
+    completions = FakeCompletions()
+    summarizer = make_summarizer(completions, mode="deferred")
+
+    deferred = summarize_all(
+        summarizer, [("first", "https://docs/data-partitions"), ("# Intro\n\ntext", "https://docs/x")]
+    )
+    assert deferred == [{"title": "Data Partitions", "summary": ""}, {"title": "X", "summary": ""}]
+    assert completions.calls == []
+
+    filled = asyncio.run(summarizer.summarize_page("https://docs/data-partitions", ["first", "second"]))
+    assert [result["summary"] for result in filled] == ["Summary 1", "Summary 2"]
+    assert len(completions.calls) == 1
+
+
+@pytest.mark.parametrize(
+    "content, heading_path, expected",
+    [
+        ("text", ["Search", "Types of search", "Vector search"], "Types of search - Vector search"),
+        ("intro\n### Merging records ###\nmore", None, "Merging records"),
+        ("```\n# not a heading\n```\ntext", None, None),
+    ],
+)
+def test_heading_title(content, heading_path, expected):
+    assert heading_title(content, heading_path) == expected
+
+
+def test_title_from_url():
+    assert title_from_url("https://docs.clinia.com/guide/data_partitions/") == "Data Partitions"
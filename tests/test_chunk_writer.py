@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from chunk_writer import BatchWriter
+
+
+class FakeSink:
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+
+    def upsert(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append(rows)
+
+
+def row(url, chunk_number, title="t"):
+    return {"url": url, "chunk_number": chunk_number, "title": title}
+
+
+def test_flushes_when_batch_is_full():
+    sink = FakeSink()
+    writer = BatchWriter(sink, batch_size=3, flush_interval=60)
+
+    async def run():
+        futures = [await writer.write(row("u", i)) for i in range(7)]
+        await writer.close()
+        return futures
+
+    futures = asyncio.run(run())
+    assert [len(batch) for batch in sink.batches] == [3, 3, 1]
+    assert all(future.done() and future.exception() is None for future in futures)
+    assert writer.stats.rows == 7
+
+
+def test_flushes_after_the_interval():
+    sink = FakeSink()
+    writer = BatchWriter(sink, batch_size=100, flush_interval=0.01)
+
+    async def run():
+        future = await writer.write(row("u", 0))
+        await asyncio.wait_for(future, timeout=1)
+
+    asyncio.run(run())
+    assert sink.batches == [[row("u", 0)]]
+
+
+def test_duplicate_keys_keep_the_last_version():
+    sink = FakeSink()
+    writer = BatchWriter(sink, batch_size=10)
+
+    async def run():
+        await writer.write(row("u", 0, "old"))
+        await writer.write(row("u", 0, "new"))
+        await writer.close()
+
+    asyncio.run(run())
+    assert sink.batches == [[row("u", 0, "new")]]
+
+
+def test_retries_failed_batches():
+    sink = FakeSink(failures=2)
+    writer = BatchWriter(sink, batch_size=2, backoff_base=0)
+
+    async def run():
+        futures = [await writer.write(row("u", i)) for i in range(2)]
+        await writer.close()
+        return futures
+
+    futures = asyncio.run(run())
+    assert all(future.exception() is None for future in futures)
+    assert writer.stats.retries == 2
+
+
+def test_failed_batches_fail_their_futures():
+    sink = FakeSink(failures=10)
+    writer = BatchWriter(sink, batch_size=2, max_retries=1, backoff_base=0)
+
+    async def run():
+        future = await writer.write(row("u", 0))
+        await writer.close()
+        return await future
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert writer.stats.failed_rows == 1
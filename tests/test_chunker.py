@@ -1,6 +1,11 @@
+import re
+
+import legacy_chunker
 import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
 
-from chunker import chunk_text
+from chunker import chunk_markdown_by_tokens, chunk_text, iter_chunks
 
 
 def test_chunk_text_basic_split():
@@ -53,3 +58,114 @@ def test_chunk_text_long_text_with_no_breaks():
     # Should split at max size if no breaks
     assert all(len(chunk) <= 50 for chunk in chunks)
     assert "".join(chunks) == text
+
+
+# Equivalence with the previous implementation: random markdown made of the characters the chunker reacts to.
+TOKENS = ["word", "Word", ".", ". ", ".\n", " ", "\n", "\n\n", "\n\n\n", "```", "```python\n", "\n```", "x = 1"]
+markdown = st.lists(st.sampled_from(TOKENS), max_size=200).map("".join)
+
+
+@settings(max_examples=500, deadline=None)
+@given(text=markdown, chunk_size=st.integers(min_value=1, max_value=120))
+def test_chunk_text_matches_previous_implementation(text, chunk_size):
+    assert chunk_text(text, chunk_size) == legacy_chunker.chunk_text(text, chunk_size)
+
+
+@settings(max_examples=300, deadline=None)
+@given(text=markdown, chunk_size=st.integers(min_value=1, max_value=120), data=st.data())
+def test_iter_chunks_does_not_depend_on_how_the_text_is_split(text, chunk_size, data):
+    cuts = sorted(data.draw(st.lists(st.integers(min_value=0, max_value=len(text)), max_size=20)))
+    pieces = [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)], strict=True)]
+    assert list(iter_chunks(pieces, chunk_size)) == legacy_chunker.chunk_text(text, chunk_size)
+
+
+def test_iter_chunks_is_lazy():
+    def pieces():
+        yield "First paragraph."
+        yield "\n\nSecond paragraph.\n\n"
+        raise AssertionError("the chunker read past the first complete chunk")
+
+    chunks = iter_chunks(pieces(), chunk_size=20)
+    assert next(chunks) == "First paragraph."
+
+
+def test_chunk_size_must_be_positive():
+    with pytest.raises(ValueError):
+        list(iter_chunks("text", 0))
+
+
+class WordTokenizer:
+    """A reversible tokenizer where every word and every whitespace run is one token."""
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.words = []
+
+    def encode(self, text):
+        tokens = []
+        for word in re.findall(r"\s+|\S+", text):
+            if word not in self.vocabulary:
+                self.vocabulary[word] = len(self.words)
+                self.words.append(word)
+            tokens.append(self.vocabulary[word])
+        return tokens
+
+    def decode(self, tokens):
+        return "".join(self.words[token] for token in tokens)
+
+
+GUIDE = (
+    "# Guide\n\nIntro paragraph.\n\n"
+    "## Install\n\nRun the installer. Then configure it. Then test it. Then ship it.\n\n"
+    "```bash\npip install x\n\npip install y\n```\n\n"
+    "## Usage\n\nShort usage.\n\n### Filters\n\nFilter by type."
+)
+
+
+def test_token_chunks_respect_the_budget():
+    tokenizer = WordTokenizer()
+    chunks = chunk_markdown_by_tokens(GUIDE * 5, max_tokens=20, tokenizer=tokenizer)
+    assert all(chunk.tokens <= 20 for chunk in chunks)
+    assert all(chunk.tokens == len(tokenizer.encode(chunk.content)) for chunk in chunks)
+
+
+def test_token_chunks_carry_the_heading_path():
+    chunks = chunk_markdown_by_tokens(GUIDE, max_tokens=30, tokenizer=WordTokenizer())
+    assert [chunk.heading_path for chunk in chunks] == [
+        ["Guide"],
+        ["Guide", "Install"],
+        ["Guide"],
+        ["Guide", "Usage", "Filters"],
+    ]
+    # A section that fits joins the current chunk, whose path becomes the common prefix; a code fence that fits
+    # is never split, even around its blank line.
+    assert chunks[2].content == "```bash\npip install x\n\npip install y\n```\n\n## Usage\n\nShort usage."
+
+
+def test_token_chunks_overlap_within_a_section():
+    text = " ".join(f"Sentence number {i}." for i in range(20))
+    chunks = chunk_markdown_by_tokens(text, max_tokens=24, tokenizer=WordTokenizer(), overlap_tokens=6)
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:], strict=False):
+        last_sentence = previous.content.rsplit("Sentence", 1)[1]
+        assert chunk.content.startswith("Sentence" + last_sentence)
+
+
+def test_oversized_sentences_are_split_by_tokens():
+    tokenizer = WordTokenizer()
+    text = " ".join(["word"] * 100)
+    chunks = chunk_markdown_by_tokens(text, max_tokens=30, tokenizer=tokenizer, heading_aware=False)
+    assert all(chunk.tokens <= 30 for chunk in chunks)
+    assert " ".join(chunk.content for chunk in chunks).split() == text.split()
+
+
+def test_oversized_code_fences_keep_their_blank_lines():
+    fence = "```python\ndef first():\n    return 1\n\n\ndef second():\n    return 2\n```"
+    chunks = chunk_markdown_by_tokens(fence, max_tokens=16, tokenizer=WordTokenizer(), heading_aware=False)
+    assert len(chunks) == 2
+    assert chunks[0].content == "```python\ndef first():\n    return 1\n\n\ndef second():"
+
+
+def test_token_chunk_overlap_must_be_smaller_than_the_budget():
+    with pytest.raises(ValueError):
+        chunk_markdown_by_tokens("text", max_tokens=10, tokenizer=WordTokenizer(), overlap_tokens=10)
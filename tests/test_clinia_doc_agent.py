@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from pydantic_ai.messages import ModelRequest, ToolReturnPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+import clinia_doc_agent
+from clinia_doc_agent import CliniaDocAgentsDeps, get_agent, stream_agent_answer
+from semantic_cache import SemanticCache
+
+
+async def search_then_answer(messages, info):
+    """Call the retrieval tool once, then stream an answer built from its result."""
+    tool_returns = [
+        part.content
+        for message in messages
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, ToolReturnPart)
+    ]
+    if not tool_returns:
+        yield {0: DeltaToolCall(name="retrieve_relevant_documentation", json_args=json.dumps({"query": "queues"}))}
+        return
+    for token in ["Use ", "the ", tool_returns[0], "."]:
+        yield token
+
+
+def test_stream_agent_answer_reports_progress_tokens_and_timings(monkeypatch):
+    async def fake_retrieve(supabase, embedding_client, query, keyword_weight=None):
+        return "Resolution queue"
+
+    monkeypatch.setattr(clinia_doc_agent, "retrieve_relevant_documentation_tool", fake_retrieve)
+    deps = CliniaDocAgentsDeps(supabase=None, embedding_client=None)
+    pieces, progress = [], []
+
+    with get_agent().override(model=FunctionModel(stream_function=search_then_answer)):
+        answer = asyncio.run(stream_agent_answer("How do I merge records?", deps, pieces.append, progress.append))
+
+    assert progress == ["searching: queues"]
+    assert pieces == ["Use ", "the ", "Resolution queue", "."]
+    assert answer.text == "Use the Resolution queue."
+    assert answer.tool_calls == 1
+    assert 0 <= answer.time_to_first_token <= answer.runtime
+
+
+def test_answer_cache_serves_near_identical_questions_without_running_the_agent(monkeypatch):
+    async def fake_retrieve(supabase, embedding_client, query, keyword_weight=None):
+        return "Resolution queue"
+
+    async def fake_query_embedding(query, embedding_client):
+        return [1.0, 0.0] if "merge" in query else [0.0, 1.0]
+
+    monkeypatch.setattr(clinia_doc_agent, "retrieve_relevant_documentation_tool", fake_retrieve)
+    monkeypatch.setattr(clinia_doc_agent, "get_query_embedding", fake_query_embedding)
+    monkeypatch.setattr(clinia_doc_agent.agent_tools, "answer_cache", SemanticCache(threshold=0.97))
+    deps = CliniaDocAgentsDeps(supabase=None, embedding_client=None)
+
+    def ask(question):
+        pieces = []
+        answer = asyncio.run(stream_agent_answer(question, deps, pieces.append))
+        return answer, "".join(pieces)
+
+    with get_agent().override(model=FunctionModel(stream_function=search_then_answer)):
+        first, _ = ask("How do I merge records?")
+        second, streamed = ask("how can I merge records")
+        other, _ = ask("What is a bundle?")
+
+    assert not first.cached and not other.cached
+    assert second.cached and second.tool_calls == 0
+    assert streamed == second.text == first.text
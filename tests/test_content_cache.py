@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from content_cache import ContentCache, cache_key, close_content_cache, get_content_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ContentCache(str(tmp_path / "cache.sqlite"), max_entries=20)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_depends_on_model_prompt_and_text():
+    base = cache_key("model", "1", "text")
+    assert base == cache_key("model", "1", "text")
+    assert base != cache_key("other", "1", "text")
+    assert base != cache_key("model", "2", "text")
+    assert base != cache_key("model", "1", "other")
+
+
+def test_summary_round_trip_and_stats(cache):
+    assert cache.get_summary("k") is None
+    cache.put_summary("k", "Title", "Summary")
+    assert cache.get_summary("k") == {"title": "Title", "summary": "Summary"}
+    assert cache.stats["summary"].hits == 1
+    assert cache.stats["summary"].misses == 1
+
+
+def test_embedding_is_stored_as_float32(cache):
+    cache.put_embedding("k", [0.5, -0.25, 1 / 3])
+    vector = cache.get_embedding("k")
+    assert vector[:2] == [0.5, -0.25]
+    assert vector[2] == pytest.approx(1 / 3, rel=1e-6)
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for i in range(20):
+        cache.put_embedding(f"k{i}", [float(i)])
+    # Touch the oldest entry so it becomes the most recently used one.
+    assert cache.get_embedding("k0") == [0.0]
+
+    cache.put_embedding("k20", [20.0])
+
+    assert cache.get_embedding("k0") == [0.0]
+    assert cache.get_embedding("k1") is None
+    assert cache.stats["embedding"].evictions >= 1
+
+
+def test_lookups_and_puts_do_not_scan_or_write_per_hit(cache):
+    for i in range(10):
+        cache.put_embedding(f"k{i}", [float(i)])
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    for i in range(10):
+        cache.put_summary(f"k{i}", "Title", "Summary")
+        assert cache.get_embedding(f"k{i}") == [float(i)]
+
+    assert not [sql for sql in statements if "COUNT" in sql or sql.startswith("UPDATE")]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = ContentCache(path)
+    first.put_summary("k", "Title", "Summary")
+    first.close()
+
+    second = ContentCache(path, max_entries=1)
+    assert second.get_summary("k") == {"title": "Title", "summary": "Summary"}
+    # The row count is read at open: the next summary is over the limit and evicts the least recently used one.
+    second.put_summary("k2", "Title 2", "Summary 2")
+    assert second.get_summary("k") is None
+    second.close()
+
+
+def test_closing_the_shared_cache_writes_pending_last_used_updates(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setenv("CONTENT_CACHE_PATH", path)
+    monkeypatch.delenv("CONTENT_CACHE_DISABLED", raising=False)
+    get_content_cache.cache_clear()
+    close_content_cache()  # Never opened: nothing to close.
+    assert get_content_cache.cache_info().currsize == 0
+
+    cache = get_content_cache()
+    cache.put_embedding("old", [0.0])
+    cache.put_embedding("new", [1.0])
+    assert cache.get_embedding("old") == [0.0]
+    close_content_cache()
+
+    assert get_content_cache.cache_info().currsize == 0
+    # The hit on "old" was written on close, so "new" is now the least recently used entry.
+    with sqlite3.connect(path) as conn:
+        assert [key for (key,) in conn.execute("SELECT key FROM embeddings ORDER BY last_used")] == ["new", "old"]
@@ -0,0 +1,93 @@
+import numpy as np
+
+from context_packing import merge_overlap, mmr_order, pack_context, parse_embeddings
+
+
+def row(url, chunk_number, content, similarity=0.9, embedding=None, summary=""):
+    return {
+        "url": url,
+        "chunk_number": chunk_number,
+        "title": f"Title of {url}",
+        "summary": summary,
+        "content": content,
+        "similarity": similarity,
+        "embedding": embedding,
+    }
+
+
+def test_mmr_prefers_a_novel_row_over_a_near_duplicate():
+    rows = [
+        row("a", 0, "alpha", 0.90, [1.0, 0.0]),
+        row("b", 0, "alpha again", 0.89, [0.999, 0.045]),
+        row("c", 0, "gamma", 0.80, [0.0, 1.0]),
+    ]
+
+    assert mmr_order(rows, diversity=0.5) == [0, 2, 1]
+    assert mmr_order(rows, diversity=0.0) == [0, 1, 2]
+    # Without embeddings, the search order is kept.
+    assert mmr_order([{**r, "embedding": None} for r in rows], diversity=0.5) == [0, 1, 2]
+
+
+def test_parse_embeddings_reads_postgrest_vectors():
+    rows = parse_embeddings([{"embedding": "[0.6,0.8]"}, {"embedding": None}])
+
+    assert rows[0]["embedding"].dtype == np.float32
+    assert rows[0]["embedding"].tolist() == [np.float32(0.6), np.float32(0.8)]
+    assert rows[1]["embedding"] is None
+
+
+def test_merge_overlap_drops_repeated_text():
+    previous = "The first part of the page. " + "x" * 80 + " end of the overlap."
+    following = "x" * 80 + " end of the overlap. The second part."
+
+    merged = merge_overlap(previous, following)
+
+    assert merged == previous + " The second part."
+    assert merge_overlap("one", "two") == "one\n\ntwo"
+
+
+def test_consecutive_chunks_of_a_page_become_one_section():
+    rows = [
+        row("https://docs/b", 0, "B zero"),
+        row("https://docs/a", 1, "A one"),
+        row("https://docs/a", 0, "A zero"),
+        row("https://docs/a", 3, "A three"),
+    ]
+
+    packed = pack_context(rows, token_budget=1000, diversity=0)
+
+    assert packed.chunks == 4
+    assert packed.sections == 3
+    sections = packed.text.split("\n\n## ")
+    assert sections[0] == "## Title of https://docs/b\nSource: https://docs/b\nB zero"
+    assert sections[1] == "Title of https://docs/a\nSource: https://docs/a\nA zero\n\nA one"
+    assert sections[2].endswith("A three")
+
+
+def test_packing_stays_within_the_token_budget_and_drops_duplicates():
+    rows = [row(f"u{i}", 0, "word " * 100) for i in range(3)] + [row("u3", 0, "short")]
+
+    packed = pack_context(rows, token_budget=300, diversity=0)
+
+    # The three long rows are identical: the first one and the short row fit.
+    assert packed.chunks == 2
+    assert packed.tokens <= 300
+    assert "Source: u3\nshort" in packed.text
+
+
+def test_the_best_row_is_cut_rather_than_returning_nothing():
+    packed = pack_context([row("u", 0, "word " * 1000)], token_budget=100)
+
+    assert packed.chunks == 1
+    assert packed.tokens <= 110
+
+
+def test_summaries_only_packs_summaries():
+    rows = [row("u", 0, "long content " * 50, summary="A summary."), row("v", 0, "Content kept.")]
+
+    packed = pack_context(rows, summaries_only=True)
+
+    assert "A summary." in packed.text
+    assert "long content" not in packed.text
+    # Rows without a summary fall back to their content.
+    assert "Content kept." in packed.text
@@ -0,0 +1,86 @@
+import re
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from corpus_versions import CorpusSwapError, CorpusVersions, new_corpus_version
+
+
+class FakeQuery:
+    def __init__(self, client, result):
+        self.client = client
+        self.result = result
+
+    def select(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return SimpleNamespace(data=self.result)
+
+
+class FakeClient:
+    def __init__(self, results, table_failures=0):
+        self.results = results
+        self.table_failures = table_failures
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        return FakeQuery(self, self.results[name])
+
+    def table(self, name):
+        if self.table_failures:
+            self.table_failures -= 1
+            return FakeQuery(self, RuntimeError(f"relation {name} does not exist"))
+        return FakeQuery(self, [])
+
+
+def test_version_is_a_valid_sortable_table_suffix():
+    version = new_corpus_version(datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+    assert version == "v20250102t030405"
+    assert re.fullmatch(r"[a-z0-9_]+", version)
+    assert new_corpus_version(datetime(2025, 1, 2, 3, 4, 6, tzinfo=timezone.utc)) > version
+
+
+def test_create_shadow_waits_for_the_schema_reload():
+    client = FakeClient({"create_corpus_shadow": "site_pages_v1"}, table_failures=2)
+    versions = CorpusVersions(client)
+
+    assert versions.create_shadow("v1") == "site_pages_v1"
+    assert client.table_failures == 0
+
+
+def test_finalize_returns_the_row_count_of_a_ready_version():
+    client = FakeClient({"finalize_corpus_shadow": {"version": "v1", "status": "ready", "row_count": 42}})
+    assert CorpusVersions(client).finalize("v1", 42, min_ratio=0.5) == 42
+    assert client.calls == [
+        (
+            "finalize_corpus_shadow",
+            {
+                "p_version": "v1",
+                "p_expected_rows": 42,
+                "p_min_ratio": 0.5,
+                "p_index_method": "hnsw",
+                "p_quantization": "none",
+                "p_dimensions": 1536,
+            },
+        ),
+    ]
+
+
+def test_failed_validation_raises_instead_of_activating():
+    client = FakeClient({"finalize_corpus_shadow": {"version": "v1", "status": "failed", "row_count": 3}})
+    with pytest.raises(CorpusSwapError, match="3 rows loaded, 42 written"):
+        CorpusVersions(client).finalize("v1", 42)
+
+
+def test_rpc_errors_are_wrapped():
+    client = FakeClient({"activate_corpus_version": RuntimeError("lock timeout")})
+    with pytest.raises(CorpusSwapError, match="activate_corpus_version failed: lock timeout"):
+        CorpusVersions(client).activate("v1")
@@ -0,0 +1,44 @@
+from crawl_manifest import CrawlManifest, PageState, diff_chunks, hash_chunk
+
+
+def test_diff_chunks_first_crawl_writes_everything():
+    changed, removed = diff_chunks([], ["a", "b"])
+    assert changed == [0, 1]
+    assert removed == []
+
+
+def test_diff_chunks_only_changed_positions():
+    changed, removed = diff_chunks(["a", "b", "c"], ["a", "x", "c"])
+    assert changed == [1]
+    assert removed == []
+
+
+def test_diff_chunks_shorter_document_removes_tail():
+    changed, removed = diff_chunks(["a", "b", "c", "d"], ["a", "b"])
+    assert changed == []
+    assert removed == [2, 3]
+
+
+def test_hash_chunk_is_stable():
+    assert hash_chunk("same text") == hash_chunk("same text")
+    assert hash_chunk("same text") != hash_chunk("other text")
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = CrawlManifest.load(path)
+    assert manifest.pages == {}
+
+    manifest.set("https://docs/a", PageState("2025-01-01", '"etag"', "Wed, 01 Jan 2025 00:00:00 GMT", ["h1", "h2"]))
+    manifest.save()
+
+    loaded = CrawlManifest.load(path)
+    assert loaded.get("https://docs/a") == manifest.get("https://docs/a")
+
+
+def test_is_unchanged_in_sitemap():
+    manifest = CrawlManifest("unused", {"https://docs/a": PageState(lastmod="2025-01-01")})
+    assert manifest.is_unchanged_in_sitemap("https://docs/a", "2025-01-01")
+    assert not manifest.is_unchanged_in_sitemap("https://docs/a", "2025-02-01")
+    assert not manifest.is_unchanged_in_sitemap("https://docs/a", None)
+    assert not manifest.is_unchanged_in_sitemap("https://docs/b", "2025-01-01")
@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from content_cache import ContentCache
+from embedding_batcher import EmbeddingBatcher, EmbeddingError
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeEmbeddings:
+    def __init__(self, fail_on=None, fail_times=0, fail_status=429, drop_last=False):
+        self.calls = []
+        self.fail_on = fail_on
+        self.fail_times = fail_times
+        self.fail_status = fail_status
+        self.drop_last = drop_last
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        await asyncio.sleep(0)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise FakeAPIError(self.fail_status)
+        if self.fail_on is not None and self.fail_on in input:
+            raise FakeAPIError(400)
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        if self.drop_last:
+            self.drop_last = False
+            data = data[:-1]
+        return SimpleNamespace(data=data)
+
+
+def make_batcher(embeddings, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    kwargs.setdefault("flush_interval", 0.001)
+    return EmbeddingBatcher(SimpleNamespace(embeddings=embeddings), "model", **kwargs)
+
+
+def test_batches_inputs_and_keeps_order():
+    embeddings = FakeEmbeddings()
+    batcher = make_batcher(embeddings, batch_size=4)
+    texts = ["a" * i for i in range(1, 11)]
+
+    async def run():
+        result = await batcher.embed_many(texts)
+        await batcher.close()
+        return result
+
+    vectors = asyncio.run(run())
+    assert vectors == [[float(len(text))] for text in texts]
+    assert [len(call) for call in embeddings.calls] == [4, 4, 2]
+    assert batcher.stats.requests == 3
+
+
+def test_token_budget_splits_batches():
+    embeddings = FakeEmbeddings()
+    batcher = make_batcher(embeddings, batch_size=100, max_batch_tokens=30)
+
+    async def run():
+        await batcher.embed_many(["x" * 40] * 6)
+        await batcher.close()
+
+    asyncio.run(run())
+    assert all(len(call) <= 2 for call in embeddings.calls)
+
+
+def test_retries_transient_errors():
+    embeddings = FakeEmbeddings(fail_times=2)
+    batcher = make_batcher(embeddings, batch_size=3)
+
+    vectors = asyncio.run(batcher.embed_many(["a", "bb", "ccc"]))
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert batcher.stats.retries == 2
+
+
+def test_bad_input_only_fails_its_own_slice():
+    embeddings = FakeEmbeddings(fail_on="bad")
+    batcher = make_batcher(embeddings, batch_size=4)
+
+    async def run():
+        return await asyncio.gather(*[batcher.embed(t) for t in ["a", "bb", "bad", "dddd"]], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert results[0] == [1.0]
+    assert results[1] == [2.0]
+    assert isinstance(results[2], EmbeddingError)
+    assert results[3] == [4.0]
+    assert batcher.stats.failed_inputs == 1
+
+
+def test_incomplete_response_resends_missing_inputs_only():
+    embeddings = FakeEmbeddings(drop_last=True)
+    batcher = make_batcher(embeddings, batch_size=3)
+
+    vectors = asyncio.run(batcher.embed_many(["a", "bb", "ccc"]))
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert embeddings.calls[-1] == ["ccc"]
+
+
+def test_gives_up_after_max_retries():
+    embeddings = FakeEmbeddings(fail_times=10, fail_status=503)
+    batcher = make_batcher(embeddings, batch_size=1, max_retries=2)
+
+    with pytest.raises(EmbeddingError):
+        asyncio.run(batcher.embed("a"))
+    assert len(embeddings.calls) == 3
+
+
+def test_cached_inputs_skip_the_api(tmp_path):
+    cache = ContentCache(str(tmp_path / "cache.sqlite"))
+    embeddings = FakeEmbeddings()
+    batcher = make_batcher(embeddings, batch_size=10, cache=cache)
+
+    asyncio.run(batcher.embed_many(["a", "bb"]))
+    vectors = asyncio.run(batcher.embed_many(["a", "bb", "ccc"]))
+
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert embeddings.calls == [["a", "bb"], ["ccc"]]
+    assert batcher.stats.cache_hits == 2
+    cache.close()
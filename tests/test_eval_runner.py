@@ -0,0 +1,89 @@
+import asyncio
+import csv
+
+from pydantic_ai.models.function import FunctionModel
+from test_clinia_doc_agent import search_then_answer
+
+import clinia_doc_agent
+from clinia_doc_agent import CliniaDocAgentsDeps, get_agent
+from eval_runner import (
+    CSV_HEADER,
+    EvalResult,
+    append_results_to_csv,
+    compare_to_baseline,
+    find_missing_terms,
+    run_evals,
+    summarize,
+)
+
+
+def test_find_missing_terms_ignores_case():
+    assert find_missing_terms("Standard Search, Health-Grade Search", "Use standard search.") == ["health-grade search"]
+    assert find_missing_terms("Relationship", "A RELATIONSHIP links them") == []
+
+
+def test_run_evals_repeats_questions_concurrently_and_scores_them(monkeypatch):
+    in_flight, peak = 0, 0
+
+    async def fake_retrieve(supabase, embedding_client, query, keyword_weight=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return "Resolution queue"
+
+    monkeypatch.setattr(clinia_doc_agent, "retrieve_relevant_documentation_tool", fake_retrieve)
+    samples = [
+        {"question": f"Question {i}?", "answer": "resolution queue" if i % 2 else "Relationship"} for i in range(6)
+    ]
+    deps = CliniaDocAgentsDeps(supabase=None, embedding_client=None)
+
+    with get_agent().override(model=FunctionModel(stream_function=search_then_answer)):
+        results = asyncio.run(run_evals(samples, deps, concurrency=3, repeat=2))
+
+    assert [(r.repetition, r.index) for r in results] == [(rep, i) for rep in range(2) for i in range(6)]
+    assert peak == 3
+    assert [r.correct for r in results[:6]] == [False, True] * 3
+    assert results[1].tool_calls == 1 and results[1].retrieval_time >= 0.01
+    summary = summarize(results)
+    assert summary["runs"] == 12 and summary["accuracy"] == 0.5
+    assert summary["questions"]["Question 1?"]["runs"] == 2
+
+
+def make_results(latencies, correct=True):
+    return [
+        EvalResult(i, 0, f"q{i}", "x", latency=latency, tool_calls=1, missing_terms=[] if correct else ["x"])
+        for i, latency in enumerate(latencies)
+    ]
+
+
+def test_compare_to_baseline_flags_slower_or_less_accurate_runs():
+    baseline = summarize(make_results([1.0, 1.0, 1.2]))
+
+    assert compare_to_baseline(summarize(make_results([1.05, 1.1, 1.2])), baseline) == []
+    regressions = compare_to_baseline(summarize(make_results([2.0, 2.0, 2.5], correct=False)), baseline)
+    assert [regression.split()[0:2] for regression in regressions] == [
+        ["accuracy", "1.00"],
+        ["latency", "p50"],
+        ["latency", "p95"],
+    ]
+
+
+def test_csv_has_the_runner_measurements_and_keeps_the_notebook_columns(tmp_path):
+    result = EvalResult(0, 0, "q", "x", answer="x", latency=1.234, tool_calls=2, total_tokens=900, retrieval_time=0.5)
+
+    path = tmp_path / "results.csv"
+    append_results_to_csv(str(path), [result], "now")
+    append_results_to_csv(str(path), [result], "later")
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == CSV_HEADER and len(rows) == 2
+    assert (rows[1]["runtime_seconds"], rows[1]["tool_calls"], rows[1]["total_tokens"]) == ("1.23", "2", "900")
+    assert (rows[1]["retrieval_seconds"], rows[1]["ttft_seconds"]) == ("0.50", "")
+
+    notebook = tmp_path / "notebook.csv"
+    notebook.write_text(",".join(CSV_HEADER[:8]) + "\n", encoding="utf-8")
+    append_results_to_csv(str(notebook), [result], "now")
+    with open(notebook, newline="", encoding="utf-8") as f:
+        assert [len(row) for row in csv.reader(f)] == [8, 8]
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+
+from fetcher import AsyncFetcher, FetchError, PageTooLargeError
+
+
+def make_fetcher(handler, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return AsyncFetcher(transport=httpx.MockTransport(handler), http2=False, **kwargs)
+
+
+def run(fetcher, *args, **kwargs):
+    async def fetch():
+        async with fetcher:
+            return await fetcher.fetch(*args, **kwargs)
+
+    return asyncio.run(fetch())
+
+
+def test_fetch_returns_body_and_validators():
+    def handler(request):
+        return httpx.Response(200, text="<h1>Hi</h1>", headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025"})
+
+    response = run(make_fetcher(handler), "https://docs.example/a")
+    assert response.text == "<h1>Hi</h1>"
+    assert response.etag == '"v1"'
+    assert response.last_modified == "Wed, 01 Jan 2025"
+
+
+def test_conditional_request_not_modified():
+    def handler(request):
+        assert request.headers["If-None-Match"] == '"v1"'
+        return httpx.Response(304)
+
+    response = run(make_fetcher(handler), "https://docs.example/a", etag='"v1"')
+    assert response.not_modified
+    assert response.text is None
+
+
+def test_retries_rate_limited_responses():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, text="ok")
+
+    response = run(make_fetcher(handler), "https://docs.example/a")
+    assert response.text == "ok"
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_retries():
+    def handler(request):
+        return httpx.Response(503)
+
+    with pytest.raises(FetchError):
+        run(make_fetcher(handler, max_retries=1), "https://docs.example/a")
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    with pytest.raises(FetchError):
+        run(make_fetcher(handler), "https://docs.example/a")
+    assert len(calls) == 1
+
+
+def test_rejects_pages_over_the_size_limit():
+    def handler(request):
+        return httpx.Response(200, content=b"x" * 2048)
+
+    with pytest.raises(PageTooLargeError):
+        run(make_fetcher(handler, max_page_bytes=1024), "https://docs.example/a")
@@ -0,0 +1,65 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from html_conversion import convert_html_to_markdown, convert_page, extract_main_content
+
+ARTICLE_TEXT = "Entities are grouped into data partitions that control access. " * 5
+
+DOCS_PAGE = f"""<html><head><title>Partitions</title><script>track()</script></head><body>
+<header><nav><a href="/">Home</a><a href="/guide">Guide</a></nav></header>
+<div class="theme-layout"><aside class="menu"><ul><li>Sidebar link</li></ul></aside>
+<main>
+  <div class="breadcrumbs">Docs / Guide</div>
+  <article>
+    <header><h1>Data partitions</h1></header>
+    <p>{ARTICLE_TEXT}</p>
+    <pre><code>GET /v1/partitions</code></pre>
+    <div class="card-footer">Important note on partitions</div>
+    <div role="complementary">Partitions are not shared across tenants</div>
+    <div class="theme-doc-toc-mobile">On this page</div>
+  </article>
+  <nav class="pagination-nav">Next page</nav>
+</main></div>
+<footer>Copyright Clinia</footer>
+</body></html>"""
+
+
+def test_only_the_article_is_kept():
+    markdown = convert_html_to_markdown(DOCS_PAGE)
+
+    assert markdown.startswith("# Data partitions")
+    assert "data partitions that control access" in markdown
+    assert "GET /v1/partitions" in markdown
+    # Blocks of the article itself are kept, even if a class word or role looks like boilerplate.
+    assert "Important note on partitions" in markdown
+    assert "not shared across tenants" in markdown
+    for boilerplate in ("Home", "Sidebar link", "Docs / Guide", "On this page", "Next page", "Copyright", "track()"):
+        assert boilerplate not in markdown
+
+
+def test_pages_without_main_content_keep_everything_but_boilerplate():
+    html = "<body><nav>Menu</nav><div><h1>Title</h1><p>Short &amp; sweet</p></div><footer>Legal</footer></body>"
+
+    assert extract_main_content(html) == "<body><div><h1>Title</h1><p>Short &amp; sweet</p></div></body>"
+    # A main element with too little text is not trusted either.
+    assert "Outside" in extract_main_content("<body><main><p>Tiny</p></main><p>Outside</p></body>")
+
+
+def test_unclosed_elements_are_closed_with_their_parent():
+    html = f"<html><head><title>T</title><body><article><p>{ARTICLE_TEXT}<p>Second<li>item</article><p>After"
+
+    content = extract_main_content(html)
+
+    assert content.startswith("<article><p>") and content.endswith("</li></p></p></article>")
+    assert "After" not in content
+
+
+def test_convert_page_reports_what_was_kept_and_runs_in_worker_processes():
+    result = convert_page(DOCS_PAGE)
+    assert result.html_chars == len(DOCS_PAGE)
+    assert 0 < result.kept_chars < result.html_chars
+    assert result.cpu_seconds >= 0
+    assert convert_page(DOCS_PAGE, main_content=False).kept_chars == len(DOCS_PAGE)
+
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert pool.submit(convert_page, DOCS_PAGE).result().markdown == result.markdown
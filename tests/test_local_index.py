@@ -0,0 +1,132 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import agent_tools
+from local_index import LocalIndex, export_snapshot, get_local_index
+from query_embedding_cache import QueryEmbeddingCache
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.start = self.end = 0
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[dict(row) for row in self.rows[self.start : self.end + 1]])
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        assert name == "site_pages"
+        return FakeTable(self.rows)
+
+
+def make_rows(count, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": i,
+            "url": f"https://docs.example/{i}",
+            "chunk_number": 0,
+            "title": f"Page {i}",
+            "summary": "",
+            "content": f"content {i}",
+            "metadata": {"source": "clinia_docs" if i % 3 else "other"},
+            "embedding": json.dumps(rng.standard_normal(dim).tolist()),
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    rows = make_rows(25)
+    assert export_snapshot(FakeSupabase(rows), str(tmp_path), page_size=10) == 25
+    return tmp_path, rows
+
+
+def test_search_matches_exact_ranking(snapshot):
+    path, rows = snapshot
+    index = LocalIndex(str(path))
+    vectors = np.array([json.loads(row["embedding"]) for row in rows])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = vectors[4] + 0.1
+
+    results = index.search(query.tolist(), match_count=5)
+
+    assert [row["id"] for row in results] == np.argsort(-(vectors @ query))[:5].tolist()
+    assert results[0]["similarity"] >= results[-1]["similarity"]
+    assert "embedding" not in results[0]
+
+
+def test_search_applies_the_metadata_filter(snapshot):
+    path, _ = snapshot
+    results = LocalIndex(str(path)).search([1.0] * 8, match_count=100, filter={"source": "other"})
+    assert sorted(row["id"] for row in results) == list(range(0, 25, 3))
+
+
+def test_float16_snapshot_gives_the_same_ranking(snapshot, tmp_path_factory):
+    path, rows = snapshot
+    half_path = tmp_path_factory.mktemp("half")
+    export_snapshot(FakeSupabase(rows), str(half_path), dtype="float16")
+    query = [0.5] * 8
+
+    full = [row["id"] for row in LocalIndex(str(path)).search(query, 3)]
+    half = [row["id"] for row in LocalIndex(str(half_path)).search(query, 3)]
+    assert half == full
+
+
+def test_local_backend_does_not_call_supabase(snapshot, monkeypatch):
+    path, _ = snapshot
+
+    async def fake_get_embedding(text, client):
+        return [1.0] * 8
+
+    monkeypatch.setattr(agent_tools, "get_embedding", fake_get_embedding)
+    monkeypatch.setattr(agent_tools, "query_embedding_cache", QueryEmbeddingCache())
+    monkeypatch.setattr(agent_tools, "get_local_index", lambda: get_local_index(str(path)))
+
+    rows = asyncio.run(agent_tools.search_documentation(None, None, "How do I search?", backend="local"))
+    assert len(rows) == 10
+    assert all(row["metadata"]["source"] == "clinia_docs" for row in rows)
+
+
+@pytest.mark.parametrize("quantization, dimensions", [("int8", None), ("binary", None), ("none", 4), ("binary", 4)])
+def test_compact_indexes_rescore_at_full_precision(tmp_path, quantization, dimensions):
+    rows = make_rows(200, dim=16, seed=1)
+    export_snapshot(FakeSupabase(rows), str(tmp_path))
+    exact = LocalIndex(str(tmp_path))
+    compact = LocalIndex(str(tmp_path), quantization=quantization, dimensions=dimensions, rescore_factor=50)
+    query = exact.embeddings[7] + 0.05
+
+    assert compact.nbytes < exact.nbytes
+    expected = exact.search(query.tolist(), match_count=5)
+    results = compact.search(query.tolist(), match_count=5)
+    # Every candidate is rescored with the full vectors, so the best match and its similarity are exact.
+    assert results[0]["id"] == expected[0]["id"] == 7
+    assert results[0]["similarity"] == pytest.approx(expected[0]["similarity"])
+
+
+def test_compact_index_applies_the_metadata_filter(snapshot):
+    path, _ = snapshot
+    results = LocalIndex(str(path), quantization="binary").search(
+        [1.0] * 8, match_count=100, filter={"source": "other"}
+    )
+    assert sorted(row["id"] for row in results) == list(range(0, 25, 3))
@@ -0,0 +1,74 @@
+import asyncio
+
+from pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_every_stage():
+    stored = []
+
+    async def split(item, emit):
+        for part in range(item):
+            await emit((item, part))
+
+    async def double(pair, emit):
+        await emit((pair[0], pair[1] * 2))
+
+    async def store(pair, emit):
+        stored.append(pair)
+
+    pipeline = Pipeline(
+        [Stage("split", split, workers=2), Stage("double", double, workers=3), Stage("store", store)],
+        report_interval=0,
+    )
+    stats = asyncio.run(pipeline.run([1, 2, 3]))
+
+    assert sorted(stored) == [(1, 0), (2, 0), (2, 2), (3, 0), (3, 2), (3, 4)]
+    assert stats["split"].processed == 3
+    assert stats["split"].emitted == 6
+    assert stats["store"].processed == 6
+
+
+def test_failures_are_counted_and_do_not_stop_the_pipeline():
+    stored = []
+
+    async def check(item, emit):
+        if item % 2:
+            raise ValueError(f"odd item {item}")
+        await emit(item)
+
+    async def store(item, emit):
+        stored.append(item)
+
+    stats = asyncio.run(Pipeline([Stage("check", check), Stage("store", store)], report_interval=0).run(range(6)))
+
+    assert sorted(stored) == [0, 2, 4]
+    assert stats["check"].failed == 3
+
+
+def test_bounded_queues_apply_backpressure():
+    async def produce(item, emit):
+        await emit(item)
+
+    async def slow(item, emit):
+        await asyncio.sleep(0.001)
+
+    pipeline = Pipeline([Stage("produce", produce, queue_size=2), Stage("slow", slow, queue_size=3)], report_interval=0)
+    stats = asyncio.run(pipeline.run(range(50)))
+
+    assert stats["slow"].processed == 50
+    assert stats["produce"].max_queue_depth <= 2
+    assert stats["slow"].max_queue_depth <= 3
+
+
+def test_accepts_async_iterables():
+    seen = []
+
+    async def items():
+        for i in range(3):
+            yield i
+
+    async def store(item, emit):
+        seen.append(item)
+
+    asyncio.run(Pipeline([Stage("store", store)], report_interval=0).run(items()))
+    assert sorted(seen) == [0, 1, 2]
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from query_embedding_cache import COALESCED, HIT, MISS, QueryEmbeddingCache, normalize_query
+
+
+class FakeEmbedder:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("embedding failed")
+        return [float(len(text))]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_queries_share_an_entry():
+    assert normalize_query("  What is a  Bundle? ") == normalize_query("what is a bundle")
+
+    cache = QueryEmbeddingCache()
+    embed = FakeEmbedder()
+
+    async def run():
+        return [await cache.get(query, embed) for query in ("What is a bundle?", "what is a  bundle", "Other")]
+
+    results = asyncio.run(run())
+    assert [outcome for _, outcome in results] == [MISS, HIT, MISS]
+    assert embed.calls == ["What is a bundle?", "Other"]
+    assert cache.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_concurrent_lookups_share_one_call():
+    cache = QueryEmbeddingCache()
+    embed = FakeEmbedder(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*[cache.get("same query", embed) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert len(embed.calls) == 1
+    assert sorted(outcome for _, outcome in results) == [COALESCED] * 4 + [MISS]
+    assert all(embedding == [10.0] for embedding, _ in results)
+
+
+def test_entries_expire_and_are_evicted_least_recently_used_first():
+    clock = FakeClock()
+    cache = QueryEmbeddingCache(max_entries=2, ttl=60, clock=clock)
+    embed = FakeEmbedder()
+
+    async def run():
+        await cache.get("a", embed)
+        await cache.get("b", embed)
+        await cache.get("a", embed)  # "b" is now the least recently used
+        await cache.get("c", embed)
+        assert (await cache.get("a", embed))[1] == HIT
+        assert (await cache.get("b", embed))[1] == MISS
+
+        clock.now = 61
+        assert (await cache.get("a", embed))[1] == MISS
+
+    asyncio.run(run())
+    assert cache.stats.evictions == 2
+    assert cache.stats.expirations == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = QueryEmbeddingCache()
+    embed = FakeEmbedder(delay=0.05, fail=True)
+
+    async def run():
+        return await asyncio.gather(*[cache.get("query", embed) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(cache) == 0
+
+
+def test_prewarm_embeds_each_question_once():
+    cache = QueryEmbeddingCache()
+    embed = FakeEmbedder()
+
+    warmed = asyncio.run(cache.prewarm(["Question one?", "question one", "Question two"], embed))
+    assert warmed == 2
+    assert len(embed.calls) == 2
+    assert asyncio.run(cache.get("QUESTION TWO", embed))[1] == HIT
+
+
+def test_get_many_embeds_every_miss_in_one_call():
+    cache = QueryEmbeddingCache()
+    asyncio.run(cache.get("cached query", FakeEmbedder()))
+    batches = []
+
+    async def embed_many(texts):
+        batches.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    results = asyncio.run(cache.get_many(["Cached query?", "new one", "New one.", "another"], embed_many))
+
+    assert batches == [["new one", "another"]]
+    assert [outcome for _, outcome in results] == [HIT, MISS, MISS, MISS]
+    assert results[1][0] == results[2][0] == [7.0]
+    assert asyncio.run(cache.get("another", FakeEmbedder()))[1] == HIT
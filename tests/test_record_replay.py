@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, InternalServerError
+from supabase import Client
+
+from record_replay import RecordingTransport, ReplayStore, ReplayTransport, install_supabase_transport, request_key
+
+
+def embeddings_server(request: httpx.Request) -> httpx.Response:
+    inputs = json.loads(request.content)["input"]
+    data = [{"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(inputs)]
+    return httpx.Response(
+        200, json={"object": "list", "data": data, "model": "m", "usage": {"prompt_tokens": 1, "total_tokens": 1}}
+    )
+
+
+def embed(transport, text: str, base_url: str = "https://api.openai.com/v1", max_retries: int = 0):
+    client = AsyncOpenAI(
+        base_url=base_url,
+        api_key="x",
+        max_retries=max_retries,
+        http_client=DefaultAsyncHttpxClient(transport=transport),
+    )
+    response = asyncio.run(client.embeddings.create(model="m", input=[text], encoding_format="float"))
+    return response.data[0].embedding
+
+
+def test_request_key_ignores_json_key_order_and_query_order():
+    assert request_key("post", "/v1/embeddings", "", b'{"a": 1, "b": 2}') == request_key(
+        "POST", "/v1/embeddings", "", b'{"b":2,"a":1}'
+    )
+    assert request_key("GET", "/rest/v1/t", "a=1&b=2", b"") == request_key("GET", "/rest/v1/t", "b=2&a=1", b"")
+    assert request_key("POST", "/v1/embeddings", "", b'{"a": 1}') != request_key(
+        "POST", "/v1/embeddings", "", b'{"a": 2}'
+    )
+
+
+def test_recorded_responses_are_replayed_offline_from_any_base_url(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    recorded = embed(RecordingTransport(store, httpx.MockTransport(embeddings_server)), "hello")
+
+    replay = ReplayTransport(store)
+    assert embed(replay, "hello", base_url="http://127.0.0.1:1/v1") == recorded == [5.0, 1.0]
+    assert replay.stats.hits == 1
+
+    with pytest.raises(Exception, match="No recorded response"):
+        embed(replay, "never recorded")
+    assert replay.stats.misses == 1
+
+
+def test_embeddings_are_replayed_per_input_whatever_the_batches(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    client = AsyncOpenAI(
+        api_key="x",
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(
+            transport=RecordingTransport(store, httpx.MockTransport(embeddings_server))
+        ),
+    )
+    asyncio.run(client.embeddings.create(model="m", input=["a", "bb"], encoding_format="float"))
+
+    replay = ReplayTransport(store)
+    client = AsyncOpenAI(api_key="x", max_retries=0, http_client=DefaultAsyncHttpxClient(transport=replay))
+    response = asyncio.run(client.embeddings.create(model="m", input=["bb", "a"], encoding_format="float"))
+
+    assert [item.embedding for item in response.data] == [[2.0, 1.0], [1.0, 1.0]]
+    assert [item.index for item in response.data] == [0, 1]
+    assert embed(replay, "bb") == [2.0, 1.0]
+    assert replay.stats.hits == 2
+
+
+def test_replay_injects_errors_deterministically(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    embed(RecordingTransport(store, httpx.MockTransport(embeddings_server)), "hello")
+
+    def outcomes(seed):
+        replay = ReplayTransport(store, error_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                embed(replay, "hello")
+                results.append(True)
+            except InternalServerError:
+                results.append(False)
+        return results
+
+    assert outcomes(1) == outcomes(1)
+    assert 0 < outcomes(1).count(False) < 20
+
+
+def test_replay_rate_limits_concurrent_requests(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    embed(RecordingTransport(store, httpx.MockTransport(embeddings_server)), "hello")
+    replay = ReplayTransport(store, latency=0.05, max_in_flight=2)
+    client = AsyncOpenAI(api_key="x", max_retries=0, http_client=DefaultAsyncHttpxClient(transport=replay))
+
+    async def burst():
+        calls = [client.embeddings.create(model="m", input=["hello"], encoding_format="float") for _ in range(5)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, Exception) for result in results) == 3
+    assert replay.stats.rate_limited == 3
+
+
+def test_supabase_rpc_goes_through_the_installed_transport(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    rows = [{"id": 1, "content": "Resolution queue"}]
+    server = httpx.MockTransport(lambda request: httpx.Response(200, json=rows))
+
+    supabase = Client("http://127.0.0.1:1", "fake.fake.fake")
+    install_supabase_transport(supabase, RecordingTransport(store, server))
+    assert supabase.rpc("match_site_pages", {"match_count": 1}).execute().data == rows
+
+    offline = Client("http://127.0.0.1:2", "fake.fake.fake")
+    install_supabase_transport(offline, ReplayTransport(store))
+    assert offline.rpc("match_site_pages", {"match_count": 1}).execute().data == rows
@@ -0,0 +1,80 @@
+import pytest
+
+from semantic_cache import SemanticCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def vector(*values):
+    return list(values)
+
+
+def test_similar_queries_hit_and_dissimilar_ones_miss():
+    cache = SemanticCache(threshold=0.95)
+    cache.put(vector(1.0, 0.0, 0.0), "two types of search", cost=0.4)
+
+    value, similarity = cache.lookup(vector(0.98, 0.1, 0.0))
+    assert value == "two types of search"
+    assert similarity == pytest.approx(0.995, abs=1e-3)
+    assert cache.lookup(vector(0.7, 0.7, 0.0)) is None
+
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    assert cache.stats.hit_rate == 0.5
+    assert cache.stats.saved_seconds == pytest.approx(0.4)
+
+
+def test_values_only_match_within_their_scope():
+    cache = SemanticCache(threshold=0.9)
+    cache.put(vector(1.0, 0.0), "ten rows", scope="vector:10")
+    cache.put(vector(1.0, 0.01), "five rows", scope="vector:5")
+
+    assert cache.lookup(vector(1.0, 0.0), scope="vector:5")[0] == "five rows"
+    assert cache.lookup(vector(1.0, 0.0), scope="vector:10")[0] == "ten rows"
+    assert cache.lookup(vector(1.0, 0.0), scope="hybrid:10") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.put(vector(1.0, 0.0, 0.0), "a")
+    cache.put(vector(0.0, 1.0, 0.0), "b")
+    assert cache.lookup(vector(1.0, 0.0, 0.0))[0] == "a"
+    cache.put(vector(0.0, 0.0, 1.0), "c")
+
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    assert cache.lookup(vector(0.0, 1.0, 0.0)) is None
+    assert cache.lookup(vector(1.0, 0.0, 0.0))[0] == "a"
+    assert cache.lookup(vector(0.0, 0.0, 1.0))[0] == "c"
+
+
+def test_expired_entries_are_removed():
+    clock = FakeClock()
+    cache = SemanticCache(threshold=0.99, ttl=10, clock=clock)
+    cache.put(vector(1.0, 0.0), "old")
+    cache.put(vector(0.0, 1.0), "kept")
+    clock.now = 5
+    cache.put(vector(0.6, 0.8), "new")
+    clock.now = 11
+
+    assert cache.lookup(vector(1.0, 0.0)) is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 2
+    assert cache.lookup(vector(0.6, 0.8))[0] == "new"
+
+
+def test_a_new_corpus_version_drops_every_entry():
+    cache = SemanticCache(threshold=0.99)
+    cache.set_version("v1@1")
+    cache.put(vector(1.0, 0.0), "rows")
+
+    assert cache.set_version("v1@1") is False
+    assert cache.lookup(vector(1.0, 0.0))[0] == "rows"
+    assert cache.set_version("v2@1") is True
+    assert cache.lookup(vector(1.0, 0.0)) is None
+    assert cache.stats.invalidations == 1
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+# Cumulative import time of each entry point, in seconds, as reported by `python -X importtime`. Generous enough
+# for a slow CI machine: the point is to catch a heavy dependency or a client created at import time.
+IMPORT_BUDGETS = {"clinia_doc_crawler": 0.8, "clinia_doc_agent": 2.0}
+
+# Libraries an entry point only loads once it needs them.
+DEFERRED_IMPORTS = {
+    "clinia_doc_crawler": {"openai", "supabase", "html2text", "logfire"},
+    "clinia_doc_agent": {"supabase", "anthropic"},
+}
+
+
+def run_without_credentials(*args: str) -> subprocess.CompletedProcess:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in {"OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_KEY", "LOGFIRE_API_KEY", "LOGFIRE_TOKEN"}
+    }
+    env["PYTHONPATH"] = str(SRC)
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, timeout=60)
+
+
+def import_profile(module: str):
+    """Import a module in a fresh interpreter and return its cumulative import time and the modules it loaded."""
+    result = run_without_credentials("-X", "importtime", "-c", f"import {module}")
+    assert result.returncode == 0, result.stderr
+
+    seconds, loaded = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name == f" {module}":
+            seconds = int(cumulative) / 1e6
+        loaded.add(name.strip())
+    return seconds, loaded
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_entry_point_imports_fast_and_defers_heavy_libraries(module):
+    seconds, loaded = import_profile(module)
+
+    assert not DEFERRED_IMPORTS[module] & {name.split(".")[0] for name in loaded}
+    assert seconds is not None and seconds < IMPORT_BUDGETS[module], f"import {module} took {seconds:.2f}s"
+
+
+@pytest.mark.parametrize("script", ["clinia_doc_crawler.py", "clinia_doc_agent.py"])
+def test_cli_help_runs_without_credentials(script):
+    result = run_without_credentials(str(SRC / script), "--help")
+
+    assert result.returncode == 0, result.stderr
+    assert "usage:" in result.stdout